@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator for measuring CloudSpy throughput and latency
+
+    python benchmark.py http://localhost:9090/api/v1/dashboard/summary?... -c 64 -d 30
+
+Runs ``concurrency`` closed-loop clients for ``duration`` seconds after a
+warm-up and reports requests per second, latency percentiles and status
+codes. Repeat against servers with different WEB_CONCURRENCY values to
+measure how throughput scales with workers.
+
+For repeatable runs without provider calls, start the server with
+RECORDING_MODE=offline on a store imported from a fixture with recordings.py.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def _client(http: httpx.AsyncClient, url: str, stop_at: float, record_after: float,
+                  latencies: List[float], statuses: Counter):
+    while True:
+        started = time.perf_counter()
+        if started >= stop_at:
+            return
+        try:
+            response = await http.get(url)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        if started >= record_after:
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+
+async def run(url: str, concurrency: int, duration: float, warmup: float,
+              headers: Dict[str, str]) -> Dict[str, object]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, headers=headers, timeout=60.0) as http:
+        start = time.perf_counter()
+        record_after = start + warmup
+        stop_at = record_after + duration
+        await asyncio.gather(*[
+            _client(http, url, stop_at, record_after, latencies, statuses) for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - record_after
+
+    latencies.sort()
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p90": round(_percentile(latencies, 0.90) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        "statuses": dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("-w", "--warmup", type=float, default=5.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("-H", "--header", action="append", default=[], help="Extra header, 'Name: value'")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    headers = dict(h.split(":", 1) for h in args.header)
+    headers = {name.strip(): value.strip() for name, value in headers.items()}
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, args.warmup, headers))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    latency = result["latency_ms"]
+    print(f"{result['requests']} requests in {result['duration_seconds']}s "
+          f"at concurrency {result['concurrency']}: {result['requests_per_second']} req/s")
+    print(f"latency p50 {latency['p50']} ms, p90 {latency['p90']} ms, p99 {latency['p99']} ms, max {latency['max']} ms")
+    print(f"statuses {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for the multi-process production server.
+
+Run with ``python start.py --production`` or ``gunicorn -c gunicorn.conf.py main:app``.
+"""
+import os
+
+from config import settings
+from utils.server_utils import MemoryWatchdog, reset_after_fork, worker_count
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 9090)}"
+workers = worker_count()
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app once in the master; workers fork from it and share its pages copy-on-write
+preload_app = True
+
+# Recycle workers gracefully to bound slow leaks and fragmentation
+max_requests = settings.web_max_requests
+max_requests_jitter = settings.web_max_requests_jitter
+timeout = settings.web_timeout_seconds
+graceful_timeout = settings.web_graceful_timeout_seconds
+keepalive = settings.web_keepalive_seconds
+
+loglevel = settings.log_level.lower()
+proc_name = "cloudspy-backend"
+
+
+def post_fork(server, worker):
+    reset_after_fork()
+
+
+def post_worker_init(worker):
+    MemoryWatchdog().start()
+
+
+def when_ready(server):
+    server.log.info(
+        "CloudSpy serving with %s workers (max_requests=%s, memory limit=%s MB, shared cache=%s)",
+        workers, max_requests, settings.web_worker_max_memory_mb, settings.shared_cache_enabled,
+    )
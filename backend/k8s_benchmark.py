@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Kubernetes cost allocation engine
+
+    python k8s_benchmark.py --pods 100000 --days 1
+
+Generates hourly snapshots with the local metrics stand-in and times the
+allocation and rollup passes, without touching the database. Each day is
+``pods`` x 24 pod-hours.
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+import pyarrow as pa
+
+from utils.k8s_utils import allocate, standin_snapshots
+
+
+def run(pods: int, days: int, nodes: int = None, repeat: int = 3) -> dict:
+    started = time.perf_counter()
+    first_day = date.today() - timedelta(days=days)
+    snapshots = pa.concat_tables([
+        standin_snapshots(pods, first_day + timedelta(days=offset), nodes=nodes, seed=offset)
+        for offset in range(days)
+    ])
+    generated = time.perf_counter() - started
+
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        rollups, report = allocate(snapshots)
+        timings.append((time.perf_counter() - began, report))
+    best, report = min(timings, key=lambda timing: timing[0])
+
+    return {
+        "pods_per_day": pods,
+        "days": days,
+        "pod_hours": snapshots.num_rows,
+        "nodes": report["nodes"],
+        "generate_seconds": round(generated, 3),
+        "allocate_seconds": report["allocate_seconds"],
+        "rollup_seconds": report["rollup_seconds"],
+        "total_seconds": round(best, 3),
+        "pod_hours_per_second": round(snapshots.num_rows / best),
+        "rollup_rows": report["rollup_rows"],
+        "reconciliation_error": abs(report["total_cost"] - report["allocated_cost"] - report["idle_cost"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pods", type=int, default=100000, help="Pods per hour")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--nodes", type=int, default=None, help="Defaults to one node per 30 pods")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs is reported")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    result = run(args.pods, args.days, args.nodes, args.repeat)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['pod_hours']} pod-hours ({result['pods_per_day']} pods x {result['days']} days) "
+          f"on {result['nodes']} nodes")
+    print(f"allocate {result['allocate_seconds']}s, rollups {result['rollup_seconds']}s, "
+          f"total {result['total_seconds']}s: {result['pod_hours_per_second']} pod-hours/s")
+    print(f"{result['rollup_rows']} rollup rows, reconciliation error {result['reconciliation_error']:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,16 @@ import os
 from dotenv import load_dotenv
 
 # Import routers
-from routers import aws, azure, gcp, dashboard, auth
+from routers import aws, azure, gcp, dashboard, auth, alerts, resources, cur, allocation, search, admin, k8s, batch
 
 # Import middleware and config
-from middleware import log_requests, error_handler
+from middleware import log_requests, error_handler, conditional_get, trace_requests
 from config import settings
+from utils.alert_utils import alert_dispatcher
+from utils.partition_utils import partition_maintainer
+from utils.client_pool import client_pool
+from utils.recording_utils import recording_warmer
+from utils.trace_utils import install_framework_spans
 
 # Load environment variables
 load_dotenv()
@@ -20,9 +25,16 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     # Startup
     print("CloudSpy Backend starting up...")
+    await alert_dispatcher.start()
+    await partition_maintainer.start()
+    await recording_warmer.start()
     yield
     # Shutdown
     print("CloudSpy Backend shutting down...")
+    await alert_dispatcher.stop()
+    await partition_maintainer.stop()
+    await recording_warmer.stop()
+    client_pool.close_all()
 
 app = FastAPI(
     title="CloudSpy API",
@@ -34,6 +46,10 @@ app = FastAPI(
 # Add custom middleware
 app.middleware("http")(log_requests)
 app.middleware("http")(error_handler)
+app.middleware("http")(conditional_get)
+if settings.tracing_enabled:
+    install_framework_spans()
+    app.middleware("http")(trace_requests)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
@@ -41,6 +57,14 @@ app.include_router(aws.router, prefix="/api/v1")
 app.include_router(azure.router, prefix="/api/v1")
 app.include_router(gcp.router, prefix="/api/v1")
 app.include_router(dashboard.router, prefix="/api/v1")
+app.include_router(alerts.router, prefix="/api/v1")
+app.include_router(resources.router, prefix="/api/v1")
+app.include_router(cur.router, prefix="/api/v1")
+app.include_router(allocation.router, prefix="/api/v1")
+app.include_router(k8s.router, prefix="/api/v1")
+app.include_router(batch.router, prefix="/api/v1")
+app.include_router(search.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 @app.get("/")
 def root():
@@ -4,6 +4,12 @@ import time
 import logging
 from typing import Callable
 
+from utils.cache_utils import dependencies_current, track_dependencies
+from utils.trace_utils import tracer
+from utils.response_cache_utils import (
+    CONDITIONAL_PATHS, PRESERVED_HEADER_PREFIX, RenderedResponse, render, response_cache, response_key
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,4 +48,44 @@ async def error_handler(request: Request, call_next: Callable) -> Response:
                 "error": "Internal server error",
                 "message": "An unexpected error occurred"
             }
-        )
\ No newline at end of file
+        )
+async def conditional_get(request: Request, call_next: Callable) -> Response:
+    """ETag/304 handling, a rendered-body cache and compression for cost endpoints"""
+    if request.method != "GET" or request.url.path not in CONDITIONAL_PATHS:
+        return await call_next(request)
+
+    key = response_key(request)
+    entry = response_cache.get_entry(key)
+    if entry is not None and dependencies_current(entry.value.dependencies):
+        return await render(request, entry.value, "HIT")
+
+    with track_dependencies() as dependencies:
+        response = await call_next(request)
+    if response.status_code != 200 or response.headers.get("content-type", "").split(";")[0] != "application/json":
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    preserved = {name: value for name, value in response.headers.items() if name.startswith(PRESERVED_HEADER_PREFIX)}
+    rendered = RenderedResponse(body, "application/json", list(dependencies), preserved)
+    # Bodies that did not come from cache entries cannot be revalidated, and partial ones
+    # (a provider failed) must not outlive the failure, so neither is kept
+    if rendered.dependencies and dependencies.complete:
+        response_cache.set(key, rendered)
+    return await render(request, rendered, "MISS")
+
+
+async def trace_requests(request: Request, call_next: Callable) -> Response:
+    """Trace sampled requests and those sent with ``X-Trace: 1`` (spans) or ``X-Trace: profile`` (spans and stacks)"""
+    mode = tracer.mode(request.headers.get("X-Trace"))
+    if mode is None:
+        return await call_next(request)
+
+    trace = tracer.start(request.method, request.url.path, mode == "profile")
+    status = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        tracer.finish(trace, status)
+    response.headers["X-Trace-Id"] = trace.id
+    return response
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+CloudSpy database migration script
+
+Applies the SQL files in database/migrations in order and records each one in
+the schema_migrations table, so existing databases can catch up with init.sql.
+"""
+import os
+import sys
+from sqlalchemy import text
+from database import engine
+
+MIGRATIONS_DIR = os.getenv(
+    "MIGRATIONS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database", "migrations"),
+)
+
+def applied_migrations(conn) -> set:
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def run_migrations(target: str = None):
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    with engine.begin() as conn:
+        done = applied_migrations(conn)
+
+    for filename in files:
+        version = filename[:-4]
+        if version in done:
+            continue
+        if target and version > target:
+            break
+        print(f"Applying {filename}...")
+        with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+            sql = f.read()
+        # Each migration runs in its own transaction
+        with engine.begin() as conn:
+            # Executed without parameters so literal % (format(), LIKE) needs no escaping
+            conn.connection.cursor().execute(sql)
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+    print("Migrations up to date")
+
+if __name__ == "__main__":
+    run_migrations(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -14,6 +14,8 @@ class CostMetric(BaseModel):
     unit: str = "USD"
     currency: str = "USD"
     date: Optional[str] = None
+    account_id: Optional[str] = None
+    dimensions: Optional[Dict[str, str]] = Field(default=None, description="Group-by dimension values, e.g. {'SERVICE': ..., 'TAG:team': ...}")
 
 class CloudConnection(BaseModel):
     provider: CloudProvider
@@ -31,8 +33,12 @@ class CostRequest(BaseModel):
 
 class DashboardSummary(BaseModel):
     total_cost: float
+    projected_month_end: Optional[float] = Field(default=None, description="Month-to-date spend plus forecast to month end")
     cost_by_provider: Dict[str, float]
     cost_by_service: List[CostMetric]
+    currency: str = Field(default="USD", description="Reporting currency every amount is converted to")
+    stale_providers: Dict[str, datetime] = Field(default_factory=dict, description="Providers served last-known-good data, with when it was fetched")
+    unavailable_providers: List[str] = Field(default_factory=list, description="Providers that failed with no cached data; counted as 0")
     period: str
     last_updated: datetime
 
@@ -42,4 +48,57 @@ class ConnectionTest(BaseModel):
 
 class ErrorResponse(BaseModel):
     error: str
-    details: Optional[str] = None
\ No newline at end of file
+    details: Optional[str] = None
+class AlertEvaluationRequest(BaseModel):
+    integration_ids: Optional[List[str]] = Field(default=None, description="Integrations that changed; all when omitted")
+
+class TriggeredAlert(BaseModel):
+    alert_id: str
+    user_id: str
+    integration_id: Optional[str] = None
+    name: str
+    threshold_amount: float
+    threshold_type: str
+    current_spend: float
+    triggered_at: Optional[datetime] = None
+
+class AccountCostReport(BaseModel):
+    account_id: str
+    name: Optional[str] = None
+    status: str
+    records: int
+    total: float
+    elapsed_ms: float
+    error: Optional[str] = None
+
+class OrganizationCosts(BaseModel):
+    mode: str = Field(description="payer (single LINKED_ACCOUNT query) or member (per-account role fan-out)")
+    api_calls: int
+    accounts_total: int
+    accounts_failed: int
+    elapsed_ms: float
+    accounts: List[AccountCostReport]
+    costs: List[CostMetric]
+
+class AllocationRuleCreate(BaseModel):
+    user_id: str
+    name: str
+    team: str
+    priority: int = Field(default=100, description="Lower priorities are checked first; the first matching rule wins")
+    match_type: str = Field(description="tag_equals, tag_prefix, tag_regex, resource_prefix, resource_regex, account or service")
+    tag_key: Optional[str] = Field(default=None, description="Tag key for tag_* rules")
+    pattern: str
+    is_active: bool = True
+
+class BatchCostQuery(BaseModel):
+    integration_id: str
+    start_date: str = Field(..., description="Start date in YYYY-MM-DD format")
+    end_date: str = Field(..., description="End date in YYYY-MM-DD format")
+    granularity: str = Field(default="MONTHLY", description="DAILY, MONTHLY, or YEARLY")
+    group_by: List[str] = Field(default=["SERVICE"], description="Group by dimensions, e.g. SERVICE, REGION, TAG:team")
+
+class BatchCostRequest(BaseModel):
+    queries: List[BatchCostQuery]
+    user_id: Optional[str] = Field(default=None, description="Reject integrations that do not belong to this user")
+    currency: Optional[str] = Field(default=None, description="Reporting currency; defaults to the configured one")
+    max_concurrency: Optional[int] = Field(default=None, ge=1, description="Queries run at once for this batch, capped by the server limit")
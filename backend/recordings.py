@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Manage recorded provider responses
+
+    python recordings.py stats
+    python recordings.py export fixtures/aws.jsonl --provider aws
+    python recordings.py import fixtures/aws.jsonl --path /tmp/replay.db
+    python recordings.py prune --older-than-days 30
+
+Recordings are made by running the API with RECORDING_MODE=record or replay.
+Exported JSON lines files can be checked in as fixtures: import one into a
+fresh store and run the API, benchmark.py targets or test_api.py against a
+server started with RECORDING_MODE=offline, which never calls a provider.
+"""
+import argparse
+import json
+
+from utils.recording_utils import ResponseStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "export", "import", "prune"])
+    parser.add_argument("file", nargs="?", help="JSON lines fixture file for export and import")
+    parser.add_argument("--path", default=None, help="SQLite store; defaults to RECORDING_PATH")
+    parser.add_argument("--provider", default=None, help="export: only this provider's recordings")
+    parser.add_argument("--older-than-days", type=float, default=30.0, help="prune: delete recordings older than this")
+    args = parser.parse_args()
+
+    store = ResponseStore(path=args.path, mode="offline")
+    if args.command in ("export", "import") and not args.file:
+        parser.error(f"{args.command} needs a fixture file")
+    if args.command == "export":
+        print(f"Exported {store.export(args.file, args.provider)} recordings to {args.file}")
+    elif args.command == "import":
+        print(f"Imported {store.import_file(args.file)} recordings into {store.path}")
+    elif args.command == "prune":
+        print(f"Deleted {store.prune(args.older_than_days * 86400)} recordings")
+    else:
+        print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import os
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_db, pool_status
+from utils.cache_utils import cost_cache
+from utils.client_pool import client_pool
+from utils.fx_utils import fx_rates, resolve_rate_path
+from utils.partition_utils import list_partitions, maintain_partitions, maintenance_session
+from utils.recording_utils import response_store, warm_cost_caches
+from utils.server_utils import available_cpus, private_memory_mb, worker_count
+from utils.shared_cache_utils import shared_store
+from utils.trace_utils import tracer
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+@router.get("/partitions")
+def get_cost_data_partitions(db: Session = Depends(get_db)):
+    """List the monthly cost_data partitions"""
+    try:
+        return {"partitions": list_partitions(db)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/partitions/maintain")
+def maintain_cost_data_partitions(
+    months_ahead: Optional[int] = Query(None, ge=0, le=24, description="Months to pre-create; defaults to the configured value"),
+    keep_months: Optional[int] = Query(None, ge=0, description="Months of partitions to keep; 0 disables retention"),
+    archive: Optional[bool] = Query(None, description="Archive retired partitions instead of dropping them")
+):
+    """Create upcoming partitions and retire those outside the retention window"""
+    try:
+        with maintenance_session() as db:
+            if db is None:
+                raise HTTPException(status_code=409, detail="Partition maintenance is already running")
+            return maintain_partitions(db, months_ahead, keep_months, archive)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/db/pools")
+def get_database_pools():
+    """Connection pool occupancy, saturation and checkout wait times"""
+    return pool_status()
+
+@router.get("/clients")
+def get_provider_clients():
+    """Pooled provider SDK clients with client and HTTP connection reuse rates"""
+    return client_pool.stats()
+
+@router.get("/fx")
+def get_fx_rates():
+    """Currencies and date coverage of the in-memory FX rate table"""
+    return fx_rates.table().summary()
+
+@router.post("/fx/load")
+def load_fx_rates(
+    path: Optional[str] = Query(None, description="CSV or JSON rate file under FX_RATES_ROOT; defaults to the configured FX_RATES_FILE"),
+    db: Session = Depends(get_db)
+):
+    """Store a rate file in fx_rates and refresh the cached table"""
+    try:
+        return {**fx_rates.load_file(db, resolve_rate_path(path)), **fx_rates.table().summary()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/recordings")
+def get_recordings():
+    """Mode, size and replay counters of the provider response store"""
+    try:
+        return response_store.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/recordings/warm")
+def warm_from_recordings():
+    """Replay recorded cost queries into this worker's cost caches without calling providers"""
+    if not response_store.enabled:
+        raise HTTPException(status_code=400, detail="Provider response recording is off")
+    try:
+        return warm_cost_caches()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/server")
+def get_server_process():
+    """The worker process serving this request, its memory and cache coordination stats"""
+    return {
+        "pid": os.getpid(),
+        "configured_workers": worker_count(),
+        "available_cpus": available_cpus(),
+        "private_memory_mb": round(private_memory_mb(), 1),
+        "cost_cache": cost_cache.stats(),
+        "shared_cache": shared_store.stats() if shared_store is not None else None,
+    }
+
+
+def _trace(trace_id: str):
+    trace = tracer.get(trace_id)
+    if trace is None:
+        # Traces are kept per worker process; retry until the request lands on the worker that served it
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found in worker {os.getpid()}")
+    return trace
+
+
+@router.get("/traces")
+def list_traces(limit: int = Query(50, ge=1, le=1000)):
+    """Most recent traced requests in this worker, newest first"""
+    return {
+        "enabled": settings.tracing_enabled,
+        "sample_rate": settings.trace_sample_rate,
+        "traces": tracer.recent(limit),
+    }
+
+
+@router.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """A trace with all of its spans"""
+    return _trace(trace_id).to_dict()
+
+
+@router.get("/traces/{trace_id}/folded", response_class=PlainTextResponse)
+def get_trace_folded(trace_id: str, source: str = Query("spans", pattern="^(spans|samples)$")):
+    """Collapsed stacks for flame graph tools, from span self times or from sampled stacks"""
+    return _trace(trace_id).folded(source)
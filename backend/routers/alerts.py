@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List
+from sqlalchemy.orm import Session
+from database import get_db
+from utils.alert_utils import evaluate_and_dispatch
+from models.schemas import AlertEvaluationRequest, TriggeredAlert
+
+router = APIRouter(prefix="/alerts", tags=["Alerts"])
+
+@router.post("/evaluate", response_model=List[TriggeredAlert])
+def evaluate_alerts(request: AlertEvaluationRequest, db: Session = Depends(get_db)):
+    """Evaluate active cost alerts and dispatch notifications for those that fired"""
+    try:
+        return evaluate_and_dispatch(db, request.integration_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
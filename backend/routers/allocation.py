@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import get_db
+from models.schemas import AllocationRuleCreate
+from utils.allocation_utils import validate_rule, apply_allocation
+
+router = APIRouter(prefix="/allocation", tags=["Allocation"])
+
+_RULE_COLUMNS = """id::text, user_id::text, name, team, priority, match_type, tag_key, pattern,
+                   is_active, created_at, updated_at"""
+
+@router.get("/rules")
+def list_allocation_rules(user_id: str = Query(...), db: Session = Depends(get_db)):
+    """List a user's allocation rules in evaluation order"""
+    try:
+        rows = db.execute(text(f"""
+            SELECT {_RULE_COLUMNS} FROM allocation_rules
+            WHERE user_id = CAST(:user_id AS uuid)
+            ORDER BY priority, created_at, id
+        """), {"user_id": user_id})
+        return {"rules": [dict(row._mapping) for row in rows]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/rules")
+def create_allocation_rule(rule: AllocationRuleCreate, db: Session = Depends(get_db)):
+    """Create an allocation rule"""
+    try:
+        validate_rule(rule.match_type, rule.pattern, rule.tag_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        row = db.execute(text(f"""
+            INSERT INTO allocation_rules (user_id, name, team, priority, match_type, tag_key, pattern, is_active)
+            VALUES (CAST(:user_id AS uuid), :name, :team, :priority, :match_type, :tag_key, :pattern, :is_active)
+            RETURNING {_RULE_COLUMNS}
+        """), rule.model_dump()).first()
+        db.commit()
+        return dict(row._mapping)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/rules/{rule_id}")
+def delete_allocation_rule(rule_id: str, db: Session = Depends(get_db)):
+    """Delete an allocation rule; re-apply allocation to update existing rows"""
+    try:
+        deleted = db.execute(text("""
+            DELETE FROM allocation_rules WHERE id = CAST(:rule_id AS uuid) RETURNING id
+        """), {"rule_id": rule_id}).first()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Allocation rule not found")
+    return {"deleted": rule_id}
+
+@router.post("/apply/{integration_id}")
+def apply_integration_allocation(
+    integration_id: str,
+    only_new: bool = Query(False, description="Only allocate rows that were never allocated"),
+    db: Session = Depends(get_db)
+):
+    """Re-run the owner's allocation rules over an integration's cost rows"""
+    try:
+        return apply_allocation(db, integration_id, only_new=only_new)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 from datetime import datetime, timedelta
-from utils.aws_utils import AWSCostManager
-from models.schemas import CostMetric, ConnectionTest, ErrorResponse
+from utils.aws_utils import AWSCostManager, AWSOrganizationManager
+from utils.groupby_utils import groupby_planner
+from utils.delta_utils import delta_tracker, series_key
+from utils.page_utils import PageRequestError, cost_page
+from config import settings
+from models.schemas import CostMetric, ConnectionTest, ErrorResponse, OrganizationCosts
 
 router = APIRouter(prefix="/aws", tags=["AWS"])
 
@@ -32,6 +36,7 @@ def test_aws_connection(connection: ConnectionTest):
 
 @router.get("/costs", response_model=List[CostMetric])
 def get_aws_costs(
+    response: Response,
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     role_arn: Optional[str] = Query(None, description="AWS IAM Role ARN"),
@@ -39,28 +44,86 @@ def get_aws_costs(
     secret_key: Optional[str] = Query(None, description="AWS Secret Key"),
     granularity: str = Query("MONTHLY", description="DAILY, MONTHLY, or YEARLY"),
     group_by: Optional[str] = Query(
-        "SERVICE", description="Comma-separated list of dimensions"
+        "SERVICE", description="Comma-separated dimensions, e.g. SERVICE,REGION,TAG:team"
     ),
+    since: Optional[str] = Query(None, description="X-Cost-Watermark from an earlier response; only days revised since are returned"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.cost_page_max_size, description="Page size; returns pages in (date, service) order"),
+    cursor: Optional[str] = Query(None, description="X-Cost-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated CostMetric fields to return, e.g. date,service,amount"),
 ):
     """Get AWS cost data"""
     try:
         # Validate date format
         datetime.strptime(start_date, "%Y-%m-%d")
         datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Invalid date format. Use YYYY-MM-DD"
+        )
 
+    try:
         manager = AWSCostManager(
             role_arn=role_arn, access_key=access_key, secret_key=secret_key
         )
 
         group_by_list = group_by.split(",") if group_by else ["SERVICE"]
-        costs = manager.get_costs(start_date, end_date, granularity, group_by_list)
+        if limit or cursor or fields:
+            # Each page is sliced from the cached result instead of querying the provider again
+            return cost_page(manager, start_date, end_date, granularity, group_by_list,
+                             limit, cursor, fields, since)
+        costs, report = groupby_planner.get_costs(manager, start_date, end_date, granularity, group_by_list)
+        costs, headers = delta_tracker.delta(
+            series_key(manager, start_date, end_date, granularity, group_by_list),
+            report["data_version"], costs, since
+        )
+        response.headers.update(headers)
+        if "stale_since" in report:
+            response.headers["X-Cost-Stale-Since"] = report["stale_since"]
 
         return costs
 
+    except PageRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/organization/costs", response_model=OrganizationCosts)
+def get_aws_organization_costs(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    role_arn: Optional[str] = Query(None, description="Management account IAM Role ARN"),
+    access_key: Optional[str] = Query(None, description="AWS Access Key"),
+    secret_key: Optional[str] = Query(None, description="AWS Secret Key"),
+    granularity: str = Query("MONTHLY", description="DAILY, MONTHLY, or YEARLY"),
+    group_by: Optional[str] = Query("SERVICE", description="Comma-separated list of dimensions"),
+    mode: str = Query("auto", description="auto, payer or member"),
+    member_role_name: Optional[str] = Query(None, description="Role assumed in member accounts"),
+    account_ids: Optional[str] = Query(None, description="Comma-separated account ids; all when omitted"),
+):
+    """Get per-account costs across an AWS Organization"""
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
         raise HTTPException(
             status_code=400, detail="Invalid date format. Use YYYY-MM-DD"
         )
+
+    try:
+        manager = AWSOrganizationManager(
+            AWSCostManager(role_arn=role_arn, access_key=access_key, secret_key=secret_key),
+            member_role_name=member_role_name,
+        )
+
+        group_by_list = group_by.split(",") if group_by else ["SERVICE"]
+        account_list = [a.strip() for a in account_ids.split(",") if a.strip()] if account_ids else None
+        return manager.get_costs(start_date, end_date, granularity, group_by_list, mode, account_list)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional
 from datetime import datetime
 from utils.azure_utils import AzureCostManager
+from utils.groupby_utils import groupby_planner
+from utils.delta_utils import delta_tracker, series_key
+from utils.page_utils import PageRequestError, cost_page
+from config import settings
 from models.schemas import CostMetric, ConnectionTest
 
 router = APIRouter(prefix="/azure", tags=["Azure"])
@@ -29,6 +33,7 @@ def test_azure_connection(connection: ConnectionTest):
 
 @router.get("/costs", response_model=List[CostMetric])
 def get_azure_costs(
+    response: Response,
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     subscription_id: str = Query(..., description="Azure Subscription ID"),
@@ -36,14 +41,21 @@ def get_azure_costs(
     client_id: Optional[str] = Query(None, description="Azure Client ID"),
     client_secret: Optional[str] = Query(None, description="Azure Client Secret"),
     granularity: str = Query("Monthly", description="Daily or Monthly"),
-    group_by: Optional[str] = Query("SERVICE", description="Comma-separated list of dimensions")
+    group_by: Optional[str] = Query("SERVICE", description="Comma-separated list of dimensions"),
+    since: Optional[str] = Query(None, description="X-Cost-Watermark from an earlier response; only days revised since are returned"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.cost_page_max_size, description="Page size; returns pages in (date, service) order"),
+    cursor: Optional[str] = Query(None, description="X-Cost-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated CostMetric fields to return, e.g. date,service,amount"),
 ):
     """Get Azure cost data"""
     try:
         # Validate date format
         datetime.strptime(start_date, "%Y-%m-%d")
         datetime.strptime(end_date, "%Y-%m-%d")
-        
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    try:
         manager = AzureCostManager(
             tenant_id=tenant_id,
             client_id=client_id,
@@ -52,12 +64,25 @@ def get_azure_costs(
         )
         
         group_by_list = group_by.split(",") if group_by else ["SERVICE"]
-        costs = manager.get_costs(start_date, end_date, granularity, group_by_list)
+        if limit or cursor or fields:
+            # Each page is sliced from the cached result instead of querying the provider again
+            return cost_page(manager, start_date, end_date, granularity, group_by_list,
+                             limit, cursor, fields, since)
+        costs, report = groupby_planner.get_costs(manager, start_date, end_date, granularity, group_by_list)
+        costs, headers = delta_tracker.delta(
+            series_key(manager, start_date, end_date, granularity, group_by_list),
+            report["data_version"], costs, since
+        )
+        response.headers.update(headers)
+        if "stale_since" in report:
+            response.headers["X-Cost-Stale-Since"] = report["stale_since"]
         
         return costs
         
+    except PageRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError as e:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from config import settings
+from database import get_read_db
+from models.schemas import BatchCostRequest
+from utils.batch_utils import canonical_id, stream_batch
+from utils.fx_utils import fx_rates
+from utils.integration_utils import get_integrations
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+_STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.post("/costs")
+def get_batch_costs(request: BatchCostRequest, db: Session = Depends(get_read_db)):
+    """Costs for many stored integrations at once, streamed as NDJSON lines in completion order"""
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    if len(request.queries) > settings.batch_max_queries:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_queries} queries per batch")
+    try:
+        currency = fx_rates.check(request.currency or settings.reporting_currency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # One lookup for the whole batch; ids that are malformed or missing come back as per-query errors
+        integration_ids = {canonical_id(q.integration_id) for q in request.queries} - {None}
+        integrations = get_integrations(db, list(integration_ids)) if integration_ids else {}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    concurrency = min(request.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    events = stream_batch(request.queries, integrations, currency, concurrency, request.user_id)
+    return StreamingResponse(events, media_type="application/x-ndjson", headers=_STREAM_HEADERS)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import get_db
+from utils.integration_utils import get_integration
+from utils.cur_utils import ingest_cur, resolve_cur_path
+
+router = APIRouter(prefix="/cur", tags=["CUR"])
+
+@router.post("/ingest/{integration_id}")
+def ingest_cur_exports(
+    integration_id: str,
+    path: Optional[str] = Query(None, description="Directory under the CUR root; defaults to the integration's cur_path"),
+    force: bool = Query(False, description="Reprocess manifests even if unchanged"),
+    db: Session = Depends(get_db)
+):
+    """Stream AWS Cost and Usage Report files into cost_data"""
+    integration = get_integration(db, integration_id)
+    if not integration:
+        raise HTTPException(status_code=404, detail="Integration not found")
+    if integration["provider"] != "aws":
+        raise HTTPException(status_code=400, detail="CUR ingestion is only available for AWS integrations")
+
+    try:
+        configuration = integration.get("configuration") or {}
+        root = resolve_cur_path(path or configuration.get("cur_path"))
+        return ingest_cur(db, integration_id, root, force=force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/manifests/{integration_id}")
+def list_cur_manifests(integration_id: str, db: Session = Depends(get_db)):
+    """List CUR manifests already ingested for an integration"""
+    try:
+        rows = db.execute(text("""
+            SELECT manifest_key, manifest_path, fingerprint, line_items, rows_written, processed_at
+            FROM cur_manifests
+            WHERE integration_id = CAST(:integration_id AS uuid)
+            ORDER BY manifest_key
+        """), {"integration_id": integration_id})
+        return {"manifests": [dict(row._mapping) for row in rows]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,202 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable
 from datetime import datetime, timedelta
+import asyncio
+import json
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_db, get_async_read_db
+from config import settings
 from utils.aws_utils import AWSCostManager
 from utils.azure_utils import AzureCostManager
 from utils.gcp_utils import GCPCostManager
 from models.schemas import DashboardSummary, CostMetric, CloudProvider
+from utils.forecast_utils import cost_forecaster, daily_series
+from utils.breaker_utils import provider_breakers
+from utils.cache_utils import cached_costs, mark_incomplete, track_stale_reads
+from utils.fx_utils import convert_amounts, fx_rates, normalize_costs
+from utils.timeseries_utils import build_timeseries, rows_to_columns
+from utils.delta_utils import stored_cost_delta
+from utils.groupby_utils import normalize_dimensions
+from utils.period_utils import comparison_windows, compare_source, cost_rows, stored_revision, stored_rows, summarize
+from utils.trace_utils import traced
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+def _build_manager(provider: str, aws_role_arn=None, aws_access_key=None, aws_secret_key=None,
+                   azure_tenant_id=None, azure_client_id=None, azure_client_secret=None,
+                   azure_subscription_id=None, gcp_project_id=None, gcp_service_account_key=None):
+    """Build the cost manager for a provider from dashboard credential parameters"""
+    if provider == "aws" and (aws_role_arn or aws_access_key):
+        return AWSCostManager(aws_role_arn, aws_access_key, aws_secret_key)
+    if provider == "azure" and azure_subscription_id:
+        return AzureCostManager(azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id)
+    if provider == "gcp" and gcp_project_id:
+        return GCPCostManager(gcp_project_id, gcp_service_account_key)
+    return None
+
+# Granularity each provider's API expects for daily data
+_DAILY_GRANULARITY = {"aws": "DAILY", "azure": "Daily", "gcp": "DAILY"}
+
+def _provider_managers(providers: List[str], aws_role_arn=None, aws_access_key=None, aws_secret_key=None,
+                       azure_tenant_id=None, azure_client_id=None, azure_client_secret=None,
+                       azure_subscription_id=None, gcp_project_id=None, gcp_service_account_key=None) -> Dict[str, Any]:
+    """Managers for the requested providers that have credentials, in request order"""
+    managers = {}
+    for provider in providers:
+        manager = _build_manager(
+            provider, aws_role_arn, aws_access_key, aws_secret_key,
+            azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id,
+            gcp_project_id, gcp_service_account_key
+        )
+        if manager is not None:
+            managers[provider] = manager
+    return managers
+
+def _summary_window(start_date: Optional[str], end_date: Optional[str]):
+    """Requested period (default last 30 days) and the start of the daily fetch"""
+    # Default to last 30 days if dates not provided
+    if not end_date:
+        end_date = datetime.utcnow().date().strftime("%Y-%m-%d")
+    if not start_date:
+        start_date = (datetime.utcnow().date() - timedelta(days=30)).strftime("%Y-%m-%d")
+    # Daily data from the start of the month feeds the month-end projection
+    month_start = datetime.strptime(end_date, "%Y-%m-%d").date().replace(day=1).strftime("%Y-%m-%d")
+    return start_date, end_date, min(start_date, month_start)
+
+def _reporting_currency(currency: Optional[str]) -> str:
+    try:
+        return fx_rates.check(currency or settings.reporting_currency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@traced("dashboard.provider_summary")
+def _provider_summary(provider: str, manager, start_date: str, end_date: str, fetch_start: str,
+                      currency: str) -> Dict[str, Any]:
+    """One provider's costs for the period, in ``currency``, plus its daily series for forecasting"""
+    with track_stale_reads() as stale:
+        daily_costs = normalize_costs(
+            cached_costs(manager, fetch_start, end_date, _DAILY_GRANULARITY[provider]), currency
+        )
+    costs = [cost for cost in daily_costs if cost.date and cost.date[:10] >= start_date]
+    return {
+        "total": sum(cost.amount for cost in costs),
+        "costs": costs,
+        "series": daily_series(daily_costs, manager.identity),
+        "stale_since": datetime.utcfromtimestamp(min(stale.values())) if stale else None,
+    }
+
+def _service_totals(costs: List[CostMetric], currency: str) -> List[CostMetric]:
+    """Costs summed per service, largest first"""
+    service_costs = {}
+    for cost in costs:
+        if cost.service in service_costs:
+            service_costs[cost.service] += cost.amount
+        else:
+            service_costs[cost.service] = cost.amount
+    return [
+        CostMetric(service=service, amount=amount, unit=currency, currency=currency)
+        for service, amount in sorted(service_costs.items(), key=lambda x: x[1], reverse=True)
+    ]
+
+@traced("dashboard.build_summary")
+def _build_summary(results: Dict[str, Dict[str, Any]], start_date: str, end_date: str,
+                   currency: str) -> DashboardSummary:
+    """Combine per-provider results; failed providers count as zero"""
+    cost_by_provider = {}
+    all_costs = []
+    forecast_series = {}
+    stale_providers = {}
+    unavailable_providers = []
+    for provider, result in results.items():
+        if "error" in result:
+            cost_by_provider[provider] = 0.0
+            unavailable_providers.append(provider)
+            continue
+        if result["stale_since"]:
+            stale_providers[provider] = result["stale_since"]
+        cost_by_provider[provider] = result["total"]
+        all_costs.extend(result["costs"])
+        forecast_series.update(result["series"])
+
+    projected_month_end = None
+    if forecast_series:
+        try:
+            projected_month_end = cost_forecaster.project_month_end(forecast_series)
+        except Exception as e:
+            print(f"Cost forecast failed: {e}")
+
+    return DashboardSummary(
+        total_cost=sum(cost_by_provider.values()),
+        projected_month_end=projected_month_end,
+        cost_by_provider=cost_by_provider,
+        cost_by_service=_service_totals(all_costs, currency)[:10],  # Top 10 services
+        currency=currency,
+        stale_providers=stale_providers,
+        unavailable_providers=unavailable_providers,
+        period=f"{start_date} to {end_date}",
+        last_updated=datetime.utcnow()
+    )
+
+@traced("dashboard.comparison_entry")
+def _comparison_entry(manager, start_date: str, end_date: str, currency: str) -> Dict[str, Any]:
+    with track_stale_reads() as stale:
+        costs = normalize_costs(cached_costs(manager, start_date, end_date), currency)
+    entry = {
+        "total": sum(cost.amount for cost in costs),
+        "services": len(set(cost.service for cost in costs)),
+        "top_service": max(costs, key=lambda x: x.amount).service if costs else "N/A"
+    }
+    if stale:
+        entry["stale_since"] = datetime.utcfromtimestamp(min(stale.values()))
+    return entry
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+async def _stream_providers(managers: Dict[str, Any], fetch: Callable[[str, Any], Dict[str, Any]],
+                            on_result: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+                            finish: Callable[[Dict[str, Dict[str, Any]]], Any]) -> AsyncIterator[str]:
+    """Fetch providers concurrently and emit an SSE event as each one completes"""
+    started = time.perf_counter()
+    yield _sse("start", {"providers": list(managers)})
+
+    async def run(provider: str, manager):
+        try:
+            return provider, await asyncio.to_thread(fetch, provider, manager)
+        except Exception as e:
+            return provider, {"error": str(e)}
+
+    tasks = [asyncio.create_task(run(provider, manager)) for provider, manager in managers.items()]
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            provider, result = await next_done
+            results[provider] = result
+            payload = on_result(provider, result)
+            payload.update(
+                provider=provider,
+                completed=len(results),
+                pending=len(managers) - len(results),
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+            yield _sse("provider_error" if "error" in result else "provider", payload)
+        yield _sse("summary", finish(results))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 @router.get("/summary", response_model=DashboardSummary)
 def get_dashboard_summary(
     start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
     end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
     # AWS credentials
     aws_role_arn: Optional[str] = Query(None),
     aws_access_key: Optional[str] = Query(None),
@@ -27,97 +212,84 @@ def get_dashboard_summary(
 ):
     """Get comprehensive dashboard summary across all cloud providers"""
     try:
-        # Default to last 30 days if dates not provided
-        if not end_date:
-            end_date = datetime.utcnow().date().strftime("%Y-%m-%d")
-        if not start_date:
-            start_date = (datetime.utcnow().date() - timedelta(days=30)).strftime("%Y-%m-%d")
-        
-        total_cost = 0.0
-        cost_by_provider = {}
-        all_costs = []
-        
-        # AWS costs
-        if aws_role_arn or aws_access_key:
-            try:
-                aws_manager = AWSCostManager(
-                    role_arn=aws_role_arn,
-                    access_key=aws_access_key,
-                    secret_key=aws_secret_key
-                )
-                aws_costs = aws_manager.get_costs(start_date, end_date)
-                aws_total = sum(cost.amount for cost in aws_costs)
-                cost_by_provider["aws"] = aws_total
-                total_cost += aws_total
-                all_costs.extend(aws_costs)
-            except Exception as e:
-                print(f"AWS cost retrieval failed: {e}")
-                cost_by_provider["aws"] = 0.0
-        
-        # Azure costs
-        if azure_subscription_id:
-            try:
-                azure_manager = AzureCostManager(
-                    tenant_id=azure_tenant_id,
-                    client_id=azure_client_id,
-                    client_secret=azure_client_secret,
-                    subscription_id=azure_subscription_id
-                )
-                azure_costs = azure_manager.get_costs(start_date, end_date)
-                azure_total = sum(cost.amount for cost in azure_costs)
-                cost_by_provider["azure"] = azure_total
-                total_cost += azure_total
-                all_costs.extend(azure_costs)
-            except Exception as e:
-                print(f"Azure cost retrieval failed: {e}")
-                cost_by_provider["azure"] = 0.0
-        
-        # GCP costs
-        if gcp_project_id:
+        currency = _reporting_currency(currency)
+        start_date, end_date, fetch_start = _summary_window(start_date, end_date)
+        managers = _provider_managers(
+            ["aws", "azure", "gcp"], aws_role_arn, aws_access_key, aws_secret_key,
+            azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id,
+            gcp_project_id, gcp_service_account_key
+        )
+
+        results = {}
+        for provider, manager in managers.items():
             try:
-                gcp_manager = GCPCostManager(
-                    project_id=gcp_project_id,
-                    service_account_key=gcp_service_account_key
-                )
-                gcp_costs = gcp_manager.get_costs(start_date, end_date)
-                gcp_total = sum(cost.amount for cost in gcp_costs)
-                cost_by_provider["gcp"] = gcp_total
-                total_cost += gcp_total
-                all_costs.extend(gcp_costs)
+                results[provider] = _provider_summary(provider, manager, start_date, end_date, fetch_start, currency)
             except Exception as e:
-                print(f"GCP cost retrieval failed: {e}")
-                cost_by_provider["gcp"] = 0.0
-        
-        # Aggregate costs by service across all providers
-        service_costs = {}
-        for cost in all_costs:
-            if cost.service in service_costs:
-                service_costs[cost.service] += cost.amount
-            else:
-                service_costs[cost.service] = cost.amount
-        
-        # Convert to list of CostMetric objects
-        cost_by_service = [
-            CostMetric(service=service, amount=amount, unit="USD")
-            for service, amount in sorted(service_costs.items(), key=lambda x: x[1], reverse=True)
-        ]
-        
-        return DashboardSummary(
-            total_cost=total_cost,
-            cost_by_provider=cost_by_provider,
-            cost_by_service=cost_by_service[:10],  # Top 10 services
-            period=f"{start_date} to {end_date}",
-            last_updated=datetime.utcnow()
-        )
+                print(f"{provider.upper()} cost retrieval failed: {e}")
+                results[provider] = {"error": str(e)}
+                mark_incomplete()
+
+        return _build_summary(results, start_date, end_date, currency)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/summary/stream")
+def stream_dashboard_summary(
+    start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
+    aws_role_arn: Optional[str] = Query(None),
+    aws_access_key: Optional[str] = Query(None),
+    aws_secret_key: Optional[str] = Query(None),
+    azure_tenant_id: Optional[str] = Query(None),
+    azure_client_id: Optional[str] = Query(None),
+    azure_client_secret: Optional[str] = Query(None),
+    azure_subscription_id: Optional[str] = Query(None),
+    gcp_project_id: Optional[str] = Query(None),
+    gcp_service_account_key: Optional[str] = Query(None)
+):
+    """Dashboard summary as Server-Sent Events: one event per provider as it finishes, then the full summary"""
+    currency = _reporting_currency(currency)
+    try:
+        start_date, end_date, fetch_start = _summary_window(start_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    managers = _provider_managers(
+        ["aws", "azure", "gcp"], aws_role_arn, aws_access_key, aws_secret_key,
+        azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id,
+        gcp_project_id, gcp_service_account_key
+    )
+    running_total = {"value": 0.0}
+
+    def on_result(provider: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" in result:
+            return {"error": result["error"], "combined_total": running_total["value"]}
+        running_total["value"] += result["total"]
+        return {
+            "total": result["total"],
+            "top_services": _service_totals(result["costs"], currency)[:5],
+            "stale_since": result["stale_since"],
+            "combined_total": running_total["value"],
+        }
+
+    events = _stream_providers(
+        managers,
+        lambda provider, manager: _provider_summary(provider, manager, start_date, end_date, fetch_start, currency),
+        on_result,
+        lambda results: _build_summary({p: results[p] for p in managers if p in results}, start_date, end_date,
+                                       currency),
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=_SSE_HEADERS)
+
 @router.get("/costs/comparison")
 def get_cost_comparison(
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     providers: str = Query(..., description="Comma-separated list of providers (aws,azure,gcp)"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
     # Credentials (same as above)
     aws_role_arn: Optional[str] = Query(None),
     aws_access_key: Optional[str] = Query(None),
@@ -131,48 +303,23 @@ def get_cost_comparison(
 ):
     """Compare costs across selected cloud providers"""
     try:
-        provider_list = [p.strip().lower() for p in providers.split(",")]
+        currency = _reporting_currency(currency)
+        managers = _provider_managers(
+            [p.strip().lower() for p in providers.split(",")], aws_role_arn, aws_access_key, aws_secret_key,
+            azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id,
+            gcp_project_id, gcp_service_account_key
+        )
         comparison_data = {}
         
-        for provider in provider_list:
-            if provider == "aws" and (aws_role_arn or aws_access_key):
-                try:
-                    manager = AWSCostManager(aws_role_arn, aws_access_key, aws_secret_key)
-                    costs = manager.get_costs(start_date, end_date)
-                    comparison_data["aws"] = {
-                        "total": sum(cost.amount for cost in costs),
-                        "services": len(set(cost.service for cost in costs)),
-                        "top_service": max(costs, key=lambda x: x.amount).service if costs else "N/A"
-                    }
-                except Exception as e:
-                    comparison_data["aws"] = {"error": str(e)}
-            
-            elif provider == "azure" and azure_subscription_id:
-                try:
-                    manager = AzureCostManager(azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id)
-                    costs = manager.get_costs(start_date, end_date)
-                    comparison_data["azure"] = {
-                        "total": sum(cost.amount for cost in costs),
-                        "services": len(set(cost.service for cost in costs)),
-                        "top_service": max(costs, key=lambda x: x.amount).service if costs else "N/A"
-                    }
-                except Exception as e:
-                    comparison_data["azure"] = {"error": str(e)}
-            
-            elif provider == "gcp" and gcp_project_id:
-                try:
-                    manager = GCPCostManager(gcp_project_id, gcp_service_account_key)
-                    costs = manager.get_costs(start_date, end_date)
-                    comparison_data["gcp"] = {
-                        "total": sum(cost.amount for cost in costs),
-                        "services": len(set(cost.service for cost in costs)),
-                        "top_service": max(costs, key=lambda x: x.amount).service if costs else "N/A"
-                    }
-                except Exception as e:
-                    comparison_data["gcp"] = {"error": str(e)}
+        for provider, manager in managers.items():
+            try:
+                comparison_data[provider] = _comparison_entry(manager, start_date, end_date, currency)
+            except Exception as e:
+                comparison_data[provider] = {"error": str(e)}
         
         return {
             "period": f"{start_date} to {end_date}",
+            "currency": currency,
             "providers": comparison_data,
             "total_across_providers": sum(
                 data.get("total", 0) for data in comparison_data.values() 
@@ -180,18 +327,313 @@ def get_cost_comparison(
             )
         }
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/costs/comparison/stream")
+def stream_cost_comparison(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    providers: str = Query(..., description="Comma-separated list of providers (aws,azure,gcp)"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
+    aws_role_arn: Optional[str] = Query(None),
+    aws_access_key: Optional[str] = Query(None),
+    aws_secret_key: Optional[str] = Query(None),
+    azure_tenant_id: Optional[str] = Query(None),
+    azure_client_id: Optional[str] = Query(None),
+    azure_client_secret: Optional[str] = Query(None),
+    azure_subscription_id: Optional[str] = Query(None),
+    gcp_project_id: Optional[str] = Query(None),
+    gcp_service_account_key: Optional[str] = Query(None)
+):
+    """Provider comparison as Server-Sent Events, one event per provider as it finishes"""
+    currency = _reporting_currency(currency)
+    managers = _provider_managers(
+        [p.strip().lower() for p in providers.split(",")], aws_role_arn, aws_access_key, aws_secret_key,
+        azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id,
+        gcp_project_id, gcp_service_account_key
+    )
+    running_total = {"value": 0.0}
+
+    def on_result(provider: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" not in result:
+            running_total["value"] += result["total"]
+        return {**result, "combined_total": running_total["value"]}
+
+    def finish(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "period": f"{start_date} to {end_date}",
+            "currency": currency,
+            "providers": {provider: results[provider] for provider in managers if provider in results},
+            "total_across_providers": running_total["value"],
+        }
+
+    events = _stream_providers(
+        managers,
+        lambda provider, manager: _comparison_entry(manager, start_date, end_date, currency),
+        on_result,
+        finish,
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=_SSE_HEADERS)
+
+@router.get("/costs/period-comparison")
+def get_period_comparison(
+    mode: str = Query("mom", description="wow, mom, yoy or custom"),
+    as_of: Optional[str] = Query(None, description="Last day of the current period (YYYY-MM-DD); defaults to yesterday"),
+    current_start: Optional[str] = Query(None, description="custom mode: current period start"),
+    current_end: Optional[str] = Query(None, description="custom mode: current period end (exclusive)"),
+    previous_start: Optional[str] = Query(None, description="custom mode: previous period start"),
+    previous_end: Optional[str] = Query(None, description="custom mode: previous period end (exclusive)"),
+    providers: str = Query("aws,azure,gcp", description="Comma-separated list of providers (aws,azure,gcp)"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
+    top: int = Query(settings.period_top_movers, ge=1, le=1000, description="Number of top movers returned"),
+    integration_id: Optional[str] = Query(None, description="Compare stored cost_data for this integration instead of the provider APIs"),
+    aws_role_arn: Optional[str] = Query(None),
+    aws_access_key: Optional[str] = Query(None),
+    aws_secret_key: Optional[str] = Query(None),
+    azure_tenant_id: Optional[str] = Query(None),
+    azure_client_id: Optional[str] = Query(None),
+    azure_client_secret: Optional[str] = Query(None),
+    azure_subscription_id: Optional[str] = Query(None),
+    gcp_project_id: Optional[str] = Query(None),
+    gcp_service_account_key: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
+):
+    """Period-over-period deltas and top movers per service and provider, fetching each source once"""
+    try:
+        currency = _reporting_currency(currency)
+        current, previous = comparison_windows(
+            mode, as_of, current_start, current_end, previous_start, previous_end
+        )
+
+        sources = {}
+        stale_providers = {}
+        unavailable_providers = []
+        if integration_id:
+            identity = f"stored:{integration_id}:{stored_revision(db, integration_id, previous)}"
+            sources["stored"] = compare_source(
+                identity, lambda window: stored_rows(db, integration_id, window), current, previous, currency
+            )
+        else:
+            managers = _provider_managers(
+                [p.strip().lower() for p in providers.split(",")], aws_role_arn, aws_access_key, aws_secret_key,
+                azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id,
+                gcp_project_id, gcp_service_account_key
+            )
+            for provider, manager in managers.items():
+                def load(window, provider=provider, manager=manager):
+                    return cost_rows(provider, cached_costs(manager, window[0], window[1], _DAILY_GRANULARITY[provider]))
+                try:
+                    with track_stale_reads() as stale:
+                        sources[provider] = compare_source(manager.identity, load, current, previous, currency)
+                except Exception as e:
+                    print(f"{provider.upper()} cost retrieval failed: {e}")
+                    unavailable_providers.append(provider)
+                    continue
+                if stale:
+                    stale_providers[provider] = datetime.utcfromtimestamp(min(stale.values()))
+
+        result = summarize(list(sources.values()), top)
+        return {
+            "mode": mode.lower(),
+            "currency": currency,
+            "current_period": {"start": current[0], "end": current[1]},
+            "previous_period": {"start": previous[0], "end": previous[1]},
+            **result,
+            "stale_providers": stale_providers,
+            "unavailable_providers": unavailable_providers,
+            "fetched": {
+                name: {"windows": source["fetched"], "previous_cached": source["previous_cached"]}
+                for name, source in sources.items()
+            },
+        }
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+_STORED_SERIES_SQL = {
+    "SERVICE": "service_name",
+    "REGION": "COALESCE(region, 'Unknown')",
+    "RESOURCE": "COALESCE(resource_id, 'Unknown')",
+}
+
+@router.get("/costs/timeseries")
+def get_cost_timeseries(
+    provider: str = Query(..., description="aws, azure or gcp"),
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    bucket: str = Query("day", description="day, week or month"),
+    timezone: str = Query("UTC", description="IANA timezone used for bucket boundaries"),
+    max_points: Optional[int] = Query(None, ge=3, description="Downsample each series to at most this many points (LTTB)"),
+    max_series: Optional[int] = Query(None, ge=1, description="Keep the largest series and fold the rest into 'Other'"),
+    group_by: str = Query("SERVICE", description="SERVICE, REGION or RESOURCE"),
+    source_granularity: str = Query("DAILY", description="Upstream granularity: DAILY or HOURLY"),
+    integration_id: Optional[str] = Query(None, description="Read stored cost_data for this integration instead of the provider API"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
+    aws_role_arn: Optional[str] = Query(None),
+    aws_access_key: Optional[str] = Query(None),
+    aws_secret_key: Optional[str] = Query(None),
+    azure_tenant_id: Optional[str] = Query(None),
+    azure_client_id: Optional[str] = Query(None),
+    azure_client_secret: Optional[str] = Query(None),
+    azure_subscription_id: Optional[str] = Query(None),
+    gcp_project_id: Optional[str] = Query(None),
+    gcp_service_account_key: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
+):
+    """Cost series re-bucketed to day/week/month and downsampled on the server"""
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+        group_key = normalize_dimensions([group_by])[0]
+        currency = _reporting_currency(currency)
+        
+        if integration_id:
+            label = _STORED_SERIES_SQL.get(group_key)
+            if not label:
+                raise HTTPException(status_code=400, detail=f"Unsupported group_by '{group_by}'")
+            rows = db.execute(text(f"""
+                SELECT billing_period_start::text, {label}, COALESCE(currency, 'USD'), SUM(cost_amount)::float8
+                FROM cost_data
+                WHERE integration_id = :integration_id
+                  AND billing_period_start >= :start_date
+                  AND billing_period_start < :end_date
+                GROUP BY 1, 2, 3
+            """), {"integration_id": integration_id, "start_date": start_date, "end_date": end_date}).all()
+            dates, labels, currencies, amounts = rows_to_columns(rows, 4)
+            amounts = convert_amounts(dates, currencies, amounts, currency)
+        else:
+            manager = _build_manager(
+                provider.strip().lower(), aws_role_arn, aws_access_key, aws_secret_key,
+                azure_tenant_id, azure_client_id, azure_client_secret, azure_subscription_id,
+                gcp_project_id, gcp_service_account_key
+            )
+            if manager is None:
+                raise HTTPException(status_code=400, detail=f"Missing credentials for provider '{provider}'")
+            costs = cached_costs(manager, start_date, end_date, source_granularity, [group_key])
+            costs = normalize_costs([cost for cost in costs if cost.date], currency)
+            dates = [cost.date for cost in costs]
+            labels = [cost.service for cost in costs]
+            amounts = [cost.amount for cost in costs]
+        
+        result = build_timeseries(dates, labels, amounts, bucket.lower(), timezone, max_points, max_series)
+        result["currency"] = currency
+        result["period"] = f"{start_date} to {end_date}"
+        return result
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/costs/daily")
+def get_stored_daily_costs(
+    integration_id: str = Query(..., description="Integration whose stored cost_data is read"),
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    group_by: str = Query("SERVICE", description="SERVICE, REGION or RESOURCE"),
+    since: Optional[str] = Query(None, description="watermark from an earlier response; only days revised since are returned"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
+    db: Session = Depends(get_read_db)
+):
+    """Daily stored costs per label, or only the days revised since a watermark"""
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    try:
+        label = _STORED_SERIES_SQL.get(group_by.strip().upper())
+        if not label:
+            raise HTTPException(status_code=400, detail=f"Unsupported group_by '{group_by}'")
+        currency = _reporting_currency(currency)
+        result = stored_cost_delta(db, integration_id, start_date, end_date, label, since, currency)
+        result["period"] = f"{start_date} to {end_date}"
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/costs/by-team")
+async def get_costs_by_team(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    integration_id: Optional[str] = Query(None, description="Limit to one integration"),
+    user_id: Optional[str] = Query(None, description="Limit to one user's integrations"),
+    currency: Optional[str] = Query(None, description="Reporting currency; defaults to the configured one"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Allocated spend per team from stored cost data"""
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    try:
+        currency = await asyncio.to_thread(_reporting_currency, currency)
+        # Per day and currency, so each row converts at its own daily rate
+        rows = (await db.execute(text("""
+            SELECT COALESCE(c.allocated_team, 'Unallocated') AS team,
+                   c.billing_period_start::text AS day,
+                   COALESCE(c.currency, 'USD') AS currency,
+                   SUM(c.cost_amount)::float8 AS amount,
+                   array_agg(DISTINCT c.integration_id::text) AS integrations
+            FROM cost_data c
+            JOIN cloud_integrations ci ON ci.id = c.integration_id
+            WHERE c.billing_period_start >= :start_date
+              AND c.billing_period_start < :end_date
+              AND (CAST(:integration_id AS uuid) IS NULL OR c.integration_id = CAST(:integration_id AS uuid))
+              AND (CAST(:user_id AS uuid) IS NULL OR ci.user_id = CAST(:user_id AS uuid))
+            GROUP BY 1, 2, 3
+        """), {"start_date": start_date, "end_date": end_date,
+               "integration_id": integration_id, "user_id": user_id})).all()
+        amounts = await asyncio.to_thread(convert_amounts, [row.day for row in rows],
+                                          [row.currency for row in rows], [row.amount for row in rows], currency)
+        totals: Dict[str, float] = {}
+        integrations: Dict[str, set] = {}
+        for row, amount in zip(rows, amounts):
+            totals[row.team] = totals.get(row.team, 0.0) + amount
+            integrations.setdefault(row.team, set()).update(row.integrations)
+        teams = sorted(
+            ({"team": team, "total_cost": total, "integrations": len(integrations[team])}
+             for team, total in totals.items()),
+            key=lambda team: team["total_cost"], reverse=True,
+        )
+        return {
+            "period": f"{start_date} to {end_date}",
+            "currency": currency,
+            "total_cost": sum(team["total_cost"] for team in teams),
+            "teams": teams,
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/health")
 def dashboard_health():
-    """Health check endpoint for dashboard services"""
+    """Health check endpoint for dashboard services, from each provider account's circuit breaker"""
+    providers = provider_breakers.health()
+    services = {
+        provider: providers.get(provider, {}).get("status", "available")
+        for provider in ("aws", "azure", "gcp")
+    }
     return {
-        "status": "healthy",
+        "status": "healthy" if all(status == "available" for status in services.values()) else "degraded",
         "timestamp": datetime.utcnow(),
-        "services": {
-            "aws": "available",
-            "azure": "available", 
-            "gcp": "available"
-        }
+        "services": services,
+        "breakers": {provider: report["accounts"] for provider, report in providers.items()},
     }
\ No newline at end of file
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import Optional
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import get_db, get_read_db
+from utils.integration_utils import get_integration
+from utils.k8s_utils import allocate_k8s, read_snapshots, resolve_snapshot_path, standin_snapshots
+
+router = APIRouter(prefix="/k8s", tags=["Kubernetes"])
+
+@router.post("/allocate/{integration_id}")
+def allocate_k8s_costs(
+    integration_id: str,
+    path: Optional[str] = Query(None, description="Snapshot file or directory under the snapshot root; defaults to the integration's k8s_snapshot_path"),
+    source: str = Query("file", description="file, or standin for synthetic snapshots from the local metrics stand-in"),
+    day: Optional[str] = Query(None, description="standin: day to generate (YYYY-MM-DD), defaults to yesterday"),
+    pods: int = Query(1000, ge=1, le=50000, description="standin: pods per hour; larger runs belong in k8s_benchmark.py"),
+    currency: Optional[str] = Query(None, description="Currency of the stored allocations; defaults to the reporting currency"),
+    db: Session = Depends(get_db)
+):
+    """Split node costs from cost_data across pods by CPU and memory and store namespace and label rollups"""
+    integration = get_integration(db, integration_id)
+    if not integration:
+        raise HTTPException(status_code=404, detail="Integration not found")
+
+    try:
+        if source == "standin":
+            standin_day = datetime.strptime(day, "%Y-%m-%d") if day else datetime.utcnow() - timedelta(days=1)
+            snapshots = standin_snapshots(pods, standin_day.date())
+        elif source == "file":
+            configuration = integration.get("configuration") or {}
+            snapshots = read_snapshots(resolve_snapshot_path(path or configuration.get("k8s_snapshot_path")))
+        else:
+            raise HTTPException(status_code=400, detail="source must be 'file' or 'standin'")
+        return allocate_k8s(db, integration_id, snapshots, currency)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/allocations/{integration_id}")
+def get_k8s_allocations(
+    integration_id: str,
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    dimension: str = Query("namespace", description="namespace or label:<key>"),
+    cluster: Optional[str] = Query(None, description="Limit to one cluster"),
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_read_db)
+):
+    """Stored Kubernetes allocations summed over the period, largest first"""
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+        rows = db.execute(text("""
+            SELECT value, SUM(cpu_cost)::float8 AS cpu_cost, SUM(memory_cost)::float8 AS memory_cost,
+                   SUM(cpu_cost + memory_cost)::float8 AS total_cost, SUM(pod_hours)::float8 AS pod_hours,
+                   MIN(currency) AS currency
+            FROM k8s_cost_allocations
+            WHERE integration_id = CAST(:integration_id AS uuid)
+              AND dimension = :dimension
+              AND day >= :start_date AND day < :end_date
+              AND (CAST(:cluster AS text) IS NULL OR cluster = :cluster)
+            GROUP BY value
+            ORDER BY total_cost DESC
+            LIMIT :limit
+        """), {"integration_id": integration_id, "dimension": dimension, "start_date": start_date,
+               "end_date": end_date, "cluster": cluster, "limit": limit}).all()
+        allocations = [dict(row._mapping) for row in rows]
+        return {
+            "period": f"{start_date} to {end_date}",
+            "dimension": dimension,
+            "total_cost": sum(row["total_cost"] for row in allocations),
+            "allocations": allocations,
+        }
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import get_db, get_read_db
+from utils.integration_utils import get_integration, build_cost_manager
+from utils.inventory_utils import sync_resources
+from utils.idle_utils import detect_idle_resources
+
+router = APIRouter(prefix="/resources", tags=["Resources"])
+
+@router.post("/sync/{integration_id}")
+def sync_integration_resources(integration_id: str, db: Session = Depends(get_db)):
+    """Scan an integration's compute, disk and IP resources into the resources table"""
+    integration = get_integration(db, integration_id)
+    if not integration:
+        raise HTTPException(status_code=404, detail="Integration not found")
+    
+    try:
+        manager = build_cost_manager(integration["provider"], integration["credentials"])
+        return sync_resources(db, integration, manager)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("")
+def list_resources(
+    integration_id: Optional[str] = Query(None, description="Filter by integration"),
+    resource_type: Optional[str] = Query(None, description="e.g. ec2:instance, azure:disk, gce:address"),
+    status: Optional[str] = Query(None, description="running, stopped, pending or terminated"),
+    region: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
+):
+    """List inventoried resources"""
+    try:
+        rows = db.execute(text("""
+            SELECT r.id::text, r.integration_id::text, ci.provider::text AS provider, r.resource_id,
+                   r.resource_type, r.resource_name, r.status::text AS status, r.region, r.tags,
+                   r.configuration, r.monthly_cost::float8 AS monthly_cost, r.last_seen_at, r.updated_at
+            FROM resources r
+            JOIN cloud_integrations ci ON ci.id = r.integration_id
+            WHERE (CAST(:integration_id AS uuid) IS NULL OR r.integration_id = CAST(:integration_id AS uuid))
+              AND (CAST(:resource_type AS text) IS NULL OR r.resource_type = :resource_type)
+              AND (CAST(:status AS text) IS NULL OR r.status::text = :status)
+              AND (CAST(:region AS text) IS NULL OR r.region = :region)
+            ORDER BY r.integration_id, r.resource_id
+            LIMIT :limit OFFSET :offset
+        """), {
+            "integration_id": integration_id,
+            "resource_type": resource_type,
+            "status": status,
+            "region": region,
+            "limit": limit,
+            "offset": offset,
+        })
+        return {"resources": [dict(row._mapping) for row in rows]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/idle/scan/{integration_id}")
+def scan_idle_resources(integration_id: str, db: Session = Depends(get_db)):
+    """Fetch batched utilization metrics and classify the integration's resources as idle or not"""
+    integration = get_integration(db, integration_id)
+    if not integration:
+        raise HTTPException(status_code=404, detail="Integration not found")
+
+    try:
+        manager = build_cost_manager(integration["provider"], integration["credentials"])
+        return detect_idle_resources(db, integration, manager)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/idle")
+def list_idle_resources(
+    integration_id: Optional[str] = Query(None, description="Filter by integration"),
+    reason: Optional[str] = Query(None, description="unattached, unassociated, low-utilization, no-io or stopped-stale"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
+):
+    """List resources flagged by the last idle scan"""
+    try:
+        rows = db.execute(text("""
+            SELECT r.id::text, r.integration_id::text, ci.provider::text AS provider, r.resource_id,
+                   r.resource_type, r.resource_name, r.status::text AS status, r.region,
+                   r.idle_reason, r.utilization, r.monthly_cost::float8 AS monthly_cost,
+                   r.status_changed_at, r.idle_checked_at
+            FROM resources r
+            JOIN cloud_integrations ci ON ci.id = r.integration_id
+            WHERE r.is_idle
+              AND (CAST(:integration_id AS uuid) IS NULL OR r.integration_id = CAST(:integration_id AS uuid))
+              AND (CAST(:reason AS text) IS NULL OR r.idle_reason = :reason)
+            ORDER BY r.integration_id, r.idle_reason, r.resource_id
+            LIMIT :limit OFFSET :offset
+        """), {
+            "integration_id": integration_id,
+            "reason": reason,
+            "limit": limit,
+            "offset": offset,
+        })
+        return {"resources": [dict(row._mapping) for row in rows]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
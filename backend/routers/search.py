@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_read_db
+from utils.search_utils import search_resources, search_services
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+@router.get("/resources")
+async def search_resource_inventory(
+    q: str = Query("", description="Search text"),
+    mode: str = Query("prefix", description="prefix (name/ID label), contains (names, IDs and tags) or fuzzy (trigram similarity)"),
+    integration_id: Optional[str] = Query(None),
+    resource_type: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    region: Optional[str] = Query(None),
+    tag: Optional[List[str]] = Query(None, description="Repeatable; key:value for equality or key for existence"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Search resources by name, ID and tags with keyset pagination"""
+    try:
+        return await db.run_sync(search_resources, q, mode.lower(), integration_id, resource_type, status, region,
+                                tag, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/services")
+async def search_service_names(
+    q: str = Query("", description="Search text"),
+    mode: str = Query("prefix", description="prefix, contains or fuzzy"),
+    integration_id: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Search service names seen in cost data"""
+    try:
+        return await db.run_sync(search_services, q, mode.lower(), integration_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """
 CloudSpy Backend Startup Script
+
+    python start.py                # single uvicorn process (reloads in development)
+    python start.py --production   # gunicorn with one preloaded uvicorn worker per core
 """
 import uvicorn
 import os
+import sys
 from config import settings
 
 if __name__ == "__main__":
@@ -11,17 +15,27 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 9090))
     reload = settings.debug and settings.environment == "development"
-    
+    production = "--production" in sys.argv or settings.environment == "production"
+
     print(f"Starting CloudSpy Backend...")
     print(f"Environment: {settings.environment}")
     print(f"Debug mode: {settings.debug}")
     print(f"Host: {host}:{port}")
+
+    if production:
+        # Workers, recycling and preloading are configured in gunicorn.conf.py
+        backend_dir = os.path.dirname(os.path.abspath(__file__))
+        os.chdir(backend_dir)
+        os.execvp(sys.executable, [
+            sys.executable, "-m", "gunicorn", "-c", os.path.join(backend_dir, "gunicorn.conf.py"), "main:app"
+        ])
+
     print(f"Reload: {reload}")
-    
+
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         reload=reload,
         log_level=settings.log_level.lower()
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cost alert evaluation and dispatch checks
+
+    python -m pytest -q test_alerts.py
+
+The database session and notification channels are in-process fakes.
+"""
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from utils import alert_utils, ingest_utils
+from utils.alert_utils import AlertNotificationDispatcher, CostAlertEvaluator, _normalize_channel
+
+
+class FakeSession:
+    """Records statements; UPDATE ... RETURNING yields ``returning``"""
+
+    def __init__(self, returning=()):
+        self.returning = list(returning)
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return [SimpleNamespace(_mapping=row) for row in self.returning] if "RETURNING" in str(statement) else []
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def _alert(alert_id, channels, email="owner@example.com"):
+    return {"alert_id": alert_id, "name": f"alert {alert_id}", "threshold_type": "monthly",
+            "threshold_amount": 10.0, "current_spend": 12.5, "notification_channels": channels,
+            "user_email": email}
+
+
+def test_one_statement_evaluates_the_changed_integrations():
+    row = {"id": "a1", "user_id": "u1", "integration_id": None, "name": "Budget", "threshold_amount": 100,
+           "threshold_type": "monthly", "notification_channels": ["email"], "last_triggered_at": datetime(2026, 1, 5),
+           "current_spend": 120, "email": "owner@example.com"}
+    db = FakeSession([row])
+
+    triggered = CostAlertEvaluator().evaluate(db, ["i-2", "i-1", "i-2"])
+    assert len(db.statements) == 1 and db.commits == 1
+    sql, params = db.statements[0]
+    assert params == {"integration_ids": ["i-1", "i-2"]}
+    assert "ANY(CAST(:integration_ids AS uuid[]))" in sql
+    assert triggered == [{
+        "alert_id": "a1", "user_id": "u1", "integration_id": None, "name": "Budget", "threshold_amount": 100.0,
+        "threshold_type": "monthly", "current_spend": 120.0, "notification_channels": ["email"],
+        "user_email": "owner@example.com", "triggered_at": "2026-01-05T00:00:00",
+    }]
+
+    db = FakeSession()
+    assert CostAlertEvaluator().evaluate(db, []) == [] and db.statements == []
+    CostAlertEvaluator().evaluate(db)
+    assert alert_utils._CHANGED_ALL in db.statements[0][0]
+
+
+def test_channels_normalize_to_targets():
+    assert _normalize_channel("email", "a@example.com") == ("email", "a@example.com")
+    assert _normalize_channel("email", None) is None
+    assert _normalize_channel({"type": "Slack", "webhook_url": "https://hooks/x"}, None) == ("slack", "https://hooks/x")
+    assert _normalize_channel({"type": "webhook"}, "a@example.com") is None
+    assert _normalize_channel({"type": "pager", "url": "x"}, None) is None
+
+
+def test_delivery_is_one_request_per_target(monkeypatch):
+    sent = []
+
+    async def send(self, client, channel_type, target, alerts):
+        sent.append((channel_type, target, [alert["alert_id"] for alert in alerts]))
+
+    monkeypatch.setattr(AlertNotificationDispatcher, "_send", send)
+    hook = {"type": "webhook", "url": "https://example.com/hook"}
+    asyncio.run(AlertNotificationDispatcher().deliver([
+        _alert("a1", ["email", hook, hook]),
+        _alert("a2", [hook, {"type": "email", "to": "ops@example.com"}]),
+        _alert("a1", ["email"]),
+    ]))
+
+    assert sorted(sent) == [
+        ("email", "ops@example.com", ["a2"]),
+        ("email", "owner@example.com", ["a1"]),
+        ("webhook", "https://example.com/hook", ["a1", "a2"]),
+    ]
+
+
+def test_ingest_evaluates_only_written_integrations(monkeypatch):
+    evaluated = []
+    monkeypatch.setattr(ingest_utils, "allocate_new_rows", lambda db, ids: 0)
+    monkeypatch.setattr(ingest_utils, "evaluate_and_dispatch", lambda db, ids: evaluated.append(ids) or [])
+    rows = [{"integration_id": integration_id, "service_name": "EC2", "cost_amount": 1.0,
+             "billing_period_start": date(2026, 1, 1), "billing_period_end": date(2026, 1, 1)}
+            for integration_id in ("i-2", "i-1", "i-2")]
+
+    result = ingest_utils.ingest_cost_rows(FakeSession(), rows)
+    assert evaluated == [["i-1", "i-2"]]
+    assert result["rows_ingested"] == 3 and result["integrations"] == ["i-1", "i-2"]
+    assert ingest_utils.ingest_cost_rows(FakeSession(), rows, evaluate_alerts=False)["alerts_triggered"] == 0
+    assert len(evaluated) == 1
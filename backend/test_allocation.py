@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Rule matching checks for the compiled allocation rule sets
+
+    python -m pytest -q test_allocation.py
+"""
+import pytest
+
+from utils.allocation_utils import CompiledRuleSet, validate_rule
+
+
+def _rule(index, match_type, pattern, tag_key=None):
+    return {"id": str(index), "team": f"team-{index}", "match_type": match_type, "tag_key": tag_key, "pattern": pattern}
+
+
+def test_regex_rules_search_and_prefix_rules_anchor():
+    rules = CompiledRuleSet([
+        _rule(0, "resource_regex", "db-[0-9]+"),
+        _rule(1, "resource_prefix", "i-"),
+        _rule(2, "resource_regex", "^web"),
+        _rule(3, "tag_regex", "prod", tag_key="env"),
+    ])
+
+    assert rules.match({}, "arn:prod-db-12", None, None)["id"] == "0"
+    # Rule order wins over match position
+    assert rules.match({}, "i-db-1", None, None)["id"] == "0"
+    assert rules.match({}, "i-0abc", None, None)["id"] == "1"
+    assert rules.match({}, "x-i-web", None, None) is None
+    assert rules.match({}, "web-1", None, None)["id"] == "2"
+    assert rules.match({"env": "eu-prod"}, None, None, None)["id"] == "3"
+
+
+def test_inline_global_flags_are_rejected():
+    with pytest.raises(ValueError):
+        validate_rule("resource_regex", "(?i)web")
+    validate_rule("resource_regex", "(?i:web)")
+    rules = CompiledRuleSet([_rule(0, "resource_prefix", "i-"), _rule(1, "resource_regex", "(?i:web)")])
+    assert rules.match({}, "WEB-1", None, None)["id"] == "1"
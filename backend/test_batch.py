@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Batch cost query checks
+
+    python -m pytest -q test_batch.py
+
+Provider calls are replaced with an in-process fake.
+"""
+import asyncio
+import json
+import uuid
+
+from models.schemas import BatchCostQuery, CostMetric
+from utils import batch_utils
+from utils.batch_utils import canonical_id, stream_batch
+
+
+def test_canonical_id_accepts_uuid_spellings():
+    value = uuid.uuid4()
+    for spelling in (str(value), str(value).upper(), "{" + str(value) + "}", value.hex):
+        assert canonical_id(spelling) == str(value)
+    assert canonical_id("not-a-uuid") is None
+
+
+def test_uppercase_ids_find_their_integration(monkeypatch):
+    integration_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    integrations = {integration_id: {"id": integration_id, "user_id": user_id, "provider": "aws",
+                                     "name": "prod", "credentials": {}}}
+
+    def get_costs(manager, start_date, end_date, granularity, group_by):
+        return [CostMetric(service="EC2", amount=1.0, date=start_date)], {"cache_hits": 0, "upstream_queries": 1}
+
+    monkeypatch.setattr(batch_utils, "build_cost_manager", lambda provider, credentials: object())
+    monkeypatch.setattr(batch_utils.groupby_planner, "get_costs", get_costs)
+    query = BatchCostQuery(integration_id=integration_id.upper(), start_date="2026-01-01", end_date="2026-02-01")
+
+    async def collect():
+        return [json.loads(line) async for line in stream_batch([query], integrations, "USD", 1, user_id.upper())]
+
+    result = asyncio.run(collect())[1]
+    assert result["status"] == "ok", result
+    assert result["total"] == 1.0
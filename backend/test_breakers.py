@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker checks for provider calls
+
+    python -m pytest -q test_breakers.py
+"""
+import threading
+
+import pytest
+
+from config import settings
+from utils.breaker_utils import CLOSED, OPEN, CircuitBreaker
+
+
+def _fail(message):
+    def call():
+        raise Exception(message)
+    return call
+
+
+def test_bad_credentials_do_not_open_the_breaker():
+    breaker = CircuitBreaker("aws:bad-secret")
+    for _ in range(settings.breaker_failure_threshold + 1):
+        with pytest.raises(Exception):
+            breaker.call(_fail("Failed to retrieve AWS costs: An error occurred (SignatureDoesNotMatch)"))
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls"] == settings.breaker_failure_threshold + 1
+
+
+def test_outages_still_open_the_breaker():
+    breaker = CircuitBreaker("aws:outage")
+    breaker.call(lambda: "ok")
+    for _ in range(settings.breaker_failure_threshold):
+        with pytest.raises(Exception):
+            breaker.call(_fail("Failed to retrieve AWS costs: ServiceUnavailable"))
+    assert breaker.state == OPEN
+
+
+def test_abandoned_calls_are_bounded_per_account(monkeypatch):
+    monkeypatch.setattr(settings, "provider_account_max_inflight", 1)
+    monkeypatch.setattr(settings, "provider_latency_budget_seconds", 0.05)
+    release = threading.Event()
+    slow, other = CircuitBreaker("azure:slow"), CircuitBreaker("gcp:other")
+    try:
+        with pytest.raises(TimeoutError):
+            slow.call(release.wait)
+        # The abandoned attempt still holds the account's only slot
+        with pytest.raises(TimeoutError, match="already has"):
+            slow.call(lambda: "ok")
+        assert other.call(lambda: "ok") == "ok"
+    finally:
+        release.set()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Provider client pool checks
+
+    python -m pytest -q test_client_pool.py
+
+Clients are plain objects or offline boto3 clients; no provider is called.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from utils import client_pool as client_pool_module
+from utils.client_pool import ClientPool, aws_client
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+        self.http = [SimpleNamespace(num_requests=10, num_connections=2)]
+
+    def close(self):
+        self.closed = True
+
+
+def test_concurrent_callers_share_one_build():
+    pool = ClientPool(idle_seconds=60)
+    builds = []
+
+    def factory():
+        builds.append(1)
+        time.sleep(0.05)
+        return FakeClient()
+
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(pool.get("aws:ce", ("id",), factory)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1 and len({id(c) for c in clients}) == 1
+    stats = pool.stats()["kinds"]["aws:ce"]
+    assert (stats["hits"], stats["misses"], stats["clients"]) == (7, 1, 1)
+    assert stats["client_reuse_rate"] == 0.875
+
+
+def test_idle_clients_are_closed_and_their_counters_kept():
+    pool = ClientPool(idle_seconds=60)
+    idle = pool.get("azure:http", ("a",), FakeClient, close=lambda c: c.close(), http_pools=lambda c: c.http)
+    busy = pool.get("azure:http", ("b",), FakeClient, close=lambda c: c.close(), http_pools=lambda c: c.http)
+    pool._entries[("azure:http", "a")].last_used -= 120
+
+    assert pool.reap() == 1
+    assert idle.closed and not busy.closed
+    stats = pool.stats()["kinds"]["azure:http"]
+    assert (stats["clients"], stats["evictions"]) == (1, 1)
+    assert (stats["http_requests"], stats["http_connections"]) == (20, 4)
+    assert stats["connection_reuse_rate"] == 0.8
+    assert pool.get("azure:http", ("a",), FakeClient) is not idle
+
+
+def test_aws_clients_are_keyed_by_credentials_and_config(monkeypatch):
+    pool = ClientPool(idle_seconds=60)
+    monkeypatch.setattr(client_pool_module, "client_pool", pool)
+
+    def manager(access_key):
+        credentials = {"aws_access_key_id": access_key, "aws_secret_access_key": "s"}
+        return SimpleNamespace(identity=f"aws:{access_key}", _get_credentials=lambda: credentials)
+
+    first = aws_client(manager("AK1"), "ce", "us-east-1")
+    assert aws_client(manager("AK1"), "ce", "us-east-1") is first
+    assert aws_client(manager("AK2"), "ce", "us-east-1") is not first
+    assert aws_client(manager("AK1"), "ce", "us-east-1", retries={"max_attempts": 8}) is not first
+    assert pool.stats()["kinds"]["aws:ce"]["clients"] == 3
+    pool.close_all()
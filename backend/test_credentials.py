@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Credential isolation checks for the shared cost caches
+
+    python -m pytest -q test_credentials.py
+
+Provider calls are replaced with an in-process fake, so no cloud
+credentials are needed.
+"""
+import uuid
+
+import pytest
+
+from models.schemas import CostMetric
+from utils.aws_utils import AWSCostManager
+from utils.azure_utils import AzureCostManager
+from utils.cache_utils import cached_costs
+from utils.delta_utils import series_key
+from utils.gcp_utils import GCPCostManager
+from utils.groupby_utils import groupby_planner
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake Cost Explorer that only answers for the secret it was set up with"""
+    calls = []
+
+    def get_costs(self, start_date, end_date, granularity="MONTHLY", group_by=None, filters=None):
+        calls.append(self.secret_key)
+        if self.secret_key != "right":
+            raise Exception("Failed to retrieve AWS costs: SignatureDoesNotMatch")
+        return [CostMetric(service="EC2", amount=42.0, date=start_date, dimensions={"SERVICE": "EC2"})]
+
+    monkeypatch.setattr(AWSCostManager, "get_costs", get_costs)
+    return calls
+
+
+def test_identity_covers_secrets():
+    key = "AK" + uuid.uuid4().hex[:8]
+    assert (AWSCostManager(access_key=key, secret_key="right").identity
+            != AWSCostManager(access_key=key, secret_key="wrong").identity)
+    assert (AWSCostManager(access_key=key, secret_key="right", session_token="a").identity
+            != AWSCostManager(access_key=key, secret_key="right", session_token="b").identity)
+    assert (AzureCostManager("t", "c", "right", "s").identity
+            != AzureCostManager("t", "c", "wrong", "s").identity)
+    assert (GCPCostManager("p", '{"private_key": "a"}').identity
+            != GCPCostManager("p", '{"private_key": "b"}').identity)
+    assert "right" not in AWSCostManager(access_key=key, secret_key="right").identity
+
+
+def test_wrong_secret_misses_cost_cache(upstream):
+    key = "AK" + uuid.uuid4().hex[:8]
+    good = AWSCostManager(access_key=key, secret_key="right")
+    bad = AWSCostManager(access_key=key, secret_key="wrong")
+
+    assert cached_costs(good, "2026-01-01", "2026-02-01")[0].amount == 42.0
+    with pytest.raises(Exception):
+        cached_costs(bad, "2026-01-01", "2026-02-01")
+    assert upstream == ["right", "wrong"]
+
+
+def test_wrong_secret_misses_planner_cache(upstream):
+    key = "AK" + uuid.uuid4().hex[:8]
+    good = AWSCostManager(access_key=key, secret_key="right")
+    bad = AWSCostManager(access_key=key, secret_key="wrong")
+
+    costs, _ = groupby_planner.get_costs(good, "2026-01-01", "2026-02-01", "MONTHLY", ["SERVICE"])
+    assert costs[0].amount == 42.0
+    with pytest.raises(Exception):
+        groupby_planner.get_costs(bad, "2026-01-01", "2026-02-01", "MONTHLY", ["SERVICE"])
+    assert upstream == ["right", "wrong"]
+    assert (series_key(good, "2026-01-01", "2026-02-01", "MONTHLY", ["SERVICE"])
+            != series_key(bad, "2026-01-01", "2026-02-01", "MONTHLY", ["SERVICE"]))
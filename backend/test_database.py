@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Connection pool metric checks
+
+    python -m pytest -q test_database.py
+
+Pools hand out fake connections, so no database server is needed.
+"""
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+import database
+from config import settings
+from database import PoolMetrics, TimedQueuePool, _async_url
+
+
+class FakeConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_snapshot_percentiles_and_slow_checkouts(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_wait_threshold_ms", 10)
+    metrics = PoolMetrics(window=100)
+    for ms in range(1, 101):
+        metrics.record(ms / 1000)
+    metrics.record(5.0, timed_out=True)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts"] == 100 and snapshot["timeouts"] == 1
+    assert snapshot["waited"] == 91
+    assert snapshot["wait_ms_avg"] == 50.5
+    assert snapshot["wait_ms_p95"] == 96.0
+    assert snapshot["wait_ms_max"] == 100.0
+    assert PoolMetrics().snapshot()["wait_ms_p95"] == 0.0
+
+
+def test_timed_pool_counts_checkouts_and_timeouts():
+    pool = TimedQueuePool(FakeConnection, pool_size=1, max_overflow=0, timeout=0.05)
+    held = pool.connect()
+    with pytest.raises(PoolTimeout):
+        pool.connect()
+    held.close()
+    pool.connect().close()
+
+    snapshot = pool.metrics.snapshot()
+    assert snapshot["checkouts"] == 2 and snapshot["timeouts"] == 1
+
+
+def test_async_url_and_pool_status():
+    assert _async_url("postgresql://u:p@db/cloudspy") == "postgresql+psycopg://u:p@db/cloudspy"
+    assert _async_url("postgresql+psycopg2://db/x") == "postgresql+psycopg://db/x"
+    assert _async_url("sqlite:///x.db") == "sqlite:///x.db"
+
+    status = database.pool_status()
+    primary = status["pools"]["primary"]
+    assert primary["size"] == settings.db_pool_size
+    assert primary["max_overflow"] == settings.db_max_overflow
+    assert "wait_ms_p95" in primary and "saturation" in primary
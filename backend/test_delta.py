@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Watermark checks for delta cost responses
+
+    python -m pytest -q test_delta.py
+
+The stored-data test needs the database in DATABASE_URL and is skipped when
+it cannot connect.
+"""
+import secrets
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+import utils.delta_utils as delta_utils
+from models.schemas import CostMetric
+from utils.delta_utils import DeltaTracker, stored_cost_delta
+from utils.ingest_utils import record_cost_revisions
+
+
+class FakeSharedStore:
+    """In-memory stand-in for the Redis store two workers share"""
+
+    def __init__(self):
+        self.values = {}
+        self.counter = None
+
+    def get(self, key):
+        return (self.values[key], 60.0) if key in self.values else None
+
+    def set(self, key, value, ttl):
+        self.values[key] = value
+
+    def epoch_counter(self, key, increment=1):
+        if self.counter is None:
+            self.counter = [secrets.token_hex(4), 0]
+        self.counter[1] += increment
+        return tuple(self.counter)
+
+
+def _costs(amounts):
+    return [CostMetric(service="EC2", amount=amount, date=day) for day, amount in amounts.items()]
+
+
+def test_workers_share_watermarks(monkeypatch):
+    monkeypatch.setattr(delta_utils, "shared_store", FakeSharedStore())
+    first, second = DeltaTracker(), DeltaTracker()
+
+    _, headers = first.delta("series", 1, _costs({"2026-01-01": 1.0, "2026-01-02": 2.0}), None)
+    assert headers["X-Cost-Delta"] == "full"
+
+    # Another worker with its own cache entry honours the watermark and sends only the changed day
+    costs, headers = second.delta("series", 7, _costs({"2026-01-01": 1.0, "2026-01-02": 5.0}),
+                                  headers["X-Cost-Watermark"])
+    assert headers["X-Cost-Delta"] == "delta"
+    assert [cost.date for cost in costs] == ["2026-01-02"]
+
+
+def test_local_watermarks_stay_per_process(monkeypatch):
+    monkeypatch.setattr(delta_utils, "shared_store", None)
+    first, second = DeltaTracker(), DeltaTracker()
+    _, headers = first.delta("series", 1, _costs({"2026-01-01": 1.0}), None)
+    _, headers = second.delta("series", 1, _costs({"2026-01-01": 1.0}), headers["X-Cost-Watermark"])
+    assert headers["X-Cost-Delta"] == "full"
+
+
+@pytest.fixture
+def integration():
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        user_id = db.execute(text("""
+            INSERT INTO users (email, hashed_password) VALUES (:email, 'x') RETURNING id
+        """), {"email": f"{uuid.uuid4().hex}@example.com"}).scalar()
+        integration_id = db.execute(text("""
+            INSERT INTO cloud_integrations (user_id, provider, name, credentials)
+            VALUES (:user_id, 'aws', 'delta-test', '{}') RETURNING id::text
+        """), {"user_id": user_id}).scalar()
+        db.commit()
+    except Exception as e:
+        db.close()
+        pytest.skip(f"Database unavailable: {e}")
+    yield integration_id
+    db.execute(text("DELETE FROM users WHERE id = :user_id"), {"user_id": user_id})
+    db.commit()
+    db.close()
+
+
+def test_stored_watermark_covers_late_commits(integration):
+    from database import SessionLocal
+    slow, fast, reader = SessionLocal(), SessionLocal(), SessionLocal()
+    try:
+        # The slow writer draws the lower revision but commits after the fast one
+        record_cost_revisions(slow, [(integration, "2026-01-01")])
+        record_cost_revisions(fast, [(integration, "2026-01-02")])
+        fast.commit()
+
+        first = stored_cost_delta(reader, integration, "2026-01-01", "2026-02-01", "service_name")
+        reader.commit()
+        slow.commit()
+
+        second = stored_cost_delta(reader, integration, "2026-01-01", "2026-02-01", "service_name",
+                                   first["watermark"])
+        assert second["mode"] == "delta"
+        assert "2026-01-01" in second["changed_days"]
+    finally:
+        for session in (slow, fast, reader):
+            session.rollback()
+            session.close()
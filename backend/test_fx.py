@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+FX rate file and stored-cost conversion checks
+
+    python -m pytest -q test_fx.py
+"""
+from datetime import date
+
+import pytest
+
+from config import settings
+from utils.fx_utils import FXRateTable, convert_amounts, fx_rates, read_rate_file, resolve_rate_path
+
+
+def test_rate_paths_stay_under_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "fx_rates_root", str(tmp_path))
+    assert resolve_rate_path("rates.csv") == str(tmp_path / "rates.csv")
+    for path in ("../etc/passwd", "/etc/passwd", "."):
+        with pytest.raises(ValueError):
+            resolve_rate_path(path)
+
+
+def test_rate_file_errors_do_not_echo_contents(tmp_path):
+    secret = tmp_path / "secret.csv"
+    secret.write_text("date,currency,rate\nhunter2,EUR,1.1\n")
+    with pytest.raises(ValueError) as error:
+        read_rate_file(str(secret))
+    assert "hunter2" not in str(error.value)
+    assert str(tmp_path) not in str(error.value)
+
+
+def test_convert_amounts_uses_daily_rates(monkeypatch):
+    table = FXRateTable([("EUR", date(2026, 1, 1), 1.1), ("EUR", date(2026, 1, 2), 1.2)], "USD", "test")
+    monkeypatch.setattr(fx_rates, "table", lambda: table)
+    converted = convert_amounts(["2026-01-01", "2026-01-02", "2026-01-02"], ["EUR", "EUR", None],
+                                [10.0, 10.0, 5.0], "USD")
+    assert converted == pytest.approx([11.0, 12.0, 5.0])
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Checks for the group-by planner and provider group key parsing
+
+    python -m pytest -q test_groupby.py
+
+Provider clients are replaced with in-process fakes.
+"""
+import uuid
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import aws
+from utils.aws_utils import AWSCostManager
+from utils.azure_utils import AzureCostManager
+from utils.cache_utils import cost_cache_key
+from utils.groupby_utils import groupby_planner
+
+# (team, env, amount) usage the fake Azure subscription reports
+USAGE = [("web", "prod", 10.0), ("web", "dev", 1.0), ("data", "prod", 5.0)]
+
+
+def test_azure_tag_pairs_are_split_per_query(monkeypatch):
+    queries = []
+
+    def usage(scope, query):
+        dataset = query["dataset"]
+        tags = [g["name"] for g in dataset["grouping"] if g["type"] == "TagKey"]
+        assert len(tags) <= 1, "Azure returns one TagKey/TagValue pair per query"
+        queries.append((tags, dataset.get("filter")))
+        wanted = dataset.get("filter", {}).get("tags")
+        rows = {}
+        for team, env, amount in USAGE:
+            values = {"team": team, "env": env}
+            if wanted and values[wanted["name"]] not in wanted["values"]:
+                continue
+            value = values[tags[0]] if tags else ""
+            rows[value] = rows.get(value, 0.0) + amount
+        return SimpleNamespace(
+            columns=[SimpleNamespace(name=n, type="x") for n in ("PreTaxCost", "TagKey", "TagValue", "Currency")],
+            rows=[[amount, tags[0] if tags else "", value, "USD"] for value, amount in rows.items()],
+        )
+
+    monkeypatch.setattr(AzureCostManager, "_get_cost_client",
+                        lambda self: SimpleNamespace(query=SimpleNamespace(usage=usage)))
+    manager = AzureCostManager("t", "c", uuid.uuid4().hex, "sub")
+    costs, report = groupby_planner.get_costs(manager, "2026-01-01", "2026-02-01", "Monthly", ["TAG:team", "TAG:env"])
+
+    got = sorted((c.dimensions["TAG:team"], c.dimensions["TAG:env"], c.amount) for c in costs)
+    assert got == sorted(USAGE)
+    assert report["split_queries"] >= 2
+
+
+def test_aws_only_tag_keys_are_unprefixed(monkeypatch):
+    class CostExplorer:
+        def get_cost_and_usage(self, **request):
+            return {"ResultsByTime": [{"TimePeriod": {"Start": "2026-01-01"}, "Groups": [
+                {"Keys": ["Usage$Type", "team$web"],
+                 "Metrics": {"UnblendedCost": {"Amount": "3", "Unit": "USD"}}},
+            ]}]}
+
+    monkeypatch.setattr(AWSCostManager, "_get_cost_explorer_client", lambda self: CostExplorer())
+    manager = AWSCostManager(access_key="AK" + uuid.uuid4().hex[:8], secret_key="s")
+    cost = manager.get_costs("2026-01-01", "2026-02-01", "MONTHLY", ["USAGE_TYPE", "TAG:team"])[0]
+    assert cost.dimensions == {"USAGE_TYPE": "Usage$Type", "TAG:team": "web"}
+
+
+def test_tag_key_case_is_kept_in_cache_keys():
+    manager = AWSCostManager(access_key="AK", secret_key="s")
+    assert (cost_cache_key(manager, "2026-01-01", "2026-02-01", "DAILY", ["TAG:Team"])
+            != cost_cache_key(manager, "2026-01-01", "2026-02-01", "DAILY", ["TAG:team"]))
+    assert (cost_cache_key(manager, "2026-01-01", "2026-02-01", "DAILY", [" service "])
+            == cost_cache_key(manager, "2026-01-01", "2026-02-01", "DAILY", ["SERVICE"]))
+
+
+def test_cost_endpoints_report_group_by_errors(monkeypatch):
+    app = FastAPI()
+    app.include_router(aws.router)
+    client = TestClient(app)
+
+    def reject(*args, **kwargs):
+        raise ValueError("Cost Explorer supports at most 2 group_by dimensions")
+
+    monkeypatch.setattr(aws.groupby_planner, "get_costs", reject)
+    params = {"start_date": "2026-01-01", "end_date": "2026-02-01", "group_by": "SERVICE,REGION,TAG:team"}
+    response = client.get("/aws/costs", params=params)
+    assert response.status_code == 400
+    assert "at most 2" in response.json()["detail"]
+    response = client.get("/aws/costs", params={**params, "start_date": "01/01/2026"})
+    assert response.json()["detail"] == "Invalid date format. Use YYYY-MM-DD"
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Idle resource classification checks
+
+    python -m pytest -q test_idle.py
+
+Metrics are stored straight into a fresh metric cache; no provider is called.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from utils import idle_utils
+from utils.idle_utils import MetricWindowCache, classify_resources
+
+START, END = date(2026, 1, 1), date(2026, 1, 15)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = MetricWindowCache(max_series=100)
+    monkeypatch.setattr(idle_utils, "metric_cache", cache)
+
+    def store(resource_id, metric, values):
+        cache.store((resource_id, metric), {START + timedelta(days=i): v for i, v in enumerate(values)},
+                    END - timedelta(days=1))
+    return store
+
+
+def _resource(resource_id, resource_type, status, stopped_days=0):
+    changed = datetime.now(timezone.utc) - timedelta(days=stopped_days) if stopped_days else None
+    return {"resource_id": resource_id, "resource_type": resource_type, "status": status,
+            "status_changed_at": changed}
+
+
+def test_rules(cache):
+    for resource_id, cpu in (("i-idle", 1.0), ("i-busy", 40.0), ("i-new", 1.0)):
+        days = 3 if resource_id == "i-new" else 14
+        cache(resource_id, "cpu_avg", [cpu] * days)
+        cache(resource_id, "cpu_max", [cpu * 2] * days)
+        cache(resource_id, "net_in", [1024.0] * days)
+    cache("vol-quiet", "read_ops", [1.0] * 10)
+    cache("vol-quiet", "write_ops", [2.0] * 10)
+
+    results = classify_resources([
+        _resource("i-idle", "ec2:instance", "running"),
+        _resource("i-busy", "ec2:instance", "running"),
+        _resource("i-new", "ec2:instance", "running"),
+        _resource("i-parked", "ec2:instance", "stopped", stopped_days=45),
+        _resource("disk-1", "azure:disk", "stopped"),
+        _resource("vol-quiet", "ec2:volume", "running"),
+        _resource("ip-1", "gce:address", "stopped"),
+    ], START, END)
+    reasons = {r["resource_id"]: r["idle_reason"] for r in results}
+
+    assert reasons == {
+        "i-idle": "low-utilization", "i-busy": None, "i-new": None, "i-parked": "stopped-stale",
+        "disk-1": "unattached", "vol-quiet": "no-io", "ip-1": "unassociated",
+    }
+    idle = next(r for r in results if r["resource_id"] == "i-idle")["utilization"]
+    assert idle == {"window_days": 14, "cpu_avg_percent": 1.0, "cpu_peak_percent": 2.0,
+                    "network_mb_per_day": round(1024 / (1024 * 1024), 3)}
+
+
+def test_metric_matrix_pads_missing_days(cache):
+    cache("i-1", "cpu_avg", [1.0, 2.0])
+    matrix = idle_utils.metric_cache.matrix(["i-1", "i-unknown"], "cpu_avg", START, END)
+
+    assert matrix.shape == (2, 14)
+    assert matrix[0, :2].tolist() == [1.0, 2.0]
+    assert np.isnan(matrix[0, 2:]).all() and np.isnan(matrix[1]).all()
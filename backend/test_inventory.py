@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Resource inventory collector checks
+
+    python -m pytest -q test_inventory.py
+
+EC2 and the database session are in-process fakes; no cloud credentials are needed.
+"""
+from utils import inventory_utils
+from utils.aws_utils import AWSCostManager
+from utils.inventory_utils import AWSResourceCollector, _run_bounded, content_hash, upsert_resources
+
+
+class FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, **kwargs):
+        return iter(self.pages)
+
+
+class FakeEC2:
+    def get_paginator(self, name):
+        if name == "describe_instances":
+            return FakePaginator([{"Reservations": [{"Instances": [
+                {"InstanceId": "i-1", "State": {"Name": "stopping"}, "InstanceType": "t3.micro",
+                 "Tags": [{"Key": "Name", "Value": "web"}],
+                 "BlockDeviceMappings": [{"Ebs": {"VolumeId": "vol-2"}}, {"Ebs": {"VolumeId": "vol-1"}}]},
+            ]}]}])
+        return FakePaginator([{"Volumes": [{"VolumeId": "vol-1", "State": "available", "Size": 8}]}])
+
+    def describe_addresses(self):
+        return {"Addresses": [{"PublicIp": "203.0.113.1", "AllocationId": "eipalloc-1"}]}
+
+
+class FakeSession:
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return self.existing if "SELECT resource_id" in str(statement) else []
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _resource(resource_id, status="running", tags=None):
+    return {"resource_id": resource_id, "resource_type": "ec2:instance", "resource_name": None,
+            "status": status, "region": "us-east-1", "tags": tags or {}, "configuration": {}}
+
+
+def test_region_scan_maps_instances_volumes_and_addresses(monkeypatch):
+    monkeypatch.setattr(inventory_utils, "aws_client", lambda *args, **kwargs: FakeEC2())
+    resources = AWSResourceCollector(AWSCostManager(access_key="AK", secret_key="s")).scan_region("us-east-1")
+    by_id = {r["resource_id"]: r for r in resources}
+
+    assert by_id["i-1"]["status"] == "stopped" and by_id["i-1"]["resource_name"] == "web"
+    assert by_id["i-1"]["configuration"]["volume_ids"] == ["vol-1", "vol-2"]
+    assert by_id["vol-1"]["status"] == "stopped" and by_id["vol-1"]["configuration"]["attached_instance_ids"] == []
+    assert by_id["eipalloc-1"]["resource_type"] == "ec2:elastic-ip" and by_id["eipalloc-1"]["status"] == "stopped"
+
+
+def test_failed_scopes_are_reported_without_losing_the_rest():
+    def denied():
+        raise Exception("UnauthorizedOperation")
+
+    resources, report = _run_bounded({"us-east-1": lambda: [_resource("i-1")], "eu-west-1": denied}, 4)
+    assert [r["resource_id"] for r in resources] == ["i-1"]
+    assert report["us-east-1"]["resources"] == 1
+    assert report["eu-west-1"] == {"error": "UnauthorizedOperation"}
+
+
+def test_upsert_writes_only_changed_rows_and_terminates_missing():
+    unchanged = _resource("i-same", tags={"a": "1", "b": "2"})
+    existing = [("i-same", content_hash(_resource("i-same", tags={"b": "2", "a": "1"})), "running"),
+                ("i-changed", "old", "running"), ("i-gone", "old", "running"), ("i-dead", None, "terminated")]
+    db = FakeSession(existing)
+
+    counts = upsert_resources(db, "integration", [unchanged, _resource("i-changed"), _resource("i-new"),
+                                                  _resource("i-new")])
+    assert counts == {"scanned": 3, "inserted": 1, "updated": 1, "unchanged": 1, "terminated": 1}
+    upsert = next(params for sql, params in db.statements if "INSERT INTO resources" in sql)
+    assert upsert["resource_ids"] == ["i-changed", "i-new"]
+    terminate = next(params for sql, params in db.statements if "SET status = 'terminated'" in sql)
+    assert terminate["resource_ids"] == ["i-gone"]
+
+    # An incomplete scan never terminates what it did not see
+    counts = upsert_resources(FakeSession(existing), "integration", [unchanged], mark_missing=False)
+    assert counts["terminated"] == 0
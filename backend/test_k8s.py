@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Kubernetes cost allocation checks
+
+    python -m pytest -q test_k8s.py
+
+Uses synthetic snapshots from the metrics stand-in; no cluster or database is needed.
+"""
+from datetime import date
+
+import numpy as np
+import pyarrow.compute as pc
+import pytest
+
+from utils.k8s_utils import IDLE, allocate, standin_snapshots
+
+
+def _namespace_total(rollups, value=None):
+    rows = rollups.filter(pc.equal(rollups.column("dimension"), "namespace"))
+    if value is not None:
+        rows = rows.filter(pc.equal(rows.column("value"), value))
+    return float(np.sum(rows.column("cpu_cost").to_numpy()) + np.sum(rows.column("memory_cost").to_numpy()))
+
+
+def test_pods_and_idle_add_up_to_node_hour_cost():
+    snapshots = standin_snapshots(120, date(2026, 1, 5), hours=6, nodes=3)
+    rollups, report = allocate(snapshots)
+
+    node_hour_cost = 3 * 6 * 0.768
+    assert report["node_hours"] == 18
+    assert report["total_cost"] == pytest.approx(node_hour_cost)
+    assert _namespace_total(rollups) == pytest.approx(node_hour_cost)
+    assert _namespace_total(rollups, IDLE) == pytest.approx(report["idle_cost"])
+    assert report["allocated_cost"] + report["idle_cost"] == pytest.approx(node_hour_cost)
+    # Every label dimension splits the same pod cost
+    labels = rollups.filter(pc.equal(rollups.column("dimension"), "label:team"))
+    assert float(np.sum(labels.column("cpu_cost").to_numpy()) + np.sum(labels.column("memory_cost").to_numpy())) \
+        == pytest.approx(report["allocated_cost"])
+
+
+def test_day_costs_replace_the_hourly_fallback():
+    snapshots = standin_snapshots(60, date(2026, 1, 5), hours=4, nodes=2)
+    rollups, report = allocate(snapshots, {(f"i-{0:017x}", "2026-01-05"): 10.0})
+
+    # node-0 spreads its day cost over the 4 hours it was seen; node-1 keeps 0.768 an hour
+    assert report["node_hours_priced_from_cost_data"] == 4
+    assert _namespace_total(rollups) == pytest.approx(10.0 + 4 * 0.768)
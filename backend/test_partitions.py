@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Partition maintenance locking checks
+
+    python -m pytest -q test_partitions.py
+
+Needs the database in DATABASE_URL; skipped when it cannot connect.
+"""
+import pytest
+from sqlalchemy import text
+
+from database import engine
+from utils.partition_utils import _MAINTENANCE_LOCK, maintenance_session
+
+
+def _lock_holders():
+    with engine.connect() as connection:
+        return connection.execute(text("""
+            SELECT pid FROM pg_locks
+            WHERE locktype = 'advisory' AND granted
+              AND ((classid::bigint << 32) | objid::bigint) = :key
+        """), {"key": _MAINTENANCE_LOCK}).scalars().all()
+
+
+@pytest.fixture(autouse=True)
+def database():
+    try:
+        _lock_holders()
+    except Exception as e:
+        pytest.skip(f"Database unavailable: {e}")
+
+
+def test_lock_survives_commits_and_is_released():
+    with maintenance_session() as db:
+        assert db is not None
+        pid = db.execute(text("SELECT pg_backend_pid()")).scalar()
+        db.commit()
+        # A plain session could continue on another pooled connection after committing
+        assert db.execute(text("SELECT pg_backend_pid()")).scalar() == pid
+        assert _lock_holders() == [pid]
+        with maintenance_session() as other:
+            assert other is None
+    assert _lock_holders() == []
+
+
+def test_lock_is_released_when_maintenance_fails():
+    with pytest.raises(RuntimeError):
+        with maintenance_session() as db:
+            db.execute(text("SELECT 1"))
+            db.commit()
+            raise RuntimeError("boom")
+    assert _lock_holders() == []
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Period-over-period comparison checks
+
+    python -m pytest -q test_periods.py
+
+Cost rows come from in-process loaders; no provider or database is needed.
+"""
+import uuid
+
+import numpy as np
+import pytest
+
+from utils.period_utils import KEY_SEPARATOR, compare_source, comparison_windows, fetch_windows, summarize
+
+
+def test_comparison_windows():
+    assert comparison_windows("wow", as_of="2026-03-10") == (("2026-03-04", "2026-03-11"), ("2026-02-25", "2026-03-04"))
+    # Month to date against the same days of last month, cut at its end
+    assert comparison_windows("MoM", as_of="2026-03-31") == (("2026-03-01", "2026-04-01"), ("2026-02-01", "2026-03-01"))
+    assert comparison_windows("mom", as_of="2026-03-05") == (("2026-03-01", "2026-03-06"), ("2026-02-01", "2026-02-06"))
+    assert comparison_windows("yoy", as_of="2024-02-29") == (("2024-02-01", "2024-03-01"), ("2023-02-01", "2023-03-01"))
+    assert comparison_windows("custom", current_start="2026-01-10", current_end="2026-01-20",
+                              previous_start="2025-01-10", previous_end="2025-01-20") \
+        == (("2026-01-10", "2026-01-20"), ("2025-01-10", "2025-01-20"))
+    with pytest.raises(ValueError):
+        comparison_windows("qoq")
+    with pytest.raises(ValueError):
+        comparison_windows("custom", current_start="2026-01-10")
+    with pytest.raises(ValueError, match="Empty comparison window"):
+        comparison_windows("custom", current_start="2026-01-10", current_end="2026-01-10",
+                           previous_start="2025-01-10", previous_end="2025-01-20")
+
+
+def test_fetch_windows_merges_nearby_windows_only():
+    current, previous = comparison_windows("mom", as_of="2026-03-05")
+    assert fetch_windows([current, previous]) == [("2026-02-01", "2026-03-06")]
+    current, previous = comparison_windows("yoy", as_of="2026-03-05")
+    assert fetch_windows([current, previous]) == [("2025-03-01", "2025-03-06"), ("2026-03-01", "2026-03-06")]
+
+
+def _rows(*entries):
+    return ([day for day, _, _ in entries], [f"aws{KEY_SEPARATOR}{service}" for _, service, _ in entries],
+            [amount for _, _, amount in entries], ["USD"] * len(entries))
+
+
+def test_closed_previous_windows_are_fetched_once():
+    loads = []
+
+    def load(window):
+        loads.append(window)
+        return _rows(("2020-01-02", "EC2", 5.0), ("2020-01-09", "EC2", 7.0), ("2020-01-10", "S3", 1.0))
+
+    current, previous = ("2020-01-08", "2020-01-15"), ("2020-01-01", "2020-01-08")
+    identity = f"aws:{uuid.uuid4().hex}"
+    first = compare_source(identity, load, current, previous, "USD")
+    assert loads == [("2020-01-01", "2020-01-15")] and not first["previous_cached"]
+    assert dict(zip(first["current"][0].tolist(), first["current"][1].tolist())) == {
+        f"aws{KEY_SEPARATOR}EC2": 7.0, f"aws{KEY_SEPARATOR}S3": 1.0,
+    }
+
+    second = compare_source(identity, load, current, previous, "USD")
+    assert loads[1:] == [current] and second["previous_cached"]
+    assert second["previous"][1].tolist() == [5.0]
+
+
+def _totals(**amounts):
+    labels = np.array([label.replace("__", KEY_SEPARATOR) for label in amounts], dtype=str)
+    return labels, np.array(list(amounts.values()), dtype=np.float64)
+
+
+def test_summarize_across_sources():
+    summary = summarize([
+        {"current": _totals(aws__EC2=120.0, aws__S3=10.0), "previous": _totals(aws__EC2=100.0, aws__S3=10.0)},
+        {"current": _totals(gcp__BigQuery=30.0), "previous": _totals(gcp__GCS=5.0)},
+        {"current": _totals(aws__EC2=5.0), "previous": _totals()},
+    ], top=2)
+
+    assert (summary["current_total"], summary["previous_total"], summary["delta"]) == (165.0, 115.0, 50.0)
+    assert summary["percent_change"] == 43.48
+    assert summary["providers"]["aws"] == {"current": 135.0, "previous": 110.0, "delta": 25.0, "percent_change": 22.73}
+    assert summary["services_compared"] == 4
+    assert [(m["service"], m["delta"], m["percent_change"]) for m in summary["top_movers"]] == [
+        ("BigQuery", 30.0, None), ("EC2", 25.0, 25.0),
+    ]
+    assert summarize([], top=5)["top_movers"] == []
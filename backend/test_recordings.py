@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Recorded provider response checks
+
+    python -m pytest -q test_recordings.py
+
+Uses a throwaway SQLite store; no cloud credentials are needed.
+"""
+import uuid
+
+import pytest
+
+from utils import aws_utils
+from utils.aws_utils import AWSCostManager
+from utils.recording_utils import RecordingMissError, ResponseStore
+
+_PAGE = {"ResultsByTime": [{"TimePeriod": {"Start": "2026-01-01", "End": "2026-02-01"},
+                            "Groups": [{"Keys": ["EC2"], "Metrics": {"UnblendedCost": {"Amount": "42", "Unit": "USD"}}}]}]}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    def record(mode):
+        store = ResponseStore(path=str(tmp_path / "recordings.db"), mode=mode)
+        monkeypatch.setattr(aws_utils, "response_store", store)
+        return store
+    return record
+
+
+def test_replay_needs_the_recorded_secret(store, monkeypatch):
+    key = "AK" + uuid.uuid4().hex[:8]
+    good = AWSCostManager(access_key=key, secret_key="right")
+    bad = AWSCostManager(access_key=key, secret_key="wrong")
+    upstream = []
+
+    def client(self):
+        upstream.append(self.secret_key)
+        if self.secret_key != "right":
+            raise Exception("SignatureDoesNotMatch")
+
+        class Client:
+            def get_cost_and_usage(self, **request):
+                return dict(_PAGE)
+        return Client()
+
+    monkeypatch.setattr(AWSCostManager, "_get_cost_explorer_client", client)
+    store("record")
+    assert good.get_costs("2026-01-01", "2026-02-01", group_by=["SERVICE"])[0].amount == 42.0
+
+    replay = store("replay")
+    assert good.get_costs("2026-01-01", "2026-02-01", group_by=["SERVICE"])[0].amount == 42.0
+    with pytest.raises(Exception, match="SignatureDoesNotMatch"):
+        bad.get_costs("2026-01-01", "2026-02-01", group_by=["SERVICE"])
+    assert upstream == ["right", "wrong"]
+    assert replay.replayed == 1
+
+    store("offline")
+    with pytest.raises(Exception) as error:
+        bad.get_costs("2026-01-01", "2026-02-01", group_by=["SERVICE"])
+    assert isinstance(error.value.__context__, RecordingMissError)
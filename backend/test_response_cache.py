@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Conditional GET and response cache checks
+
+    python -m pytest -q test_response_cache.py
+
+Runs the middleware on a small in-process app; no providers are called.
+"""
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config import settings
+from middleware import conditional_get
+from utils import response_cache_utils
+from utils.cache_utils import cost_cache, mark_incomplete, record_dependency
+from utils.response_cache_utils import etag_matches, negotiate_encoding
+
+
+def _summary(failed):
+    app = FastAPI()
+    app.middleware("http")(conditional_get)
+    key = f"test|{uuid.uuid4().hex}"
+
+    @app.get("/api/v1/dashboard/summary")
+    def summary():
+        record_dependency(cost_cache, cost_cache.get_or_load_entry(key, lambda: 1.0))
+        if failed:
+            mark_incomplete()
+        return {"unavailable_providers": ["aws"] if failed else []}
+
+    client = TestClient(app)
+    # The query keeps each test's responses apart in the shared response cache
+    run = uuid.uuid4().hex
+    return lambda **kwargs: client.get("/api/v1/dashboard/summary", params={"run": run}, **kwargs)
+
+
+def test_complete_responses_are_cached():
+    get = _summary(failed=False)
+    assert get().headers["X-Response-Cache"] == "MISS"
+    cached = get()
+    assert cached.headers["X-Response-Cache"] == "HIT"
+    assert get(headers={"If-None-Match": cached.headers["ETag"]}).status_code == 304
+
+
+def test_partial_responses_are_not_cached():
+    get = _summary(failed=True)
+    for _ in range(2):
+        response = get()
+        assert response.headers["X-Response-Cache"] == "MISS"
+        assert response.json()["unavailable_providers"] == ["aws"]
+
+
+def test_encoding_negotiation(monkeypatch):
+    monkeypatch.setattr(settings, "compression_min_bytes", 100)
+    monkeypatch.setattr(response_cache_utils, "brotli", object())
+    assert negotiate_encoding("gzip, br", 1000) == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", 1000) == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0", 1000) is None
+    assert negotiate_encoding("*", 1000) == "br"
+    assert negotiate_encoding("identity", 1000) is None
+    assert negotiate_encoding("gzip;q=oops, br", 1000) == "br"
+    assert negotiate_encoding("gzip, br", 99) is None
+    monkeypatch.setattr(response_cache_utils, "brotli", None)
+    assert negotiate_encoding("br, gzip;q=0.1", 1000) == "gzip"
+
+
+def test_etags_match_any_encoding_of_the_body():
+    assert etag_matches('"abc"', "abc")
+    assert etag_matches('"abc-gzip"', "abc")
+    assert etag_matches('W/"abc-br"', "abc")
+    assert etag_matches('"old", "abc-br"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('"abcd"', "abc")
+    assert not etag_matches(None, "abc") and not etag_matches("", "abc")
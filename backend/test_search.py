@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Resource search helper checks
+
+    python -m pytest -q test_search.py
+
+Cursor, range and filter helpers are pure; search_resources runs against a fake session.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from utils.search_utils import (
+    _like_pattern, _prefix_range, decode_cursor, encode_cursor, parse_tag_filters, search_resources
+)
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = []
+
+    def execute(self, statement, params):
+        self.params.append(params)
+        return SimpleNamespace(all=lambda: [SimpleNamespace(_mapping=row) for row in self.rows[:params["limit"]]])
+
+
+def _row(label, row_id):
+    return {"id": row_id, "integration_id": "i", "resource_id": label, "resource_type": "ec2:instance",
+            "resource_name": label, "status": "running", "region": "us-east-1", "tags": {},
+            "monthly_cost": None, "sort_label": label, "score": None}
+
+
+def test_cursor_round_trip():
+    for values in (["web-01", "00000000-0000-0000-0000-000000000001"], [0.42, "id"], ["\u00fcn\u00efcode/+=", "id"]):
+        cursor = encode_cursor(values)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == values
+    for bad in ("not base64!", encode_cursor(["only-one"]), encode_cursor({"a": 1})):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(bad)
+
+
+def test_prefix_range_covers_exactly_the_prefix():
+    low, high = _prefix_range("web")
+    assert (low, high) == ("web", "wec")
+    inside = ["web", "web-01", "webz", "web\uffff"]
+    outside = ["we", "wea", "wec", "wec-01", "x"]
+    assert all(low <= value < high for value in inside)
+    assert not any(low <= value < high for value in outside)
+
+
+def test_like_patterns_and_tag_filters():
+    assert _like_pattern("50%_off\\") == "%50\\%\\_off\\\\%"
+    assert _like_pattern("db", prefix_only=True) == "db%"
+    assert parse_tag_filters(["team:web", "env", "url:http://x"]) == ({"team": "web", "url": "http://x"}, ["env"])
+    with pytest.raises(ValueError):
+        parse_tag_filters([":value"])
+
+
+def test_next_cursor_resumes_after_the_last_row():
+    db = FakeSession([_row("web-01", "1"), _row("web-02", "2"), _row("web-03", "3")])
+    page = search_resources(db, q="Web", limit=2)
+
+    assert [r["resource_id"] for r in page["results"]] == ["web-01", "web-02"]
+    assert "sort_label" not in page["results"][0] and "score" not in page["results"][0]
+    assert db.params[0]["low"] == "web" and db.params[0]["limit"] == 3
+
+    search_resources(db, q="Web", limit=2, cursor=page["next_cursor"])
+    assert (db.params[1]["c_label"], db.params[1]["c_id"]) == ("web-02", "2")
+    assert search_resources(FakeSession([_row("web-01", "1")]), q="web", limit=2)["next_cursor"] is None
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events provider streaming checks
+
+    python -m pytest -q test_stream.py
+
+Provider fetches are in-process fakes with fixed delays.
+"""
+import asyncio
+import json
+import time
+
+from routers.dashboard import _stream_providers
+
+
+def _events(chunks):
+    events = []
+    for chunk in chunks:
+        event, data = chunk.strip().split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def _fetch(provider, delay):
+    time.sleep(delay)
+    if provider == "azure":
+        raise Exception("AuthorizationFailed")
+    return {"total": delay}
+
+
+async def _collect(managers, limit=None):
+    chunks = []
+    stream = _stream_providers(managers, _fetch, lambda provider, result: dict(result),
+                               lambda results: {"providers": sorted(results)})
+    async for chunk in stream:
+        chunks.append(chunk)
+        if limit and len(chunks) == limit:
+            await stream.aclose()
+            break
+    return _events(chunks)
+
+
+def test_providers_are_emitted_as_they_complete():
+    events = asyncio.run(_collect({"aws": 0.2, "azure": 0.1, "gcp": 0.0}))
+
+    assert events[0] == ("start", {"providers": ["aws", "azure", "gcp"]})
+    assert [(name, data["provider"]) for name, data in events[1:4]] == [
+        ("provider", "gcp"), ("provider_error", "azure"), ("provider", "aws"),
+    ]
+    assert events[2][1]["error"] == "AuthorizationFailed"
+    assert [(data["completed"], data["pending"]) for _, data in events[1:4]] == [(1, 2), (2, 1), (3, 0)]
+    assert events[4] == ("summary", {"providers": ["aws", "azure", "gcp"]})
+
+
+def test_closing_the_stream_cancels_pending_fetches():
+    async def run():
+        events = await _collect({"aws": 0.0, "gcp": 0.3}, limit=2)
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.sleep(0)
+        return events, pending
+
+    events, pending = asyncio.run(run())
+    assert [name for name, _ in events] == ["start", "provider"]
+    # The gcp fetch was still running when the client went away
+    assert len(pending) == 1 and pending[0].cancelled()
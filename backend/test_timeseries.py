@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Checks for server-side cost series bucketing
+
+    python -m pytest -q test_timeseries.py
+"""
+from utils.timeseries_utils import build_timeseries
+
+DATES = ["2026-01-01", "2026-01-02", "2026-01-01"]
+LABELS = ["a", "b", "c"]
+AMOUNTS = [1.0, 2.0, 3.0]
+
+
+def _series(max_series):
+    result = build_timeseries(DATES, LABELS, AMOUNTS, "day", "UTC", None, max_series)
+    return [(series["name"], series["total"]) for series in result["series"]]
+
+
+def test_max_series_counts_other():
+    assert _series(1) == [("Other", 6.0)]
+    assert _series(2) == [("c", 3.0), ("Other", 3.0)]
+    assert _series(3) == [("c", 3.0), ("b", 2.0), ("a", 1.0)]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Request tracing checks
+
+    python -m pytest -q test_trace.py
+
+Spans are built with fixed timings, so the folded weights are exact.
+"""
+from config import settings
+from utils.trace_utils import Span, Trace, Tracer, span, traced
+
+
+def _span(trace, span_id, parent, name, start, end):
+    s = Span(span_id, parent, name, {}, start)
+    s.end = end
+    trace.spans.append(s)
+
+
+def test_folded_weighs_span_paths_by_self_time():
+    trace = Trace("GET", "/api/v1/aws/costs", profile=False)
+    _span(trace, 1, None, "request", 0.0, 0.010)
+    _span(trace, 2, 1, "planner", 0.001, 0.007)
+    _span(trace, 3, 2, "fetch", 0.002, 0.006)
+    _span(trace, 4, 1, "planner", 0.007, 0.009)
+    _span(trace, 5, 1, "open", 0.009, None)
+
+    assert trace.folded() == (
+        "request 2000\n"
+        "request;planner 4000\n"
+        "request;planner;fetch 4000\n"
+    )
+
+
+def test_folded_samples():
+    trace = Trace("GET", "/", profile=True)
+    trace.samples.update({"main;handler;query": 3, "main;handler": 1})
+    assert trace.folded("samples") == "main;handler 1\nmain;handler;query 3\n"
+
+
+def test_spans_nest_only_inside_a_trace(monkeypatch):
+    monkeypatch.setattr(settings, "trace_sample_rate", 0.0)
+    tracer = Tracer(buffer_size=2)
+    assert tracer.mode("profile") == "profile" and tracer.mode(" TRUE ") == "trace"
+    assert tracer.mode(None) is None and tracer.mode("0") is None
+
+    @traced("work")
+    def work():
+        with span("inner", rows=3):
+            pass
+
+    work()
+    trace = tracer.start("GET", "/x", profile=False)
+    work()
+    tracer.finish(trace, 200)
+
+    assert [(s.name, s.parent) for s in trace.spans] == [("work", None), ("inner", trace.spans[0].id)]
+    assert trace.spans[1].attrs == {"rows": 3} and trace.status == 200
+    assert tracer.get(trace.id) is trace
+    for _ in range(2):
+        tracer.finish(tracer.start("GET", "/y", profile=False), 200)
+    assert tracer.get(trace.id) is None
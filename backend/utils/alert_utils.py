@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import smtplib
+from collections import defaultdict
+from email.message import EmailMessage
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Alerts whose scope touches the changed integrations. Integration-level alerts
+# match directly, user-wide alerts (integration_id IS NULL) match through the
+# integration owner.
+_CHANGED_ALL = "SELECT id, user_id FROM cloud_integrations"
+_CHANGED_SUBSET = (
+    "SELECT id, user_id FROM cloud_integrations "
+    "WHERE id = ANY(CAST(:integration_ids AS uuid[]))"
+)
+
+_EVALUATE_SQL = """
+WITH changed AS (
+    {changed}
+),
+candidate AS (
+    SELECT a.id, a.user_id, a.integration_id
+    FROM cost_alerts a
+    JOIN changed c ON a.integration_id = c.id
+    WHERE a.is_active
+    UNION
+    SELECT a.id, a.user_id, a.integration_id
+    FROM cost_alerts a
+    JOIN (SELECT DISTINCT user_id FROM changed) u ON a.user_id = u.user_id
+    WHERE a.is_active AND a.integration_id IS NULL
+),
+scope AS (
+    SELECT c.id AS alert_id, c.integration_id
+    FROM candidate c
+    WHERE c.integration_id IS NOT NULL
+    UNION ALL
+    SELECT c.id AS alert_id, ci.id AS integration_id
+    FROM candidate c
+    JOIN cloud_integrations ci ON ci.user_id = c.user_id
+    WHERE c.integration_id IS NULL
+),
+spend AS (
+    SELECT
+        cd.integration_id,
+        COALESCE(SUM(cd.cost_amount) FILTER (
+            WHERE cd.billing_period_start = CURRENT_DATE
+        ), 0) AS daily_spend,
+        COALESCE(SUM(cd.cost_amount) FILTER (
+            WHERE cd.billing_period_start >= DATE_TRUNC('month', CURRENT_DATE)
+        ), 0) AS monthly_spend,
+        SUM(cd.cost_amount) AS total_spend
+    FROM cost_data cd
+    WHERE cd.integration_id IN (SELECT DISTINCT integration_id FROM scope)
+    GROUP BY cd.integration_id
+),
+evaluated AS (
+    SELECT
+        a.id,
+        SUM(
+            CASE a.threshold_type
+                WHEN 'daily' THEN s.daily_spend
+                WHEN 'total' THEN s.total_spend
+                ELSE s.monthly_spend
+            END
+        ) AS current_spend
+    FROM cost_alerts a
+    JOIN scope sc ON sc.alert_id = a.id
+    JOIN spend s ON s.integration_id = sc.integration_id
+    GROUP BY a.id
+)
+UPDATE cost_alerts a
+SET last_triggered_at = CURRENT_TIMESTAMP
+FROM evaluated e, users u
+WHERE a.id = e.id
+  AND u.id = a.user_id
+  AND e.current_spend >= a.threshold_amount
+  AND (
+      a.last_triggered_at IS NULL
+      OR (a.threshold_type = 'daily' AND a.last_triggered_at < CURRENT_DATE)
+      OR (a.threshold_type = 'total' AND a.updated_at > a.last_triggered_at)
+      OR (a.threshold_type NOT IN ('daily', 'total')
+          AND a.last_triggered_at < DATE_TRUNC('month', CURRENT_DATE))
+  )
+RETURNING a.id, a.user_id, a.integration_id, a.name, a.threshold_amount,
+          a.threshold_type, a.notification_channels, a.last_triggered_at,
+          e.current_spend, u.email
+"""
+
+
+class CostAlertEvaluator:
+    """Set-based evaluation of cost_alerts against running spend.
+
+    All active alerts in scope are checked with a single statement. The
+    ``UPDATE ... RETURNING`` only matches alerts that have not fired in the
+    current window (day, month, or since the alert was last edited for
+    ``total`` alerts), so concurrent evaluations cannot notify twice.
+    """
+
+    def evaluate(self, db: Session, integration_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Evaluate alerts touching the given integrations (all when None)"""
+        params: Dict[str, Any] = {}
+        if integration_ids is None:
+            changed = _CHANGED_ALL
+        else:
+            ids = sorted({str(i) for i in integration_ids})
+            if not ids:
+                return []
+            changed = _CHANGED_SUBSET
+            params["integration_ids"] = ids
+
+        try:
+            result = db.execute(text(_EVALUATE_SQL.format(changed=changed)), params)
+            triggered = [dict(row._mapping) for row in result]
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to evaluate cost alerts: {str(e)}")
+
+        return [
+            {
+                "alert_id": str(row["id"]),
+                "user_id": str(row["user_id"]),
+                "integration_id": str(row["integration_id"]) if row["integration_id"] else None,
+                "name": row["name"],
+                "threshold_amount": float(row["threshold_amount"]),
+                "threshold_type": row["threshold_type"],
+                "current_spend": float(row["current_spend"]),
+                "notification_channels": row["notification_channels"] or [],
+                "user_email": row["email"],
+                "triggered_at": row["last_triggered_at"].isoformat() if row["last_triggered_at"] else None,
+            }
+            for row in triggered
+        ]
+
+
+def _normalize_channel(channel: Any, user_email: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Turn a notification_channels entry into a (type, target) pair"""
+    if isinstance(channel, str):
+        if channel.lower() == "email" and user_email:
+            return ("email", user_email)
+        return None
+
+    if isinstance(channel, dict):
+        channel_type = str(channel.get("type", "")).lower()
+        if channel_type == "email":
+            target = channel.get("to") or channel.get("address") or user_email
+        elif channel_type == "slack":
+            target = channel.get("webhook_url") or channel.get("url")
+        elif channel_type == "webhook":
+            target = channel.get("url")
+        else:
+            return None
+        if target:
+            return (channel_type, target)
+    return None
+
+
+def _format_alert_line(alert: Dict[str, Any]) -> str:
+    return (
+        f"{alert['name']}: {alert['threshold_type']} spend "
+        f"{alert['current_spend']:.2f} exceeded threshold {alert['threshold_amount']:.2f}"
+    )
+
+
+class AlertNotificationDispatcher:
+    """Async, batched delivery of triggered alerts to notification channels.
+
+    Triggered alerts are queued and flushed every
+    ``alert_dispatch_interval_seconds`` or once ``alert_dispatch_batch_size``
+    alerts are pending. A flush groups alerts by channel target, so one
+    webhook, Slack hook or mailbox gets a single delivery per batch, and
+    repeated (alert, target) pairs in a batch are dropped.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, interval: Optional[float] = None):
+        self.batch_size = batch_size or settings.alert_dispatch_batch_size
+        self.interval = interval or settings.alert_dispatch_interval_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: List[Dict[str, Any]] = []
+
+    async def start(self):
+        """Start the background flush loop on the running event loop"""
+        if self._worker:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush pending alerts and stop the background loop"""
+        if not self._worker:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        pending = self._pending + self._drain()
+        self._pending = []
+        if pending:
+            await self.deliver(pending)
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    def submit(self, alerts: List[Dict[str, Any]]):
+        """Queue triggered alerts for delivery; safe to call from worker threads"""
+        if not alerts:
+            return
+        if self._loop and self._queue is not None and self._loop.is_running():
+            for alert in alerts:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, alert)
+            return
+
+        # No dispatcher loop (CLI ingestion, scripts): deliver inline
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.deliver(alerts))
+        else:
+            logger.warning("Alert dispatcher not started; dropping %d notifications", len(alerts))
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        pending = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        return pending
+
+    async def _run(self):
+        while True:
+            self._pending.append(await self._queue.get())
+            deadline = self._loop.time() + self.interval
+            while len(self._pending) < self.batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._pending = self._pending, []
+            try:
+                await self.deliver(batch)
+            except Exception as e:
+                logger.error(f"Alert delivery failed: {str(e)}")
+
+    async def deliver(self, alerts: List[Dict[str, Any]]):
+        """Deliver one batch of alerts, one request per channel target"""
+        grouped: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        seen = set()
+        for alert in alerts:
+            for channel in alert.get("notification_channels", []):
+                normalized = _normalize_channel(channel, alert.get("user_email"))
+                if not normalized or (alert["alert_id"], normalized) in seen:
+                    continue
+                seen.add((alert["alert_id"], normalized))
+                grouped[normalized].append(alert)
+
+        if not grouped:
+            return
+
+        async with httpx.AsyncClient(timeout=settings.alert_dispatch_timeout_seconds) as client:
+            results = await asyncio.gather(
+                *[self._send(client, channel_type, target, batch)
+                  for (channel_type, target), batch in grouped.items()],
+                return_exceptions=True,
+            )
+
+        for (channel_type, _), result in zip(grouped.keys(), results):
+            if isinstance(result, Exception):
+                logger.error(f"{channel_type} alert notification failed: {str(result)}")
+
+    async def _send(self, client: httpx.AsyncClient, channel_type: str, target: str,
+                    alerts: List[Dict[str, Any]]):
+        if channel_type == "webhook":
+            payload = {
+                "alerts": [
+                    {key: value for key, value in alert.items()
+                     if key not in ("notification_channels", "user_email")}
+                    for alert in alerts
+                ]
+            }
+            response = await client.post(target, json=payload)
+            response.raise_for_status()
+        elif channel_type == "slack":
+            lines = "\n".join(f"• {_format_alert_line(alert)}" for alert in alerts)
+            response = await client.post(target, json={"text": f"CloudSpy cost alerts\n{lines}"})
+            response.raise_for_status()
+        elif channel_type == "email":
+            await asyncio.to_thread(self._send_email, target, alerts)
+
+    def _send_email(self, recipient: str, alerts: List[Dict[str, Any]]):
+        if not settings.smtp_host:
+            raise Exception("SMTP host is not configured")
+
+        message = EmailMessage()
+        message["Subject"] = f"CloudSpy: {len(alerts)} cost alert(s) triggered"
+        message["From"] = settings.from_email
+        message["To"] = recipient
+        message.set_content("\n".join(_format_alert_line(alert) for alert in alerts))
+
+        with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as smtp:
+            smtp.starttls()
+            if settings.smtp_user:
+                smtp.login(settings.smtp_user, settings.smtp_password or "")
+            smtp.send_message(message)
+
+
+# Shared instances, started and stopped with the application lifespan
+alert_evaluator = CostAlertEvaluator()
+alert_dispatcher = AlertNotificationDispatcher()
+
+
+def evaluate_and_dispatch(db: Session, integration_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Evaluate alerts for changed integrations and queue notifications"""
+    triggered = alert_evaluator.evaluate(db, integration_ids)
+    alert_dispatcher.submit(triggered)
+    return triggered
@@ -0,0 +1,233 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+
+MATCH_TYPES = ("tag_equals", "tag_prefix", "tag_regex", "resource_prefix", "resource_regex", "account", "service")
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+# Sentinel rule index meaning "no rule matched"
+_NO_MATCH = 1 << 62
+
+
+def validate_rule(match_type: str, pattern: str, tag_key: Optional[str] = None):
+    """Reject rules that cannot be compiled into the combined matcher"""
+    if match_type not in MATCH_TYPES:
+        raise ValueError(f"Unsupported match_type '{match_type}'. Use one of: {', '.join(MATCH_TYPES)}")
+    if match_type.startswith("tag_") and not tag_key:
+        raise ValueError("tag_key is required for tag rules")
+    if match_type.endswith("_regex"):
+        try:
+            compiled = re.compile(pattern)
+            # Compile it the way the combined matcher embeds it, which rejects global flags like (?i)
+            re.compile(f"(?:x)|{_alternative(match_type, pattern, 0)}")
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{pattern}': {e}. Use scoped flags such as (?i:...)")
+        if compiled.groupindex or _BACKREFERENCE.search(pattern):
+            raise ValueError("Regex rules cannot use named groups or backreferences")
+
+
+def _alternative(match_type: str, pattern: str, index: int) -> str:
+    """One rule's branch of the combined alternation, closed by its marker group"""
+    # A lazy lead-in lets a regex match anywhere while the alternation keeps rule order
+    body = re.escape(pattern) if match_type.endswith("_prefix") else f"(?s:.*?)(?:{pattern})"
+    return f"(?:{body})(?P<r{index}>)"
+
+
+class CompiledRuleSet:
+    """An ordered allocation rule list compiled for bulk matching.
+
+    Exact rules (tag equals, account, service) become dict lookups. Prefix
+    and regex rules on the same field are merged into one alternation, in
+    rule order, with an empty marker group closing each alternative, so a
+    single ``match`` returns the earliest matching rule for that field. The
+    lowest rule index across all fields wins.
+
+    Prefix rules are anchored at the start of the value. Regex rules match
+    anywhere in it, like ``re.search``; use ``^`` or ``$`` to anchor them.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = rules
+        self._exact: Dict[Tuple[str, str, str], int] = {}
+        patterns: Dict[str, List[str]] = {}
+
+        for index, rule in enumerate(rules):
+            match_type, pattern = rule["match_type"], rule["pattern"]
+            if match_type == "tag_equals":
+                self._exact.setdefault(("tag", rule["tag_key"], pattern), index)
+            elif match_type in ("account", "service"):
+                self._exact.setdefault((match_type, "", pattern), index)
+            else:
+                field = f"tag:{rule['tag_key']}" if match_type.startswith("tag_") else "resource"
+                patterns.setdefault(field, []).append(_alternative(match_type, pattern, index))
+
+        self._regexes = {field: re.compile("|".join(alts)) for field, alts in patterns.items()}
+        self._tag_regex_keys = [field[4:] for field in self._regexes if field.startswith("tag:")]
+
+    def match(self, tags: Dict[str, Any], resource: Optional[str], account: Optional[str],
+              service: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The first rule (in rule order) matching one cost row's attributes"""
+        best = _NO_MATCH
+        exact = self._exact
+        for key, value in tags.items():
+            best = min(best, exact.get(("tag", key, str(value)), _NO_MATCH))
+        if account is not None:
+            best = min(best, exact.get(("account", "", account), _NO_MATCH))
+        if service is not None:
+            best = min(best, exact.get(("service", "", service), _NO_MATCH))
+
+        for key in self._tag_regex_keys:
+            value = tags.get(key)
+            if value is not None:
+                found = self._regexes[f"tag:{key}"].match(str(value))
+                if found:
+                    best = min(best, int(found.lastgroup[1:]))
+        if resource is not None and "resource" in self._regexes:
+            found = self._regexes["resource"].match(resource)
+            if found:
+                best = min(best, int(found.lastgroup[1:]))
+
+        return None if best == _NO_MATCH else self.rules[best]
+
+
+class AllocationEngine:
+    """Compiled rule sets per user and a per-resource allocation cache"""
+
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache_size = cache_size or settings.allocation_cache_size
+        self._rule_sets: Dict[str, Tuple[Tuple[Any, int], CompiledRuleSet]] = {}
+        self._results: "OrderedDict[Tuple[Any, ...], Optional[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rule_set(self, db: Session, user_id: str) -> Tuple[Tuple[Any, int], CompiledRuleSet]:
+        """Compiled active rules for a user, rebuilt only when the rules changed"""
+        version = tuple(db.execute(text("""
+            SELECT MAX(updated_at), COUNT(*) FROM allocation_rules
+            WHERE user_id = CAST(:user_id AS uuid) AND is_active
+        """), {"user_id": user_id}).first())
+        with self._lock:
+            cached = self._rule_sets.get(user_id)
+            if cached and cached[0] == version:
+                return cached
+        rules = [dict(row._mapping) for row in db.execute(text("""
+            SELECT id::text, name, team, match_type, tag_key, pattern
+            FROM allocation_rules
+            WHERE user_id = CAST(:user_id AS uuid) AND is_active
+            ORDER BY priority, created_at, id
+        """), {"user_id": user_id})]
+        compiled = (version, CompiledRuleSet(rules))
+        with self._lock:
+            self._rule_sets[user_id] = compiled
+        return compiled
+
+    def allocate(self, user_id: str, version: Tuple[Any, int], rule_set: CompiledRuleSet,
+                 tags: Dict[str, Any], resource: Optional[str], account: Optional[str],
+                 service: Optional[str], tags_text: str) -> Optional[Dict[str, Any]]:
+        key = (user_id, version, resource, account, service, tags_text)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        rule = rule_set.match(tags, resource, account, service)
+        with self._lock:
+            self._results[key] = rule
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return rule
+
+
+allocation_engine = AllocationEngine()
+
+# One row per distinct attribute combination; the hash ties groups back to cost rows
+_GROUP_KEY = """md5(concat_ws(chr(31), c.service_name, c.resource_id,
+                 COALESCE(c.raw_data->>'account_id', c.integration_id::text), c.tags::text))"""
+
+
+def _row_filter(only_new: bool) -> str:
+    """Literal so the planner can use idx_cost_data_unallocated for new rows"""
+    return "AND c.allocated_at IS NULL" if only_new else ""
+
+
+def _update_allocation(only_new: bool):
+    # Every group goes in one statement: a single pass over the rows, hash joined on the group key
+    return text(f"""
+        UPDATE cost_data c
+        SET allocated_team = u.team,
+            allocation_rule_id = CAST(u.rule_id AS uuid),
+            allocated_at = CURRENT_TIMESTAMP
+        FROM unnest(CAST(:group_keys AS text[]), CAST(:teams AS text[]), CAST(:rule_ids AS text[]))
+             AS u(group_key, team, rule_id)
+        WHERE c.integration_id = CAST(:integration_id AS uuid)
+          {_row_filter(only_new)}
+          AND {_GROUP_KEY} = u.group_key
+    """)
+
+
+def apply_allocation(db: Session, integration_id: str, only_new: bool = False) -> Dict[str, Any]:
+    """Allocate an integration's cost rows to teams with its owner's compiled rules"""
+    owner = db.execute(text("""
+        SELECT user_id::text FROM cloud_integrations WHERE id = CAST(:integration_id AS uuid)
+    """), {"integration_id": integration_id}).scalar()
+    if owner is None:
+        raise ValueError("Integration not found")
+    version, rule_set = allocation_engine.rule_set(db, owner)
+    if only_new and not rule_set.rules:
+        return {"integration_id": integration_id, "rules": 0, "groups": 0, "rows": 0, "rows_allocated": 0}
+
+    groups = db.execute(text(f"""
+        SELECT {_GROUP_KEY} AS group_key, c.service_name, c.resource_id,
+               COALESCE(c.raw_data->>'account_id', c.integration_id::text) AS account,
+               c.tags::text AS tags_text, COALESCE(MAX(r.resource_name), c.resource_id) AS resource,
+               COUNT(*) AS row_count
+        FROM cost_data c
+        LEFT JOIN resources r ON r.integration_id = c.integration_id AND r.resource_id = c.resource_id
+        WHERE c.integration_id = CAST(:integration_id AS uuid)
+          {_row_filter(only_new)}
+        GROUP BY 1, 2, 3, 4, 5
+    """), {"integration_id": integration_id}).all()
+
+    assignments = []
+    allocated_rows = 0
+    for group in groups:
+        rule = allocation_engine.allocate(
+            owner, version, rule_set, json.loads(group.tags_text or "{}"),
+            group.resource, group.account, group.service_name, group.tags_text,
+        )
+        assignments.append((group.group_key, rule["team"] if rule else None, rule["id"] if rule else None))
+        allocated_rows += group.row_count if rule else 0
+
+    try:
+        if assignments:
+            db.execute(_update_allocation(only_new), {
+                "integration_id": integration_id,
+                "group_keys": [a[0] for a in assignments],
+                "teams": [a[1] for a in assignments],
+                "rule_ids": [a[2] for a in assignments],
+            })
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Failed to apply cost allocation: {str(e)}")
+
+    return {
+        "integration_id": integration_id,
+        "rules": len(rule_set.rules),
+        "groups": len(groups),
+        "rows": sum(group.row_count for group in groups),
+        "rows_allocated": allocated_rows,
+    }
+
+
+def allocate_new_rows(db: Session, integration_ids: List[str]) -> int:
+    """Allocate freshly ingested rows; a no-op for owners without active rules"""
+    allocated = 0
+    for integration_id in integration_ids:
+        allocated += apply_allocation(db, integration_id, only_new=True)["rows_allocated"]
+    return allocated
@@ -1,11 +1,102 @@
+import threading
+import time
 import boto3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from botocore.exceptions import ClientError, NoCredentialsError
+from config import settings
 from models.schemas import CostMetric
+from utils.identity_utils import credential_identity
+from utils.client_pool import aws_client
+from utils.recording_utils import response_store
+from utils.trace_utils import span, trace_methods
 
 
+class AssumedRoleCache:
+    """STS credentials per (source credentials, role), reused until close to expiry.
+
+    Each key has its own lock, so concurrent requests for one role make a
+    single AssumeRole call while different roles are assumed in parallel.
+    """
+
+    def __init__(self, refresh_seconds: Optional[int] = None):
+        self.refresh_seconds = (
+            refresh_seconds if refresh_seconds is not None else settings.aws_credential_refresh_seconds
+        )
+        self._entries: Dict[Tuple[str, Optional[str]], Tuple[Dict[str, str], float]] = {}
+        self._locks: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, role_arn: str, source_credentials: Optional[Dict[str, str]] = None,
+            session_name: str = "CloudSpyCostSession") -> Dict[str, str]:
+        source_credentials = source_credentials or {}
+        key = (role_arn, source_credentials.get("aws_access_key_id"))
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            cached = self._entries.get(key)
+            if cached and cached[1] - self.refresh_seconds > time.time():
+                return cached[0]
+
+            # Sessions are created per call; the default boto3 session is not thread-safe
+            with span("aws.sts.assume_role", role_arn=role_arn):
+                sts = boto3.session.Session(**source_credentials).client("sts")
+                creds = sts.assume_role(RoleArn=role_arn, RoleSessionName=session_name)["Credentials"]
+            credentials = {
+                "aws_access_key_id": creds["AccessKeyId"],
+                "aws_secret_access_key": creds["SecretAccessKey"],
+                "aws_session_token": creds["SessionToken"],
+            }
+            self._entries[key] = (credentials, creds["Expiration"].timestamp())
+            return credentials
+
+
+# Shared so role credentials are reused across requests
+assumed_role_cache = AssumedRoleCache()
+
+
+def _group_definition(dimension: str) -> Dict[str, str]:
+    """Cost Explorer GroupBy entry for SERVICE-style dimensions or TAG:<key>"""
+    if dimension.upper().startswith("TAG:"):
+        return {"Type": "TAG", "Key": dimension[4:]}
+    return {"Type": "DIMENSION", "Key": dimension.upper()}
+
+
+def _group_value(dimension: str, key: str) -> str:
+    """Group key as a plain value; only tag keys come back as "key$value" (untagged is "key$")"""
+    if dimension.upper().startswith("TAG:") and "$" in key:
+        return key.split("$", 1)[1]
+    return key
+
+
+def _response_body(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Cost Explorer response without the per-call HTTP metadata, as recorded"""
+    return {key: value for key, value in response.items() if key != "ResponseMetadata"}
+
+
+def _filter_expression(filters: Dict[str, str]) -> Dict[str, Any]:
+    """Cost Explorer Filter matching one value per dimension"""
+    expressions = []
+    for dimension, value in filters.items():
+        if dimension.upper().startswith("TAG:"):
+            tag = {"Key": dimension[4:]}
+            if value:
+                tag["Values"] = [value]
+            else:
+                tag["MatchOptions"] = ["ABSENT"]
+            expressions.append({"Tags": tag})
+        else:
+            expressions.append({"Dimensions": {"Key": dimension.upper(), "Values": [value]}})
+    return expressions[0] if len(expressions) == 1 else {"And": expressions}
+
+
+@trace_methods("aws")
 class AWSCostManager:
+    # Cost Explorer accepts at most two GroupBy keys per query
+    max_group_by = 2
+
     def __init__(
         self,
         role_arn: Optional[str] = None,
@@ -17,21 +108,17 @@ class AWSCostManager:
         self.access_key = access_key
         self.secret_key = secret_key
         self.session_token = session_token
-        self._ce_client = None
+
+    @property
+    def identity(self) -> str:
+        """Identity of the credentials, safe to use in cache keys"""
+        return credential_identity("aws", self.role_arn, self.access_key,
+                                   secrets=(self.secret_key, self.session_token))
 
     def _get_credentials(self) -> Dict[str, str]:
         """Get AWS credentials either from role assumption or direct credentials"""
         if self.role_arn:
-            sts = boto3.client("sts")
-            assumed = sts.assume_role(
-                RoleArn=self.role_arn, RoleSessionName="CloudSpyCostSession"
-            )
-            creds = assumed["Credentials"]
-            return {
-                "aws_access_key_id": creds["AccessKeyId"],
-                "aws_secret_access_key": creds["SecretAccessKey"],
-                "aws_session_token": creds["SessionToken"],
-            }
+            return assumed_role_cache.get(self.role_arn)
         elif self.access_key and self.secret_key:
             return {
                 "aws_access_key_id": self.access_key,
@@ -43,10 +130,7 @@ class AWSCostManager:
 
     def _get_cost_explorer_client(self):
         """Get Cost Explorer client with appropriate credentials"""
-        if not self._ce_client:
-            creds = self._get_credentials()
-            self._ce_client = boto3.client("ce", **creds)
-        return self._ce_client
+        return aws_client(self, "ce")
 
     def test_connection(self) -> Dict[str, Any]:
         """Test AWS connection and permissions"""
@@ -72,29 +156,47 @@ class AWSCostManager:
             return {"success": False, "error": str(e)}
 
     def get_costs(self, start_date: str, end_date: str, granularity: str = "MONTHLY", 
-                  group_by: List[str] = None) -> List[CostMetric]:
+                  group_by: List[str] = None, filters: Optional[Dict[str, str]] = None) -> List[CostMetric]:
         """Get cost data from AWS Cost Explorer"""
         if group_by is None:
             group_by = ["SERVICE"]
 
         try:
-            ce = self._get_cost_explorer_client()
+            group_by_params = [_group_definition(key) for key in group_by]
 
-            group_by_params = [{"Type": "DIMENSION", "Key": key} for key in group_by]
+            request = {
+                "TimePeriod": {"Start": start_date, "End": end_date},
+                "Granularity": granularity,
+                "Metrics": ["UnblendedCost", "NetUnblendedCost"],
+                "GroupBy": group_by_params,
+            }
+            if filters:
+                request["Filter"] = _filter_expression(filters)
 
-            response = ce.get_cost_and_usage(
-                TimePeriod={"Start": start_date, "End": end_date},
-                Granularity=granularity,
-                Metrics=["UnblendedCost", "NetUnblendedCost"],
-                GroupBy=group_by_params,
-            )
+            # DAILY queries over many groups are paginated by Cost Explorer
+            context = {"start_date": start_date, "end_date": end_date, "granularity": granularity,
+                       "group_by": group_by, "filters": filters}
+            results_by_time = []
+            while True:
+                # The client is built inside the fetch so replayed pages make no upstream call; the
+                # identity fingerprints the secret, so only these credentials replay their recordings
+                response = response_store.call(
+                    "aws", self.identity, "ce.get_cost_and_usage", request,
+                    lambda: _response_body(self._get_cost_explorer_client().get_cost_and_usage(**request)),
+                    context,
+                )
+                results_by_time.extend(response["ResultsByTime"])
+                if not response.get("NextPageToken"):
+                    break
+                request["NextPageToken"] = response["NextPageToken"]
 
             costs = []
-            for time_period in response["ResultsByTime"]:
+            for time_period in results_by_time:
                 period_start = time_period["TimePeriod"]["Start"]
 
                 for group in time_period["Groups"]:
-                    service_name = group["Keys"][0] if group["Keys"] else "Unknown"
+                    values = [_group_value(dimension, key) for dimension, key in zip(group_by, group["Keys"])]
+                    service_name = "|".join(values) if values else "Unknown"
                     amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
                     unit = group["Metrics"]["UnblendedCost"]["Unit"]
 
@@ -103,7 +205,9 @@ class AWSCostManager:
                             service=service_name,
                             amount=amount,
                             unit=unit,
+                            currency=unit,
                             date=period_start,
+                            dimensions=dict(zip(group_by, values)),
                         )
                     )
 
@@ -128,3 +232,186 @@ class AWSCostManager:
 
         except Exception as e:
             raise Exception(f"Failed to retrieve AWS services: {str(e)}")
+
+
+@trace_methods("aws")
+class AWSOrganizationManager:
+    """Per-account costs across an AWS Organization.
+
+    From the management (payer) account one Cost Explorer query grouped by
+    LINKED_ACCOUNT covers every member. Otherwise each member account's role
+    is assumed and queried concurrently, bounded by ``max_workers``.
+    """
+
+    def __init__(self, manager: AWSCostManager, member_role_name: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        self.manager = manager
+        self.member_role_name = member_role_name or settings.aws_org_member_role_name
+        self.max_workers = max_workers or settings.aws_org_max_workers
+
+    @property
+    def identity(self) -> str:
+        return credential_identity("aws-org", self.manager.identity, self.member_role_name)
+
+    def is_management_account(self) -> bool:
+        """Whether the manager's credentials belong to the organization's payer account"""
+        account = aws_client(self.manager, "sts").get_caller_identity()["Account"]
+        try:
+            organization = aws_client(self.manager, "organizations").describe_organization()["Organization"]
+        except ClientError as e:
+            # Member accounts are usually denied DescribeOrganization; fall back to member mode
+            if e.response.get("Error", {}).get("Code") in ("AccessDenied", "AccessDeniedException",
+                                                           "AWSOrganizationsNotInUseException"):
+                return False
+            raise
+        return organization["MasterAccountId"] == account
+
+    def list_accounts(self) -> List[Dict[str, str]]:
+        """Active accounts in the organization"""
+        try:
+            organizations = aws_client(self.manager, "organizations")
+            accounts = []
+            for page in organizations.get_paginator("list_accounts").paginate():
+                accounts.extend(
+                    {"id": account["Id"], "name": account.get("Name")}
+                    for account in page["Accounts"] if account.get("Status") == "ACTIVE"
+                )
+            return accounts
+        except Exception as e:
+            raise Exception(f"Failed to list AWS organization accounts: {str(e)}")
+
+    def get_payer_costs(self, start_date: str, end_date: str, granularity: str = "MONTHLY",
+                        group_by: Optional[List[str]] = None,
+                        account_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """All member accounts from a single LINKED_ACCOUNT-grouped payer query"""
+        group_by = group_by or ["SERVICE"]
+        if len(group_by) > 1:
+            # Cost Explorer allows two GroupBy keys and LINKED_ACCOUNT takes one
+            raise ValueError("Organization payer queries support a single group_by dimension")
+
+        started = time.perf_counter()
+        request = {
+            "TimePeriod": {"Start": start_date, "End": end_date},
+            "Granularity": granularity,
+            "Metrics": ["UnblendedCost"],
+            "GroupBy": [
+                {"Type": "DIMENSION", "Key": "LINKED_ACCOUNT"},
+                _group_definition(group_by[0]),
+            ],
+        }
+        if account_ids:
+            request["Filter"] = {"Dimensions": {"Key": "LINKED_ACCOUNT", "Values": account_ids}}
+
+        costs = []
+        names: Dict[str, str] = {}
+        pages = 0
+        try:
+            while True:
+                response = response_store.call(
+                    "aws", self.manager.identity, "ce.get_cost_and_usage", request,
+                    lambda: _response_body(self.manager._get_cost_explorer_client().get_cost_and_usage(**request)),
+                )
+                pages += 1
+                for attribute in response.get("DimensionValueAttributes", []):
+                    names[attribute["Value"]] = attribute.get("Attributes", {}).get("description")
+                for time_period in response["ResultsByTime"]:
+                    period_start = time_period["TimePeriod"]["Start"]
+                    for group in time_period["Groups"]:
+                        metric = group["Metrics"]["UnblendedCost"]
+                        costs.append(CostMetric(
+                            service=_group_value(group_by[0], group["Keys"][1]) if len(group["Keys"]) > 1 else "Unknown",
+                            amount=float(metric["Amount"]),
+                            unit=metric["Unit"],
+                            currency=metric["Unit"],
+                            date=period_start,
+                            account_id=group["Keys"][0],
+                        ))
+                if not response.get("NextPageToken"):
+                    break
+                request["NextPageToken"] = response["NextPageToken"]
+        except Exception as e:
+            raise Exception(f"Failed to retrieve AWS organization costs: {str(e)}")
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        totals: Dict[str, float] = {}
+        for cost in costs:
+            totals[cost.account_id] = totals.get(cost.account_id, 0.0) + cost.amount
+        accounts = [
+            {"account_id": account_id, "name": names.get(account_id), "status": "success",
+             "records": sum(1 for c in costs if c.account_id == account_id),
+             "total": round(total, 2), "elapsed_ms": elapsed_ms, "error": None}
+            for account_id, total in sorted(totals.items())
+        ]
+        return {"mode": "payer", "api_calls": pages, "accounts": accounts, "costs": costs}
+
+    def _member_costs(self, account: Dict[str, str], start_date: str, end_date: str,
+                      granularity: str, group_by: Optional[List[str]],
+                      source_credentials: Dict[str, str]) -> Tuple[List[CostMetric], Dict[str, Any]]:
+        started = time.perf_counter()
+        report = {"account_id": account["id"], "name": account.get("name")}
+        try:
+            creds = assumed_role_cache.get(
+                f"arn:aws:iam::{account['id']}:role/{self.member_role_name}", source_credentials
+            )
+            member = AWSCostManager(
+                access_key=creds["aws_access_key_id"],
+                secret_key=creds["aws_secret_access_key"],
+                session_token=creds["aws_session_token"],
+            )
+            costs = member.get_costs(start_date, end_date, granularity, group_by)
+            for cost in costs:
+                cost.account_id = account["id"]
+            report.update(status="success", records=len(costs),
+                          total=round(sum(c.amount for c in costs), 2), error=None)
+        except Exception as e:
+            costs = []
+            report.update(status="error", records=0, total=0.0, error=str(e))
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return costs, report
+
+    def get_member_costs(self, start_date: str, end_date: str, granularity: str = "MONTHLY",
+                         group_by: Optional[List[str]] = None,
+                         account_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Assume a role in every member account and query each one concurrently"""
+        accounts = self.list_accounts()
+        if account_ids:
+            wanted = set(account_ids)
+            accounts = [a for a in accounts if a["id"] in wanted]
+        if not accounts:
+            return {"mode": "member", "api_calls": 0, "accounts": [], "costs": []}
+
+        source_credentials = self.manager._get_credentials()
+        costs: List[CostMetric] = []
+        reports = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(accounts))) as pool:
+            futures = [
+                pool.submit(self._member_costs, account, start_date, end_date, granularity,
+                            group_by, source_credentials)
+                for account in accounts
+            ]
+            for future in futures:
+                account_costs, report = future.result()
+                costs.extend(account_costs)
+                reports.append(report)
+
+        return {"mode": "member", "api_calls": len(accounts), "accounts": reports, "costs": costs}
+
+    def get_costs(self, start_date: str, end_date: str, granularity: str = "MONTHLY",
+                  group_by: Optional[List[str]] = None, mode: str = "auto",
+                  account_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Merged organization costs with per-account timing and failures"""
+        if mode not in ("auto", "payer", "member"):
+            raise ValueError("mode must be one of: auto, payer, member")
+        started = time.perf_counter()
+        if mode == "auto":
+            mode = "payer" if self.is_management_account() and len(group_by or []) <= 1 else "member"
+
+        if mode == "payer":
+            result = self.get_payer_costs(start_date, end_date, granularity, group_by, account_ids)
+        else:
+            result = self.get_member_costs(start_date, end_date, granularity, group_by, account_ids)
+
+        result["accounts_total"] = len(result["accounts"])
+        result["accounts_failed"] = sum(1 for a in result["accounts"] if a["status"] == "error")
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
@@ -1,39 +1,85 @@
-from azure.identity import ClientSecretCredential, DefaultAzureCredential
 from azure.mgmt.costmanagement import CostManagementClient
 from azure.mgmt.resource import ResourceManagementClient
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from models.schemas import CostMetric
+from utils.identity_utils import credential_identity
+from utils.client_pool import azure_client, azure_credential
+from utils.recording_utils import response_store
+from utils.trace_utils import trace_methods
 
+# Group-by dimensions mapped to Cost Management query dimensions
+_DIMENSIONS = {
+    "SERVICE": "ServiceName",
+    "RESOURCE": "ResourceId",
+    "REGION": "ResourceLocation",
+    "RESOURCE_GROUP": "ResourceGroupName",
+    "METER_CATEGORY": "MeterCategory",
+    "SUBSCRIPTION": "SubscriptionId",
+}
+
+
+def _grouping(dimension: str) -> Dict[str, str]:
+    if dimension.upper().startswith("TAG:"):
+        return {"type": "TagKey", "name": dimension[4:]}
+    if dimension.upper() not in _DIMENSIONS:
+        raise ValueError(f"Unsupported Azure group_by dimension '{dimension}'")
+    return {"type": "Dimension", "name": _DIMENSIONS[dimension.upper()]}
+
+
+def _column(dimension: str) -> str:
+    """Result column holding a grouping's value"""
+    return "TagValue" if dimension.upper().startswith("TAG:") else _DIMENSIONS[dimension.upper()]
+
+
+def _usage_body(result) -> Dict[str, Any]:
+    """Columns and rows of a Cost Management query result, as recorded"""
+    return {
+        "columns": [{"name": column.name, "type": column.type} for column in result.columns or []],
+        "rows": [list(row) for row in result.rows or []],
+    }
+
+
+def _filter_expression(filters: Dict[str, str]) -> Dict[str, Any]:
+    expressions = []
+    for dimension, value in filters.items():
+        group = _grouping(dimension)
+        kind = "tags" if group["type"] == "TagKey" else "dimensions"
+        expressions.append({kind: {"name": group["name"], "operator": "In", "values": [value]}})
+    return expressions[0] if len(expressions) == 1 else {"and": expressions}
+
+
+@trace_methods("azure")
 class AzureCostManager:
+    # Cost Management queries accept at most two groupings, of which one tag:
+    # every tag grouping comes back in the same TagKey/TagValue column pair
+    max_group_by = 2
+    max_tag_group_by = 1
+
     def __init__(self, tenant_id: Optional[str] = None, client_id: Optional[str] = None, 
                  client_secret: Optional[str] = None, subscription_id: Optional[str] = None):
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
         self.subscription_id = subscription_id
-        self._credential = None
-        self._cost_client = None
+
+    @property
+    def identity(self) -> str:
+        """Identity of the credentials, safe to use in cache keys"""
+        return credential_identity("azure", self.tenant_id, self.client_id, self.subscription_id,
+                                   secrets=(self.client_secret,))
 
     def _get_credential(self):
         """Get Azure credential"""
-        if not self._credential:
-            if self.tenant_id and self.client_id and self.client_secret:
-                self._credential = ClientSecretCredential(
-                    tenant_id=self.tenant_id,
-                    client_id=self.client_id,
-                    client_secret=self.client_secret
-                )
-            else:
-                self._credential = DefaultAzureCredential()
-        return self._credential
+        return azure_credential(self)
 
     def _get_cost_client(self):
         """Get Cost Management client"""
-        if not self._cost_client:
-            credential = self._get_credential()
-            self._cost_client = CostManagementClient(credential)
-        return self._cost_client
+        return azure_client(self, CostManagementClient)
+
+    def _get_resource_client(self):
+        """Get Resource Management client for the subscription"""
+        return azure_client(self, ResourceManagementClient, self.subscription_id)
 
     def test_connection(self) -> Dict[str, Any]:
         """Test Azure connection and permissions"""
@@ -41,8 +87,7 @@ class AzureCostManager:
             if not self.subscription_id:
                 return {"success": False, "error": "Subscription ID is required"}
                 
-            credential = self._get_credential()
-            resource_client = ResourceManagementClient(credential, self.subscription_id)
+            resource_client = self._get_resource_client()
             
             # Test by listing resource groups (minimal permission required)
             list(resource_client.resource_groups.list())
@@ -52,13 +97,14 @@ class AzureCostManager:
             return {"success": False, "error": str(e)}
 
     def get_costs(self, start_date: str, end_date: str, granularity: str = "Monthly", 
-                  group_by: List[str] = None) -> List[CostMetric]:
+                  group_by: List[str] = None, filters: Optional[Dict[str, str]] = None) -> List[CostMetric]:
         """Get cost data from Azure Cost Management"""
         if not self.subscription_id:
             raise Exception("Subscription ID is required")
             
         try:
-            cost_client = self._get_cost_client()
+            context = {"start_date": start_date, "end_date": end_date, "granularity": granularity,
+                       "group_by": group_by, "filters": filters}
             scope = f"/subscriptions/{self.subscription_id}"
             
             # Convert granularity to Azure format
@@ -67,19 +113,10 @@ class AzureCostManager:
                 azure_granularity = "Monthly"
             
             # Prepare grouping
-            grouping = []
-            if group_by:
-                for group in group_by:
-                    if group.upper() == "SERVICE":
-                        grouping.append({
-                            "type": "Dimension",
-                            "name": "ServiceName"
-                        })
-                    elif group.upper() == "RESOURCE":
-                        grouping.append({
-                            "type": "Dimension", 
-                            "name": "ResourceId"
-                        })
+            group_by = group_by or []
+            if sum(1 for group in group_by if group.upper().startswith("TAG:")) > self.max_tag_group_by:
+                raise ValueError("Azure cost queries support a single TAG: grouping")
+            grouping = [_grouping(group) for group in group_by]
             
             query_definition = {
                 "type": "ActualCost",
@@ -99,30 +136,46 @@ class AzureCostManager:
                     "grouping": grouping
                 }
             }
+            if filters:
+                query_definition["dataset"]["filter"] = _filter_expression(filters)
             
-            result = cost_client.query.usage(scope, query_definition)
+            # The client is built inside the fetch so replayed queries make no upstream call; the
+            # identity fingerprints the client secret, so only these credentials replay their recordings
+            result = response_store.call(
+                "azure", self.identity, "query.usage", {"scope": scope, "query": query_definition},
+                lambda: _usage_body(self._get_cost_client().query.usage(scope, query_definition)),
+                context,
+            )
             
             costs = []
-            if hasattr(result, 'rows') and result.rows:
-                columns = [col.name for col in result.columns]
+            if result["rows"]:
+                columns = [column["name"] for column in result["columns"]]
                 
-                for row in result.rows:
+                for row in result["rows"]:
                     row_data = dict(zip(columns, row))
                     
-                    service_name = "Unknown"
-                    if "ServiceName" in row_data:
-                        service_name = row_data["ServiceName"]
-                    elif "ResourceId" in row_data:
-                        service_name = row_data["ResourceId"].split('/')[-1] if row_data["ResourceId"] else "Unknown"
+                    dimensions = {group: str(row_data.get(_column(group)) or "") for group in group_by}
+                    labels = [
+                        value.split('/')[-1] if _column(group) == "ResourceId" else value
+                        for group, value in dimensions.items()
+                    ]
+                    service_name = "|".join(label or "Unknown" for label in labels) if labels else "Unknown"
                     
                     amount = float(row_data.get("PreTaxCost", 0))
-                    date = row_data.get("UsageDate", start_date)
+                    # Billing currency of the subscription, e.g. EUR or INR
+                    currency = str(row_data.get("Currency") or "USD")
+                    date = str(row_data.get("UsageDate", start_date))
+                    if len(date) == 8 and date.isdigit():
+                        # Daily rows carry UsageDate as a yyyymmdd number
+                        date = f"{date[:4]}-{date[4:6]}-{date[6:]}"
                     
                     costs.append(CostMetric(
                         service=service_name,
                         amount=amount,
-                        unit="USD",
-                        date=str(date)
+                        unit=currency,
+                        currency=currency,
+                        date=str(date),
+                        dimensions=dimensions
                     ))
             
             return costs
@@ -133,8 +186,7 @@ class AzureCostManager:
     def get_subscriptions(self) -> List[Dict[str, str]]:
         """Get list of available subscriptions"""
         try:
-            credential = self._get_credential()
-            resource_client = ResourceManagementClient(credential, self.subscription_id)
+            resource_client = self._get_resource_client()
             
             subscriptions = []
             for sub in resource_client.subscriptions.list():
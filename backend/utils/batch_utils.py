@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from models.schemas import BatchCostQuery
+from utils.fx_utils import normalize_costs
+from utils.groupby_utils import groupby_planner
+from utils.integration_utils import build_cost_manager
+from utils.trace_utils import traced
+
+# Shared by every batch request, so concurrent batches together hold at most this many queries in flight
+_executor = ThreadPoolExecutor(max_workers=settings.batch_max_concurrency, thread_name_prefix="batch-query")
+
+
+def canonical_id(value: Optional[str]) -> Optional[str]:
+    """Lowercase hyphenated form of a UUID, as ids come back from the database; None if malformed.
+
+    Uppercase, braced or unhyphenated ids would otherwise miss the lookup
+    by id even though the database matched them.
+    """
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+@traced("batch.run_query")
+def run_cost_query(integration: Optional[Dict[str, Any]], query: BatchCostQuery, currency: str,
+                   user_id: Optional[str] = None) -> Dict[str, Any]:
+    """One integration's costs through the shared group-by planner and cost cache; errors are returned, not raised"""
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"integration_id": query.integration_id}
+    try:
+        if integration is None or (user_id and integration["user_id"] != canonical_id(user_id)):
+            raise LookupError("Integration not found")
+        result.update(provider=integration["provider"], name=integration["name"])
+        datetime.strptime(query.start_date, "%Y-%m-%d")
+        datetime.strptime(query.end_date, "%Y-%m-%d")
+
+        # Managers built from the same credentials share pooled clients, STS credentials and cache entries
+        manager = build_cost_manager(integration["provider"], integration["credentials"])
+        costs, report = groupby_planner.get_costs(
+            manager, query.start_date, query.end_date, query.granularity, query.group_by
+        )
+        costs = normalize_costs(costs, currency)
+        result.update(
+            status="ok",
+            total=sum(cost.amount for cost in costs),
+            costs=costs,
+            cache_hits=report["cache_hits"],
+            upstream_queries=report["upstream_queries"],
+        )
+        if "stale_since" in report:
+            result["stale_since"] = report["stale_since"]
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def _line(data: Dict[str, Any]) -> str:
+    return json.dumps(jsonable_encoder(data)) + "\n"
+
+
+async def stream_batch(queries: List[BatchCostQuery], integrations: Dict[str, Dict[str, Any]], currency: str,
+                       concurrency: int, user_id: Optional[str] = None) -> AsyncIterator[str]:
+    """Run every query concurrently and emit one NDJSON line per query as it finishes, then a summary line"""
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    limit = asyncio.Semaphore(concurrency)
+    yield _line({"event": "start", "queries": len(queries), "concurrency": concurrency, "currency": currency})
+
+    async def run(index: int, query: BatchCostQuery):
+        async with limit:
+            context = contextvars.copy_context()
+            return index, await loop.run_in_executor(
+                _executor, context.run, run_cost_query,
+                integrations.get(canonical_id(query.integration_id)), query, currency, user_id,
+            )
+
+    tasks = [asyncio.ensure_future(run(index, query)) for index, query in enumerate(queries)]
+    totals: Dict[str, float] = {}
+    failed: List[str] = []
+    slowest = 0.0
+    completed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result = await next_done
+            completed += 1
+            if result["status"] == "ok":
+                totals[result["integration_id"]] = totals.get(result["integration_id"], 0.0) + result["total"]
+            else:
+                failed.append(result["integration_id"])
+            slowest = max(slowest, result["elapsed_ms"])
+            yield _line({"event": "result", "index": index, "completed": completed, **result})
+        yield _line({
+            "event": "summary",
+            "queries": len(queries),
+            "succeeded": len(queries) - len(failed),
+            "failed": failed,
+            "currency": currency,
+            "total": sum(totals.values()),
+            "totals": totals,
+            "slowest_query_ms": slowest,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,248 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+from utils.trace_utils import traced
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Rejected credentials, as they appear in the wrapped provider SDK errors
+_AUTH_ERRORS = (
+    "UnrecognizedClientException", "InvalidClientTokenId", "SignatureDoesNotMatch", "IncompleteSignature",
+    "ExpiredToken", "InvalidAccessKeyId", "AuthFailure", "ClientAuthenticationError", "AADSTS",
+    "invalid_client", "invalid_grant", "RefreshError", "UNAUTHENTICATED", "invalid authentication credentials",
+)
+
+
+def is_auth_error(error: BaseException) -> bool:
+    message = f"{type(error).__name__}: {error}"
+    return any(marker in message for marker in _AUTH_ERRORS)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its breaker is open"""
+
+    def __init__(self, key: str, retry_in: float):
+        super().__init__(f"{key} is unavailable (circuit open, next probe in {retry_in:.0f}s)")
+        self.key = key
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Breaker and latency tracker for one provider account.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls fail immediately. Once the open period passes, a single probe call
+    is let through: success closes the breaker, failure reopens it for twice
+    as long (up to ``max_open_seconds``). Calls slower than the latency
+    budget count as failures. Rejected credentials that have never had a
+    successful call do not: a caller with a bad secret is not a provider
+    outage.
+
+    Attempts run on their provider's bounded pool, at most
+    ``provider_account_max_inflight`` at a time per account, so abandoned
+    and hedged calls of one slow account cannot starve the others.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.state = CLOSED
+        self.failures = 0
+        self.open_seconds = settings.breaker_open_seconds
+        self.opened_at: Optional[float] = None
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+        self.verified = False
+        self.calls = 0
+        self.rejected = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._probing = False
+        self._latencies: deque = deque(maxlen=settings.hedge_latency_window)
+        self._inflight = threading.BoundedSemaphore(settings.provider_account_max_inflight)
+        self._lock = threading.Lock()
+
+    def _admit(self) -> bool:
+        """Whether a call may go to the provider; True for the half-open probe"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self.state = HALF_OPEN
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+                self.rejected += 1
+                return False
+            self._probing = self.state == HALF_OPEN
+            self.calls += 1
+            return True
+
+    def _success(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.verified = True
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.opened_at = None
+                self.open_seconds = settings.breaker_open_seconds
+
+    def _failure(self, error: BaseException):
+        with self._lock:
+            if not self.verified and is_auth_error(error):
+                # Only releases a probe slot; the breaker's state is left as it was
+                self._probing = False
+                return
+            self.failures += 1
+            self.last_error = str(error)
+            probe_failed = self.state == HALF_OPEN
+            self._probing = False
+            if probe_failed:
+                self.open_seconds = min(self.open_seconds * 2, settings.breaker_max_open_seconds)
+            if probe_failed or self.failures >= settings.breaker_failure_threshold:
+                self.state = OPEN
+                self.opened_at = self.opened_at or time.time()
+                self.retry_at = time.monotonic() + self.open_seconds
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a second attempt is sent: the observed p95, once enough calls are seen"""
+        with self._lock:
+            if len(self._latencies) < settings.hedge_min_samples:
+                return None
+            recent = sorted(self._latencies)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+        return max(p95, settings.hedge_min_delay_ms / 1000)
+
+    @traced("breaker.call")
+    def call(self, fn: Callable[[], Any], hedge: bool = False) -> Any:
+        """Run ``fn`` within the latency budget, hedging once past p95 if ``hedge`` (idempotent reads only)"""
+        if not self._admit():
+            raise CircuitOpenError(self.key, max(self.retry_at - time.monotonic(), 0))
+        started = time.monotonic()
+        try:
+            result = self._run(fn, self.hedge_delay() if hedge else None, started + settings.provider_latency_budget_seconds)
+        except Exception as e:
+            self._failure(e)
+            raise
+        self._success(time.monotonic() - started)
+        return result
+
+    def _submit(self, fn: Callable[[], Any]) -> Optional[Future]:
+        """Start an attempt on the provider's pool; None while the account has its limit running"""
+        if not self._inflight.acquire(blocking=False):
+            return None
+        try:
+            future = _executor(self.key.split(":", 1)[0]).submit(contextvars.copy_context().run, fn)
+        except BaseException:
+            self._inflight.release()
+            raise
+        # Released when the attempt finishes, even after the caller stopped waiting for it
+        future.add_done_callback(lambda _: self._inflight.release())
+        return future
+
+    def _run(self, fn: Callable[[], Any], hedge_delay: Optional[float], deadline: float) -> Any:
+        first = self._submit(fn)
+        if first is None:
+            raise TimeoutError(f"{self.key} already has {settings.provider_account_max_inflight} provider calls running")
+        pending = {first}
+        if hedge_delay is not None and time.monotonic() + hedge_delay < deadline:
+            if not wait(pending, timeout=hedge_delay).done:
+                hedge = self._submit(fn)
+                if hedge is not None:
+                    with self._lock:
+                        self.hedges += 1
+                    pending.add(hedge)
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(
+                    f"{self.key} exceeded its {settings.provider_latency_budget_seconds:.0f}s latency budget"
+                )
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def snapshot(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        with self._lock:
+            state = self.state
+            if state == OPEN and time.monotonic() >= self.retry_at:
+                state = HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self.failures,
+                "last_error": self.last_error,
+                "opened_at": self.opened_at,
+                "next_probe_in_seconds": round(max(self.retry_at - time.monotonic(), 0), 1) if state == OPEN else None,
+                "calls": self.calls,
+                "rejected": self.rejected,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "p95_ms": round(delay * 1000, 1) if delay is not None else None,
+            }
+
+
+# Provider calls run on one bounded pool per provider so callers can stop waiting at the budget or
+# hedge; abandoned attempts finish in the background without holding another provider's threads
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(provider: str) -> ThreadPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(provider)
+        if executor is None:
+            executor = _executors[provider] = ThreadPoolExecutor(
+                max_workers=settings.provider_call_max_workers, thread_name_prefix=f"{provider}-call"
+            )
+        return executor
+
+
+class BreakerRegistry:
+    """One circuit breaker per provider account, keyed by credential identity"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(key)
+            return breaker
+
+    def call(self, key: str, fn: Callable[[], Any], hedge: bool = False) -> Any:
+        return self.get(key).call(fn, hedge)
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider status (available, degraded or unavailable) with each account's breaker"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        providers: Dict[str, Dict[str, Any]] = {}
+        for breaker in breakers:
+            provider = breaker.key.split(":", 1)[0]
+            providers.setdefault(provider, {"accounts": {}})["accounts"][breaker.key] = breaker.snapshot()
+        for report in providers.values():
+            states = [account["state"] for account in report["accounts"].values()]
+            if all(state == CLOSED for state in states):
+                report["status"] = "available"
+            elif all(state == OPEN for state in states):
+                report["status"] = "unavailable"
+            else:
+                report["status"] = "degraded"
+        return providers
+
+
+provider_breakers = BreakerRegistry()
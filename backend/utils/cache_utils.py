@@ -0,0 +1,229 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from models.schemas import CostMetric
+from utils.breaker_utils import provider_breakers
+from utils.shared_cache_utils import shared_store
+from utils.trace_utils import span
+
+_versions = itertools.count(1)
+
+
+class CacheEntry:
+    """Cached value with a process-wide monotonically increasing version"""
+
+    __slots__ = ("key", "value", "version", "filled_at", "expires_at")
+
+    def __init__(self, key: str, value: Any, ttl: float):
+        self.key = key
+        self.value = value
+        self.version = next(_versions)
+        self.filled_at = time.time()
+        self.expires_at = self.filled_at + ttl
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class _Flight:
+    __slots__ = ("event", "entry", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry: Optional[CacheEntry] = None
+        self.error: Optional[BaseException] = None
+
+
+class CostCache:
+    """Thread-safe TTL + LRU cache with single-flight loading.
+
+    Concurrent misses for the same key wait for one loader call instead of
+    each hitting the upstream API. Expired entries stay in the LRU until
+    evicted so callers can still read them explicitly. With a
+    ``shared_namespace`` and the shared store enabled, misses are also
+    single-flighted across worker processes through Redis.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 shared_namespace: Optional[str] = None):
+        self.max_entries = max_entries or settings.cost_cache_max_entries
+        self.ttl = ttl if ttl is not None else settings.cost_cache_ttl_seconds
+        self.shared_namespace = shared_namespace
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """Return the entry for key if present (and fresh unless allow_stale)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not (allow_stale or entry.fresh):
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> CacheEntry:
+        entry = CacheEntry(key, value, self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_load_entry(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> CacheEntry:
+        """Return a fresh entry, calling loader at most once per key concurrently"""
+        with span("cache.lookup", key=key) as lookup:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.fresh:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    lookup.set(result="hit")
+                    return entry
+                self.misses += 1
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+
+            if not leader:
+                lookup.set(result="coalesced")
+                flight.event.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return flight.entry
+
+            lookup.set(result="miss")
+            try:
+                flight.entry = self.set(key, *self._load(key, loader, ttl))
+                return flight.entry
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+                flight.event.set()
+
+    def _load(self, key: str, loader: Callable[[], Any], ttl: Optional[float]) -> Tuple[Any, float]:
+        ttl = self.ttl if ttl is None else ttl
+        if self.shared_namespace is None or shared_store is None:
+            return loader(), ttl
+        # Entries loaded by another worker keep their remaining TTL, so all workers expire together
+        return shared_store.load(f"{self.shared_namespace}|{key}", loader, ttl)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        return self.get_or_load_entry(key, loader, ttl).value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Cache for upstream cost query results, shared across workers when enabled
+cost_cache = CostCache(shared_namespace="costs")
+
+# Cache entries read while building the current response, when a caller is tracking them
+class Dependencies(list):
+    """(cache, key, version) of the entries a response was built from"""
+
+    # Cleared when part of the response's data could not be loaded
+    complete = True
+
+
+_dependencies: ContextVar[Optional[Dependencies]] = ContextVar("cache_dependencies", default=None)
+
+
+@contextmanager
+def track_dependencies():
+    """Collect the cache entries a block of code reads its data from"""
+    dependencies = Dependencies()
+    token = _dependencies.set(dependencies)
+    try:
+        yield dependencies
+    finally:
+        _dependencies.reset(token)
+
+
+def record_dependency(cache: CostCache, entry: CacheEntry):
+    dependencies = _dependencies.get()
+    if dependencies is not None:
+        dependencies.append((cache, entry.key, entry.version))
+
+
+def mark_incomplete():
+    """Flag the tracked response as partial, so it is not kept for revalidation"""
+    dependencies = _dependencies.get()
+    if dependencies is not None:
+        dependencies.complete = False
+
+
+def dependencies_current(dependencies: List[Tuple[CostCache, str, int]]) -> bool:
+    """Whether every recorded entry is still cached, fresh and unchanged"""
+    for cache, key, version in dependencies:
+        entry = cache.get_entry(key)
+        if entry is None or entry.version != version:
+            return False
+    return bool(dependencies)
+
+
+# Provider identity -> fill time of the oldest stale entry served, when a caller is tracking them
+_stale_reads: ContextVar[Optional[Dict[str, float]]] = ContextVar("stale_reads", default=None)
+
+
+@contextmanager
+def track_stale_reads():
+    """Collect providers whose data was served from last-known-good cache entries"""
+    reads: Dict[str, float] = {}
+    parent = _stale_reads.get()
+    token = _stale_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _stale_reads.reset(token)
+        if parent is not None:
+            for identity, filled_at in reads.items():
+                parent[identity] = min(parent.get(identity, filled_at), filled_at)
+
+
+def load_or_stale(cache: CostCache, key: str, identity: str, loader: Callable[[], Any]) -> CacheEntry:
+    """Fresh entry loaded through the provider's circuit breaker, or the last-known-good one if that fails"""
+    try:
+        return cache.get_or_load_entry(key, lambda: provider_breakers.call(identity, loader, hedge=True))
+    except Exception:
+        entry = cache.get_entry(key, allow_stale=True)
+        if entry is None:
+            raise
+        reads = _stale_reads.get()
+        if reads is not None:
+            reads[identity] = min(reads.get(identity, entry.filled_at), entry.filled_at)
+        return entry
+
+
+def cost_cache_key(manager: Any, start_date: str, end_date: str, granularity: str,
+                   group_by: Optional[List[str]] = None) -> str:
+    # groupby_utils imports this module, so it is imported here
+    from utils.groupby_utils import normalize_dimensions
+    dims = ",".join(normalize_dimensions(group_by))
+    return f"costs|{manager.identity}|{start_date}|{end_date}|{granularity.upper()}|{dims}"
+
+
+def cached_costs(manager: Any, start_date: str, end_date: str, granularity: str = "MONTHLY",
+                 group_by: Optional[List[str]] = None) -> List[CostMetric]:
+    """Provider get_costs through the shared cost cache"""
+    key = cost_cache_key(manager, start_date, end_date, granularity, group_by)
+    entry = load_or_stale(
+        cost_cache, key, manager.identity, lambda: manager.get_costs(start_date, end_date, granularity, group_by)
+    )
+    record_dependency(cost_cache, entry)
+    return entry.value
@@ -0,0 +1,281 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import boto3
+import requests
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+
+from config import settings
+from utils.identity_utils import secret_fingerprint
+from utils.trace_utils import span
+
+
+class _PooledClient:
+    __slots__ = ("client", "close", "http_pools", "created_at", "last_used", "uses")
+
+    def __init__(self, client: Any, close: Optional[Callable[[], None]],
+                 http_pools: Optional[Callable[[], Iterable[Any]]], now: float):
+        self.client = client
+        self.close = close
+        self.http_pools = http_pools
+        self.created_at = now
+        self.last_used = now
+        self.uses = 1
+
+
+def _http_counters(entry: _PooledClient) -> Tuple[int, int]:
+    """(requests sent, connections opened) across a client's urllib3 connection pools"""
+    if entry.http_pools is None:
+        return 0, 0
+    sent = opened = 0
+    try:
+        for pool in entry.http_pools():
+            sent += getattr(pool, "num_requests", 0)
+            opened += getattr(pool, "num_connections", 0)
+    except Exception:
+        pass
+    return sent, opened
+
+
+def _urllib3_pools(manager: Any) -> List[Any]:
+    container = getattr(manager, "pools", None)
+    return list(getattr(container, "_container", {}).values()) if container is not None else []
+
+
+class ClientPool:
+    """Provider SDK clients shared process-wide, keyed by kind and credential identity.
+
+    Clients are built once per key (concurrent callers for the same key wait
+    for the first build) and closed after sitting unused for
+    ``idle_seconds``. Hit rates and, for urllib3-backed clients, HTTP
+    connection reuse are tracked per kind.
+    """
+
+    def __init__(self, idle_seconds: Optional[float] = None):
+        self.idle_seconds = idle_seconds or settings.client_pool_idle_seconds
+        self._entries: Dict[Tuple[Any, ...], _PooledClient] = {}
+        self._build_locks: Dict[Tuple[Any, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._last_reap = time.monotonic()
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._evictions: Dict[str, int] = defaultdict(int)
+        # HTTP counters of clients already closed, so totals survive eviction
+        self._retired_http: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+
+    def get(self, kind: str, key: Tuple[Any, ...], factory: Callable[[], Any],
+            close: Optional[Callable[[Any], None]] = None,
+            http_pools: Optional[Callable[[Any], Iterable[Any]]] = None) -> Any:
+        """The pooled client for ``(kind, *key)``, built with ``factory`` on first use"""
+        full_key = (kind,) + key
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry:
+                entry.last_used = now
+                entry.uses += 1
+                self._hits[kind] += 1
+                return entry.client
+            build_lock = self._build_locks.setdefault(full_key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(full_key)
+                if entry:
+                    entry.last_used = now
+                    entry.uses += 1
+                    self._hits[kind] += 1
+                    return entry.client
+            with span("client_pool.build", kind=kind):
+                client = factory()
+            entry = _PooledClient(
+                client,
+                (lambda: close(client)) if close else None,
+                (lambda: http_pools(client)) if http_pools else None,
+                now,
+            )
+            with self._lock:
+                self._entries[full_key] = entry
+                self._misses[kind] += 1
+
+        if now - self._last_reap >= self.idle_seconds / 4:
+            self.reap()
+        return client
+
+    def _evict(self, keys: List[Tuple[Any, ...]]) -> int:
+        with self._lock:
+            evicted = [(key, self._entries.pop(key)) for key in keys if key in self._entries]
+            for key, entry in evicted:
+                self._build_locks.pop(key, None)
+                self._evictions[key[0]] += 1
+                sent, opened = _http_counters(entry)
+                self._retired_http[key[0]][0] += sent
+                self._retired_http[key[0]][1] += opened
+        for _, entry in evicted:
+            if entry.close:
+                try:
+                    entry.close()
+                except Exception:
+                    pass
+        return len(evicted)
+
+    def reap(self) -> int:
+        """Close clients unused for longer than the idle timeout"""
+        now = time.monotonic()
+        self._last_reap = now
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if now - entry.last_used > self.idle_seconds]
+        return self._evict(idle)
+
+    def close_all(self) -> int:
+        with self._lock:
+            keys = list(self._entries)
+        return self._evict(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Client hit rates and HTTP connection reuse per client kind"""
+        with self._lock:
+            entries = list(self._entries.items())
+            kinds = set(self._hits) | set(self._misses) | {key[0] for key, _ in entries}
+            report = {
+                kind: {
+                    "clients": 0,
+                    "hits": self._hits[kind],
+                    "misses": self._misses[kind],
+                    "evictions": self._evictions[kind],
+                    "http_requests": self._retired_http[kind][0],
+                    "http_connections": self._retired_http[kind][1],
+                }
+                for kind in kinds
+            }
+        for key, entry in entries:
+            kind = report[key[0]]
+            kind["clients"] += 1
+            sent, opened = _http_counters(entry)
+            kind["http_requests"] += sent
+            kind["http_connections"] += opened
+
+        for kind in report.values():
+            lookups = kind["hits"] + kind["misses"]
+            kind["client_reuse_rate"] = round(kind["hits"] / lookups, 4) if lookups else None
+            sent = kind["http_requests"]
+            kind["connection_reuse_rate"] = round(1 - kind["http_connections"] / sent, 4) if sent else None
+        return {"idle_seconds": self.idle_seconds, "kinds": dict(sorted(report.items()))}
+
+
+client_pool = ClientPool()
+
+
+# AWS
+
+def _botocore_pools(client: Any) -> List[Any]:
+    http_session = getattr(getattr(client, "_endpoint", None), "http_session", None)
+    return _urllib3_pools(getattr(http_session, "_manager", None))
+
+
+def aws_client(manager: Any, service: str, region: Optional[str] = None, **config: Any) -> Any:
+    """Pooled boto3 client; assumed-role refreshes yield a new key, so stale clients age out"""
+    credentials = manager._get_credentials()
+    region = region or settings.aws_region
+    key = (manager.identity, service, region, credentials.get("aws_access_key_id"),
+           tuple(sorted((name, repr(value)) for name, value in config.items())))
+
+    def build():
+        base = Config(
+            region_name=region,
+            max_pool_connections=settings.client_pool_max_connections,
+            tcp_keepalive=True,
+            connect_timeout=settings.client_pool_connect_timeout_seconds,
+            read_timeout=settings.client_pool_read_timeout_seconds,
+        )
+        # Sessions are not thread-safe; each build gets its own
+        return boto3.session.Session(**credentials).client(service, config=base.merge(Config(**config)))
+
+    return client_pool.get("aws:" + service, key, build, close=lambda c: c.close(), http_pools=_botocore_pools)
+
+
+# Azure
+
+def _requests_pools(session: requests.Session) -> List[Any]:
+    pools = []
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        pools.extend(_urllib3_pools(getattr(adapter, "poolmanager", None)))
+    return pools
+
+
+def _azure_session(manager: Any) -> requests.Session:
+    """One keep-alive HTTP session per Azure identity, shared by all of its clients"""
+    def build():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.client_pool_max_connections,
+                              pool_maxsize=settings.client_pool_max_connections)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return client_pool.get("azure:http", (manager.identity,), build, close=lambda s: s.close(),
+                           http_pools=_requests_pools)
+
+
+def azure_credential(manager: Any) -> Any:
+    """Pooled Azure credential, so tokens are cached across requests"""
+    from azure.identity import ClientSecretCredential, DefaultAzureCredential
+
+    def build():
+        if manager.tenant_id and manager.client_id and manager.client_secret:
+            return ClientSecretCredential(
+                tenant_id=manager.tenant_id,
+                client_id=manager.client_id,
+                client_secret=manager.client_secret,
+            )
+        return DefaultAzureCredential()
+
+    key = (manager.identity, secret_fingerprint(manager.client_secret))
+    return client_pool.get("azure:credential", key, build, close=lambda c: c.close())
+
+
+def azure_client(manager: Any, client_class: type, *args: Any, endpoint: Optional[str] = None) -> Any:
+    """Pooled Azure SDK client whose transport reuses the identity's HTTP session"""
+    from azure.core.pipeline.transport import RequestsTransport
+
+    session = _azure_session(manager)
+    credential = azure_credential(manager)
+
+    def build():
+        transport = RequestsTransport(
+            session=session,
+            session_owner=False,
+            connection_timeout=settings.client_pool_connect_timeout_seconds,
+            read_timeout=settings.client_pool_read_timeout_seconds,
+        )
+        if endpoint:
+            return client_class(endpoint, credential, *args, transport=transport)
+        return client_class(credential, *args, transport=transport)
+
+    key = (manager.identity, secret_fingerprint(manager.client_secret), id(session), endpoint) + args
+    return client_pool.get("azure:" + client_class.__name__, key, build, close=lambda c: c.close())
+
+
+# GCP
+
+def gcp_credentials(manager: Any, factory: Callable[[], Any]) -> Any:
+    key = manager.service_account_key
+    if key is not None and not isinstance(key, str):
+        key = repr(sorted(key.items()))
+    return client_pool.get("gcp:credentials", (manager.identity, secret_fingerprint(key)), factory)
+
+
+def gcp_service(manager: Any, api: str, version: str) -> Any:
+    """Pooled discovery service; httplib2 connections are not thread-safe, so one per thread"""
+    from googleapiclient.discovery import build
+
+    credentials = manager._get_credentials()
+    return client_pool.get(
+        "gcp:" + api,
+        (manager.identity, version, id(credentials), threading.get_ident()),
+        lambda: build(api, version, credentials=credentials, cache_discovery=False),
+        close=lambda s: s.close(),
+    )
@@ -0,0 +1,308 @@
+import csv
+import gzip
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from utils.alert_utils import evaluate_and_dispatch
+from utils.allocation_utils import allocate_new_rows
+from utils.ingest_utils import record_cost_revisions, write_cost_rows
+
+# Canonical field -> candidate column names (legacy CSV header, Parquet/CUR 2.0 name)
+_FIELDS = {
+    "usage_start": ["lineItem/UsageStartDate", "line_item_usage_start_date"],
+    "service": ["product/ProductName", "product_product_name", "lineItem/ProductCode", "line_item_product_code"],
+    "region": ["product/region", "product_region", "product/regionCode", "product_region_code"],
+    "currency": ["lineItem/CurrencyCode", "line_item_currency_code"],
+    "unit": ["pricing/unit", "pricing_unit"],
+    "cost": ["lineItem/UnblendedCost", "line_item_unblended_cost"],
+    "usage": ["lineItem/UsageAmount", "line_item_usage_amount"],
+}
+_KEYS = ["day", "service", "region", "currency", "unit"]
+_DATA_SUFFIXES = (".csv", ".csv.gz", ".parquet", ".snappy.parquet")
+
+
+def _resolve_columns(names: List[str]) -> Dict[str, str]:
+    """Pick the first available source column for each canonical field"""
+    available = set(names)
+    columns = {}
+    for field, candidates in _FIELDS.items():
+        for candidate in candidates:
+            if candidate in available:
+                columns[field] = candidate
+                break
+    missing = {"usage_start", "cost"} - set(columns)
+    if missing:
+        raise ValueError(f"CUR file is missing required columns: {', '.join(sorted(missing))}")
+    return columns
+
+
+def _csv_header(path: Path) -> List[str]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def _iter_batches(path: Path) -> Tuple[Dict[str, str], Any]:
+    """Projected record batches: chunked CSV reads or memory-mapped Parquet row groups"""
+    if path.name.endswith(".parquet"):
+        parquet = pq.ParquetFile(path, memory_map=True)
+        columns = _resolve_columns(parquet.schema_arrow.names)
+        return columns, parquet.iter_batches(batch_size=settings.cur_batch_rows, columns=list(set(columns.values())))
+
+    columns = _resolve_columns(_csv_header(path))
+    numeric = {columns[f] for f in ("cost", "usage") if f in columns}
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=settings.cur_csv_block_bytes),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=list(set(columns.values())),
+            column_types={name: pa.float64() if name in numeric else pa.string() for name in columns.values()},
+        ),
+    )
+    return columns, reader
+
+
+def _aggregate_batch(batch: pa.RecordBatch, columns: Dict[str, str]) -> pa.Table:
+    """Sum one batch to (day, service, region, currency, unit) grain"""
+    start = batch.column(columns["usage_start"])
+    if pa.types.is_timestamp(start.type):
+        day = pc.strftime(start, format="%Y-%m-%d")
+    else:
+        day = pc.utf8_slice_codeunits(pc.cast(start, pa.string()), 0, 10)
+
+    def text_column(field: str, default: str) -> pa.Array:
+        if field not in columns:
+            return pa.array([default] * batch.num_rows, pa.string())
+        return pc.fill_null(pc.cast(batch.column(columns[field]), pa.string()), default)
+
+    def number_column(field: str) -> pa.Array:
+        if field not in columns:
+            return pa.array([0.0] * batch.num_rows, pa.float64())
+        return pc.fill_null(pc.cast(batch.column(columns[field]), pa.float64()), 0.0)
+
+    table = pa.table({
+        "day": day,
+        "service": text_column("service", "Unknown"),
+        "region": text_column("region", ""),
+        "currency": text_column("currency", "USD"),
+        "unit": text_column("unit", ""),
+        "cost": number_column("cost"),
+        "usage": number_column("usage"),
+    })
+    return _regroup(table)
+
+
+def _regroup(table: pa.Table) -> pa.Table:
+    grouped = table.group_by(_KEYS).aggregate([("cost", "sum"), ("usage", "sum")])
+    return grouped.rename_columns([{"cost_sum": "cost", "usage_sum": "usage"}.get(n, n) for n in grouped.column_names])
+
+
+class _Aggregator:
+    """Running grain-level totals; memory grows with distinct groups, not line items"""
+
+    def __init__(self):
+        self.partials: List[pa.Table] = []
+        self.line_items = 0
+
+    def add(self, batch: pa.RecordBatch, columns: Dict[str, str]):
+        self.line_items += batch.num_rows
+        self.partials.append(_aggregate_batch(batch, columns))
+        if len(self.partials) >= settings.cur_merge_every:
+            self.partials = [_regroup(pa.concat_tables(self.partials))]
+
+    def result(self) -> Optional[pa.Table]:
+        if not self.partials:
+            return None
+        return _regroup(pa.concat_tables(self.partials))
+
+
+def _local_path(root: Path, key: str) -> Optional[Path]:
+    """Map a manifest S3 key onto the mounted directory, trying shorter suffixes"""
+    if key.startswith("s3://"):
+        key = key[5:].split("/", 1)[1] if "/" in key[5:] else ""
+    parts = [p for p in key.split("/") if p]
+    for i in range(len(parts)):
+        candidate = root.joinpath(*parts[i:])
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def discover_units(root: Path) -> List[Dict[str, Any]]:
+    """Group data files into ingestion units: one per billing-period manifest, else one per file"""
+    manifests: Dict[str, Tuple[float, Path, Dict[str, Any]]] = {}
+    for manifest_path in root.rglob("*Manifest.json"):
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except (OSError, ValueError):
+            continue
+        period = (manifest.get("billingPeriod") or {}).get("start") or str(manifest_path.parent)
+        mtime = manifest_path.stat().st_mtime
+        # Legacy CUR also copies the manifest into each assembly directory; keep the newest
+        if period not in manifests or mtime > manifests[period][0]:
+            manifests[period] = (mtime, manifest_path, manifest)
+
+    units = []
+    claimed = set()
+    for period, (_, manifest_path, manifest) in sorted(manifests.items()):
+        keys = manifest.get("reportKeys") or manifest.get("dataFiles") or []
+        files = [path for path in (_local_path(root, key) for key in keys) if path is not None]
+        claimed.update(files)
+        units.append({
+            "key": f"period:{period[:10]}",
+            "manifest": str(manifest_path.relative_to(root)),
+            "files": sorted(files),
+            "fingerprint_source": manifest_path.read_bytes(),
+        })
+
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.name.endswith(_DATA_SUFFIXES) and path not in claimed:
+            units.append({"key": f"file:{path.relative_to(root)}", "manifest": None,
+                          "files": [path], "fingerprint_source": b""})
+    return units
+
+
+def _fingerprint(unit: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(unit["fingerprint_source"])
+    for path in unit["files"]:
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_unit(db: Session, integration_id: str, unit_key: str, table: Optional[pa.Table]) -> int:
+    """Replace the unit's previous cost_data rows with the new aggregate, in the caller's transaction"""
+    removed = db.execute(text("""
+        WITH removed AS (
+            DELETE FROM cost_data
+            WHERE integration_id = CAST(:integration_id AS uuid)
+              AND raw_data->>'source' = 'cur' AND raw_data->>'unit' = :unit
+            RETURNING billing_period_start
+        )
+        SELECT DISTINCT billing_period_start FROM removed
+    """), {"integration_id": integration_id, "unit": unit_key}).scalars().all()
+    record_cost_revisions(db, ((integration_id, day) for day in removed))
+
+    if table is None:
+        return 0
+    written = 0
+    raw_data = {"source": "cur", "unit": unit_key}
+    for batch in table.to_batches(max_chunksize=settings.cur_insert_batch_size):
+        rows = [
+            {
+                "integration_id": integration_id,
+                "service_name": r["service"],
+                "cost_amount": round(r["cost"], 4),
+                "currency": r["currency"][:3] or "USD",
+                "usage_quantity": round(r["usage"], 4),
+                "usage_unit": r["unit"] or None,
+                "billing_period_start": r["day"],
+                "billing_period_end": r["day"],
+                "region": r["region"] or None,
+                "raw_data": raw_data,
+            }
+            for r in batch.to_pylist()
+        ]
+        write_cost_rows(db, rows)
+        written += len(rows)
+    return written
+
+
+def ingest_cur(db: Session, integration_id: str, root: Path, force: bool = False) -> Dict[str, Any]:
+    """Stream CUR exports under ``root`` into cost_data, skipping unchanged manifests"""
+    started = time.perf_counter()
+    if not root.is_dir():
+        raise ValueError(f"CUR path '{root}' is not a directory")
+
+    processed_state = {
+        row.manifest_key: row.fingerprint for row in db.execute(text("""
+            SELECT manifest_key, fingerprint FROM cur_manifests
+            WHERE integration_id = CAST(:integration_id AS uuid)
+        """), {"integration_id": integration_id})
+    }
+
+    report = {"units_processed": 0, "units_skipped": 0, "files": 0, "bytes_read": 0,
+              "line_items": 0, "rows_written": 0, "units": []}
+    for unit in discover_units(root):
+        fingerprint = _fingerprint(unit)
+        if not force and processed_state.get(unit["key"]) == fingerprint:
+            report["units_skipped"] += 1
+            continue
+
+        unit_started = time.perf_counter()
+        aggregator = _Aggregator()
+        for path in unit["files"]:
+            columns, batches = _iter_batches(path)
+            for batch in batches:
+                aggregator.add(batch, columns)
+            report["files"] += 1
+            report["bytes_read"] += path.stat().st_size
+
+        # The delete, every insert batch and the manifest commit together, so readers never
+        # see a partly replaced month and a failure leaves the previous rows in place
+        try:
+            rows_written = _write_unit(db, integration_id, unit["key"], aggregator.result())
+            db.execute(text("""
+                INSERT INTO cur_manifests (integration_id, manifest_key, manifest_path, fingerprint,
+                                           line_items, rows_written, processed_at)
+                VALUES (CAST(:integration_id AS uuid), :key, :manifest, :fingerprint,
+                        :line_items, :rows_written, CURRENT_TIMESTAMP)
+                ON CONFLICT (integration_id, manifest_key) DO UPDATE SET
+                    manifest_path = EXCLUDED.manifest_path,
+                    fingerprint = EXCLUDED.fingerprint,
+                    line_items = EXCLUDED.line_items,
+                    rows_written = EXCLUDED.rows_written,
+                    processed_at = EXCLUDED.processed_at
+            """), {"integration_id": integration_id, "key": unit["key"], "manifest": unit["manifest"],
+                   "fingerprint": fingerprint, "line_items": aggregator.line_items,
+                   "rows_written": rows_written})
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to write CUR unit {unit['key']}: {str(e)}")
+
+        elapsed = time.perf_counter() - unit_started
+        report["units_processed"] += 1
+        report["line_items"] += aggregator.line_items
+        report["rows_written"] += rows_written
+        report["units"].append({
+            "key": unit["key"],
+            "files": len(unit["files"]),
+            "line_items": aggregator.line_items,
+            "rows_written": rows_written,
+            "elapsed_seconds": round(elapsed, 3),
+            "line_items_per_second": round(aggregator.line_items / elapsed, 1) if elapsed else None,
+        })
+
+    # Allocation and alerts run once per ingest rather than once per insert batch
+    allocated = allocate_new_rows(db, [integration_id]) if report["rows_written"] else 0
+    alerts = evaluate_and_dispatch(db, [integration_id]) if report["rows_written"] else []
+    elapsed = time.perf_counter() - started
+    report.update(
+        integration_id=integration_id,
+        rows_allocated=allocated,
+        alerts_triggered=len(alerts),
+        elapsed_seconds=round(elapsed, 3),
+        line_items_per_second=round(report["line_items"] / elapsed, 1) if elapsed else None,
+    )
+    return report
+
+
+def resolve_cur_path(relative: Optional[str]) -> Path:
+    """Resolve a path under the configured CUR root, refusing anything outside it"""
+    root = Path(settings.cur_root).resolve()
+    path = (root / (relative or "")).resolve()
+    if path != root and root not in path.parents:
+        raise ValueError("CUR path must be inside the configured CUR root")
+    return path
@@ -0,0 +1,198 @@
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.schemas import CostMetric
+from utils.fx_utils import convert_amounts
+from utils.groupby_utils import normalize_dimensions
+from utils.shared_cache_utils import shared_store
+from utils.trace_utils import traced
+
+
+def _parse_watermark(since: Optional[str], prefix: str) -> Optional[int]:
+    """Revision encoded in a watermark issued with ``prefix``, or None if it is not ours"""
+    if not since or not since.startswith(prefix):
+        return None
+    try:
+        return int(since[len(prefix):])
+    except ValueError:
+        return None
+
+
+class DeltaTracker:
+    """Per-day revisions of cached provider cost series.
+
+    A series is observed each time it is served. When the cache entry behind
+    it has been refilled, the new rows are digested per day and any day whose
+    digest differs (or that disappeared) gets a new revision. With the shared
+    store enabled, revisions, day digests and the epoch live in Redis so every
+    worker honours the others' watermarks. Otherwise watermarks carry a
+    per-process epoch, and one issued by another worker or before a restart
+    falls back to a full response.
+    """
+
+    def __init__(self, max_series: Optional[int] = None):
+        self.max_series = max_series or settings.delta_max_series
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start a new process-local epoch; a shared epoch is left to the other workers"""
+        with self._lock:
+            self.epoch = secrets.token_hex(4)
+            self._revision = 0
+            # series key -> (epoch, entry version, {day: (digest, revision)})
+            self._series: "OrderedDict[str, Tuple[str, int, Dict[str, Tuple[Optional[str], int]]]]" = OrderedDict()
+
+    def _shared_epoch(self, increment: int = 0) -> Optional[Tuple[str, int]]:
+        if shared_store is None:
+            return None
+        return shared_store.epoch_counter("delta|revision", increment)
+
+    @staticmethod
+    def _digests(costs: List[CostMetric]) -> Dict[str, str]:
+        by_day: Dict[str, List[Tuple[str, float, str]]] = defaultdict(list)
+        for cost in costs:
+            by_day[(cost.date or "")[:10]].append((cost.service, round(cost.amount, 6), cost.unit))
+        return {
+            day: hashlib.sha1(repr(sorted(rows)).encode("utf-8")).hexdigest()
+            for day, rows in by_day.items()
+        }
+
+    @staticmethod
+    def _revise(previous: Dict[str, Tuple[Optional[str], int]], digests: Dict[str, str],
+                revision: int) -> Dict[str, Tuple[Optional[str], int]]:
+        days = {}
+        for day, digest in digests.items():
+            old = previous.get(day)
+            days[day] = old if old is not None and old[0] == digest else (digest, revision)
+        for day, (digest, old_revision) in previous.items():
+            if day not in digests:
+                # Removed days stay listed so deltas can tell clients to drop them
+                days[day] = (None, old_revision if digest is None else revision)
+        return days
+
+    def _remember(self, epoch: str, key: str, version: int, days: Dict[str, Tuple[Optional[str], int]]):
+        self._series[key] = (epoch, version, days)
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+
+    @traced("delta.observe")
+    def observe(self, key: str, version: int,
+                costs: List[CostMetric]) -> Tuple[str, Dict[str, Tuple[Optional[str], int]]]:
+        """Epoch and day revisions for a series, bumping days that changed since the last observed version"""
+        shared = self._shared_epoch()
+        epoch = shared[0] if shared is not None else self.epoch
+        with self._lock:
+            current = self._series.get(key)
+            if current is not None and current[:2] == (epoch, version):
+                self._series.move_to_end(key)
+                return epoch, current[2]
+
+        digests = self._digests(costs)
+        if shared is not None:
+            hit = shared_store.get(f"delta|{epoch}|{key}")
+            shared = self._shared_epoch(1)
+            if shared is not None:
+                # A new epoch between the two calls means the previous revisions belong to the old one
+                previous = hit[0] if hit is not None and shared[0] == epoch else {}
+                epoch, revision = shared
+                days = self._revise(previous, digests, revision)
+                shared_store.set(f"delta|{epoch}|{key}", days, settings.delta_shared_ttl_seconds)
+                with self._lock:
+                    self._remember(epoch, key, version, days)
+                return epoch, days
+
+        with self._lock:
+            current = self._series.get(key)
+            previous = current[2] if current is not None and current[0] == self.epoch else {}
+            self._revision += 1
+            days = self._revise(previous, digests, self._revision)
+            self._remember(self.epoch, key, version, days)
+            return self.epoch, days
+
+    def delta(self, key: str, version: int, costs: List[CostMetric],
+              since: Optional[str]) -> Tuple[List[CostMetric], Dict[str, str]]:
+        """Costs for days revised after ``since`` plus headers describing the delta"""
+        epoch, days = self.observe(key, version, costs)
+        latest = max((revision for _, revision in days.values()), default=0)
+        headers = {"X-Cost-Watermark": f"{epoch}.{latest}"}
+
+        last_seen = _parse_watermark(since, f"{epoch}.")
+        if last_seen is None:
+            headers["X-Cost-Delta"] = "full"
+            return costs, headers
+
+        changed = {day for day, (_, revision) in days.items() if revision > last_seen}
+        headers["X-Cost-Delta"] = "delta"
+        headers["X-Cost-Changed-Days"] = ",".join(sorted(changed))
+        return [cost for cost in costs if (cost.date or "")[:10] in changed], headers
+
+
+delta_tracker = DeltaTracker()
+
+
+def series_key(manager: Any, start_date: str, end_date: str, granularity: str, group_by: List[str]) -> str:
+    dimensions = ",".join(normalize_dimensions(group_by))
+    return f"{manager.identity}|{start_date}|{end_date}|{granularity.upper()}|{dimensions}"
+
+
+# Stored cost_data: each revised day records the transaction that wrote it in cost_data_revisions.
+# Watermarks are the reader's snapshot xmin rather than a revision number, since revisions are
+# drawn from a sequence before their transactions commit and can become visible out of order.
+STORED_PREFIX = "x"
+
+
+def stored_cost_delta(db: Session, integration_id: str, start_date: str, end_date: str,
+                      label_sql: str, since: Optional[str] = None, currency: Optional[str] = None) -> Dict[str, Any]:
+    """Daily stored costs in ``currency``, limited to days revised after ``since`` when it is given"""
+    currency = (currency or settings.reporting_currency).upper()
+    params = {"integration_id": integration_id, "start_date": start_date, "end_date": end_date}
+    # Read the watermark first. Every transaction not visible to a later snapshot has an id at
+    # or above this xmin, so the next request re-sends it; days already sent may be sent again
+    latest = db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")).scalar()
+
+    last_seen = _parse_watermark(since, STORED_PREFIX)
+    day_filter = ""
+    changed: Optional[Set[str]] = None
+    if last_seen is not None:
+        changed = {str(day) for day in db.execute(text("""
+            SELECT day FROM cost_data_revisions
+            WHERE integration_id = CAST(:integration_id AS uuid)
+              AND written_xid >= CAST(:since AS xid8) AND day >= :start_date AND day < :end_date
+        """), {**params, "since": str(last_seen)}).scalars()}
+        day_filter = "AND billing_period_start = ANY(CAST(:days AS date[]))"
+        params["days"] = sorted(changed)
+
+    totals: Dict[Tuple[str, str], float] = {}
+    if changed is None or changed:
+        rows = db.execute(text(f"""
+            SELECT billing_period_start::text AS date, {label_sql} AS label,
+                   COALESCE(currency, 'USD') AS currency, SUM(cost_amount)::float8 AS amount
+            FROM cost_data
+            WHERE integration_id = CAST(:integration_id AS uuid)
+              AND billing_period_start >= :start_date
+              AND billing_period_start < :end_date
+              {day_filter}
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2
+        """), params).all()
+        amounts = convert_amounts([row.date for row in rows], [row.currency for row in rows],
+                                  [row.amount for row in rows], currency)
+        for row, amount in zip(rows, amounts):
+            totals[(row.date, row.label)] = totals.get((row.date, row.label), 0.0) + amount
+
+    return {
+        "mode": "full" if changed is None else "delta",
+        "watermark": f"{STORED_PREFIX}{latest}",
+        "changed_days": None if changed is None else sorted(changed),
+        "currency": currency,
+        "rows": [{"date": day, "label": label, "amount": amount} for (day, label), amount in totals.items()],
+    }
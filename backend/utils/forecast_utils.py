@@ -0,0 +1,219 @@
+import calendar
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from models.schemas import CostMetric
+from utils.trace_utils import traced
+
+# Model: y_t = intercept + trend * t + day-of-week offsets (Monday is the baseline)
+N_FEATURES = 8
+_TREND_SCALE = 30.0
+
+
+def _design(day_index: np.ndarray, weekday: np.ndarray) -> np.ndarray:
+    """Design matrix rows for the given day offsets and weekdays"""
+    x = np.zeros((len(day_index), N_FEATURES))
+    x[:, 0] = 1.0
+    x[:, 1] = day_index / _TREND_SCALE
+    rows = np.nonzero(weekday > 0)[0]
+    x[rows, 1 + weekday[rows]] = 1.0
+    return x
+
+
+def _weekdays(origin: date, day_index: np.ndarray) -> np.ndarray:
+    return (origin.weekday() + day_index) % 7
+
+
+class _SeriesState:
+    """Discounted least-squares statistics for one daily cost series"""
+
+    __slots__ = ("origin", "committed_through", "xtx", "xty")
+
+    def __init__(self, origin: date):
+        self.origin = origin
+        self.committed_through: Optional[date] = None
+        self.xtx = np.zeros((N_FEATURES, N_FEATURES))
+        self.xty = np.zeros(N_FEATURES)
+
+
+class CostForecaster:
+    """Batched trend + weekly seasonality forecaster for daily cost series.
+
+    Every series is fitted by discounted least squares, so the fitted state is
+    just ``X'WX`` and ``X'Wy``. Days older than the restatement window are
+    folded into the cached state once; later requests only add the days that
+    arrived since, plus the still-mutable tail, and solve all series with one
+    batched ``np.linalg.solve``.
+    """
+
+    def __init__(self, decay: Optional[float] = None, restatement_days: Optional[int] = None,
+                 max_series: Optional[int] = None):
+        self.decay = decay if decay is not None else settings.forecast_decay
+        self.restatement_days = (
+            restatement_days if restatement_days is not None else settings.forecast_restatement_days
+        )
+        self.max_series = max_series or settings.forecast_cache_size
+        self._states: "OrderedDict[str, _SeriesState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _accumulate(self, xtx: np.ndarray, xty: np.ndarray, day_index: np.ndarray,
+                    weekday: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fold consecutive days into (n, p, p) / (n, p) statistics for n series.
+
+        ``values`` is (n, k) for k days; each day discounts the previous state,
+        which is the same as weighting day j by ``decay ** (k - 1 - j)``.
+        """
+        k = values.shape[1]
+        if k == 0:
+            return xtx, xty
+        x = _design(day_index, weekday)
+        weights = self.decay ** np.arange(k - 1, -1, -1)
+        xtx_new = (x * weights[:, None]).T @ x
+        xty_new = values @ (x * weights[:, None])
+        carry = self.decay ** k
+        return xtx * carry + xtx_new, xty * carry + xty_new
+
+    def _fit(self, keys: List[str], days: List[date], values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Update cached states with new days and return (n, p) coefficients"""
+        last_day = days[-1]
+        cutoff = last_day - timedelta(days=self.restatement_days)
+        day_pos = {d: i for i, d in enumerate(days)}
+
+        with self._lock:
+            states = []
+            for key in keys:
+                state = self._states.get(key)
+                committed = state.committed_through if state else None
+                if committed is not None and committed > last_day:
+                    # Older window than the cached state: fit it without caching
+                    states.append(_SeriesState(days[0]))
+                    continue
+                if committed is None or committed < days[0] - timedelta(days=1):
+                    # No contiguous history: refit from the first day we were given
+                    state = _SeriesState(days[0])
+                self._states[key] = state
+                self._states.move_to_end(key)
+                states.append(state)
+            while len(self._states) > self.max_series:
+                self._states.popitem(last=False)
+
+            # Series sharing a commit point are updated together
+            groups: Dict[Tuple[date, Optional[date]], List[int]] = {}
+            for i, state in enumerate(states):
+                groups.setdefault((state.origin, state.committed_through), []).append(i)
+
+            xtx = np.empty((len(keys), N_FEATURES, N_FEATURES))
+            xty = np.empty((len(keys), N_FEATURES))
+            for (origin, committed), rows in groups.items():
+                rows_arr = np.array(rows)
+                first = 0 if committed is None else day_pos.get(committed, -1) + 1
+                commit_end = day_pos[cutoff] + 1 if cutoff in day_pos else (
+                    len(days) if cutoff >= last_day else 0
+                )
+                base_xtx = np.stack([states[i].xtx for i in rows])
+                base_xty = np.stack([states[i].xty for i in rows])
+
+                # Days that can no longer be restated go into the cached state
+                if commit_end > first:
+                    idx = np.array([(days[j] - origin).days for j in range(first, commit_end)])
+                    base_xtx, base_xty = self._accumulate(
+                        base_xtx, base_xty, idx, _weekdays(origin, idx), values[rows_arr, first:commit_end]
+                    )
+                    for n, i in enumerate(rows):
+                        states[i].xtx = base_xtx[n]
+                        states[i].xty = base_xty[n]
+                        states[i].committed_through = days[commit_end - 1]
+                    first = commit_end
+
+                # The restatement tail is applied to a copy on every request
+                idx = np.array([(days[j] - origin).days for j in range(first, len(days))])
+                tail_xtx, tail_xty = self._accumulate(
+                    base_xtx, base_xty, idx, _weekdays(origin, idx), values[rows_arr, first:]
+                )
+                xtx[rows_arr] = tail_xtx
+                xty[rows_arr] = tail_xty
+
+            last_offsets = np.array([(last_day - state.origin).days for state in states])
+
+        ridge = settings.forecast_ridge * np.eye(N_FEATURES)
+        coef = np.linalg.solve(xtx + ridge, xty[..., None])[..., 0]
+        return coef, last_offsets
+
+    def forecast(self, series: Dict[str, Dict[str, float]], horizon_end: date) -> Dict[str, Any]:
+        """Forecast daily values after the last observed day through ``horizon_end``.
+
+        ``series`` maps series key -> {YYYY-MM-DD: amount}. Returns the last
+        observed day and an (n, h) array of clipped forecasts in key order.
+        """
+        keys = sorted(series)
+        day_strings = {d[:10] for s in series.values() for d in s}
+        all_days = sorted(datetime.strptime(d, "%Y-%m-%d").date() for d in day_strings)
+        if not keys or not all_days:
+            return {"keys": [], "as_of": None, "days": [], "values": np.zeros((0, 0))}
+
+        days = [all_days[0] + timedelta(days=i) for i in range((all_days[-1] - all_days[0]).days + 1)]
+        day_pos = {d.isoformat(): i for i, d in enumerate(days)}
+        values = np.zeros((len(keys), len(days)))
+        for row, key in enumerate(keys):
+            for day, amount in series[key].items():
+                values[row, day_pos[day[:10]]] += amount
+
+        coef, last_offsets = self._fit(keys, days, values)
+
+        horizon = max((horizon_end - days[-1]).days, 0)
+        if horizon == 0:
+            return {"keys": keys, "as_of": days[-1], "days": [], "values": np.zeros((len(keys), 0))}
+
+        # Per-series day offsets differ by origin, so build (n, h, p) designs
+        step = np.arange(1, horizon + 1)
+        day_index = last_offsets[:, None] + step[None, :]
+        weekday = (days[-1].weekday() + step) % 7
+        x = np.zeros((len(keys), horizon, N_FEATURES))
+        x[:, :, 0] = 1.0
+        x[:, :, 1] = day_index / _TREND_SCALE
+        cols = np.nonzero(weekday > 0)[0]
+        x[:, cols, 1 + weekday[cols]] = 1.0
+        predicted = np.clip(np.einsum("nhp,np->nh", x, coef), 0.0, None)
+
+        return {
+            "keys": keys,
+            "as_of": days[-1],
+            "days": [days[-1] + timedelta(days=int(i)) for i in step],
+            "values": predicted,
+        }
+
+    @traced("forecast.project_month_end")
+    def project_month_end(self, series: Dict[str, Dict[str, float]]) -> Optional[float]:
+        """Observed month-to-date spend plus forecast for the rest of the month"""
+        if not series:
+            return None
+        last_day = datetime.strptime(max(d[:10] for s in series.values() for d in s), "%Y-%m-%d").date()
+        month_start = last_day.replace(day=1)
+        month_end = last_day.replace(day=calendar.monthrange(last_day.year, last_day.month)[1])
+
+        observed = sum(
+            amount for s in series.values() for day, amount in s.items()
+            if month_start.isoformat() <= day[:10] <= last_day.isoformat()
+        )
+        result = self.forecast(series, month_end)
+        return float(observed + result["values"].sum())
+
+
+def daily_series(costs: List[CostMetric], prefix: str) -> Dict[str, Dict[str, float]]:
+    """Group daily CostMetric rows into {prefix|service: {date: amount}}"""
+    series: Dict[str, Dict[str, float]] = {}
+    for cost in costs:
+        if not cost.date:
+            continue
+        points = series.setdefault(f"{prefix}|{cost.service}", {})
+        points[cost.date[:10]] = points.get(cost.date[:10], 0.0) + cost.amount
+    return series
+
+
+# Shared forecaster so fitted state survives across requests
+cost_forecaster = CostForecaster()
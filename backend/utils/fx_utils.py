@@ -0,0 +1,242 @@
+import csv
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models.schemas import CostMetric
+from utils.cache_utils import CostCache, record_dependency
+from utils.trace_utils import traced
+
+# (currency, day, rate in base currency per unit)
+RateRow = Tuple[str, date, float]
+
+_UPSERT_FX_RATES = text("""
+INSERT INTO fx_rates (currency, day, rate, source)
+SELECT r.currency, r.day, r.rate, :source
+FROM unnest(CAST(:currencies AS text[]), CAST(:days AS date[]), CAST(:rates AS float8[]))
+     AS r(currency, day, rate)
+ON CONFLICT (currency, day) DO UPDATE SET rate = EXCLUDED.rate, source = EXCLUDED.source, updated_at = NOW()
+""")
+
+
+class FXRateTable:
+    """Daily FX rates against one base currency, stored as sorted arrays per currency.
+
+    A row dated ``d`` converts at the latest rate on or before ``d``; days
+    before a currency's first rate use that first rate.
+    """
+
+    def __init__(self, rows: Iterable[RateRow], base: str, source: str):
+        self.base = base.upper()
+        self.source = source
+        by_currency: Dict[str, List[Tuple[date, float]]] = {}
+        for currency, day, rate in rows:
+            if rate is None or rate <= 0:
+                continue
+            by_currency.setdefault(currency.upper(), []).append((day, float(rate)))
+
+        self._rates: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for currency, points in by_currency.items():
+            points.sort()
+            self._rates[currency] = (
+                np.array([day for day, _ in points], dtype="datetime64[D]"),
+                np.array([rate for _, rate in points], dtype=np.float64),
+            )
+
+    @property
+    def currencies(self) -> List[str]:
+        return sorted(set(self._rates) | {self.base})
+
+    def supports(self, currency: str) -> bool:
+        currency = currency.upper()
+        return currency == self.base or currency in self._rates
+
+    def _to_base(self, currency: str, days: np.ndarray) -> np.ndarray:
+        if currency == self.base:
+            return np.ones(len(days))
+        if currency not in self._rates:
+            raise ValueError(f"No FX rates for currency {currency}")
+        rate_days, rates = self._rates[currency]
+        positions = np.searchsorted(rate_days, days, side="right") - 1
+        return rates[np.maximum(positions, 0)]
+
+    def convert(self, amounts: np.ndarray, currencies: np.ndarray, days: np.ndarray, target: str) -> np.ndarray:
+        """Amounts converted to ``target`` at each row's daily rate, one lookup per currency"""
+        target = target.upper()
+        factors = np.empty(len(amounts))
+        codes, inverse = np.unique(currencies, return_inverse=True)
+        for index, code in enumerate(codes):
+            selected = inverse == index
+            factors[selected] = self._to_base(str(code), days[selected])
+        return amounts * factors / self._to_base(target, days)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "base": self.base,
+            "source": self.source,
+            "currencies": {
+                currency: {
+                    "first_day": str(rate_days[0]),
+                    "last_day": str(rate_days[-1]),
+                    "days": len(rate_days),
+                }
+                for currency, (rate_days, _) in sorted(self._rates.items())
+            },
+        }
+
+
+def read_rate_file(path: str) -> Tuple[str, List[RateRow]]:
+    """Parse a rate file into (base currency, rows).
+
+    CSV files have ``date,currency,rate`` columns against the configured base
+    currency; JSON files are ``{"base": "USD", "rates": {"YYYY-MM-DD": {"EUR": 1.08}}}``.
+    """
+    try:
+        if path.lower().endswith(".json"):
+            with open(path, encoding="utf-8") as handle:
+                document = json.load(handle)
+            base = str(document.get("base", settings.fx_base_currency)).upper()
+            rows = [
+                (currency.upper(), date.fromisoformat(day), float(rate))
+                for day, rates in document.get("rates", {}).items()
+                for currency, rate in rates.items()
+            ]
+        else:
+            base = settings.fx_base_currency.upper()
+            with open(path, newline="", encoding="utf-8") as handle:
+                rows = [
+                    (row["currency"].strip().upper(), date.fromisoformat(row["date"].strip()[:10]), float(row["rate"]))
+                    for row in csv.DictReader(handle)
+                ]
+    # Messages name the problem without echoing file contents back to the caller
+    except OSError:
+        raise ValueError(f"FX rate file {os.path.basename(path)} could not be read")
+    except KeyError as e:
+        raise ValueError(f"FX rate file {os.path.basename(path)} is missing the {e} column")
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError(f"FX rate file {os.path.basename(path)} has a malformed date or rate")
+    if base != settings.fx_base_currency.upper():
+        raise ValueError(f"FX rate file {os.path.basename(path)} uses a base other than "
+                         f"{settings.fx_base_currency.upper()}")
+    return base, rows
+
+
+def resolve_rate_path(relative: Optional[str]) -> str:
+    """Rate file under the configured FX root, or the configured FX_RATES_FILE when none is given"""
+    if not relative:
+        if not settings.fx_rates_file:
+            raise ValueError("No FX rate file given or configured")
+        return settings.fx_rates_file
+    root = Path(settings.fx_rates_root).resolve()
+    path = (root / relative).resolve()
+    if root not in path.parents:
+        raise ValueError("FX rate file must be inside the configured FX rates root")
+    return str(path)
+
+
+class FXRateStore:
+    """Rate table cached in memory, loaded from fx_rates or, offline, from the configured file"""
+
+    _KEY = "fx_rates"
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.cache = CostCache(max_entries=1, ttl=ttl if ttl is not None else settings.fx_cache_ttl_seconds)
+
+    def table(self) -> FXRateTable:
+        entry = self.cache.get_or_load_entry(self._KEY, self._load)
+        # Responses built from converted amounts are invalidated with the table
+        record_dependency(self.cache, entry)
+        return entry.value
+
+    def _load(self) -> FXRateTable:
+        base = settings.fx_base_currency.upper()
+        try:
+            db = SessionLocal()
+            try:
+                rows = db.execute(text("SELECT currency, day, rate::float8 FROM fx_rates")).all()
+            finally:
+                db.close()
+            if rows:
+                return FXRateTable([tuple(row) for row in rows], base, "database")
+        except Exception as e:
+            print(f"FX rates unavailable from database: {str(e)}")
+        if settings.fx_rates_file and os.path.exists(settings.fx_rates_file):
+            _, rows = read_rate_file(settings.fx_rates_file)
+            return FXRateTable(rows, base, settings.fx_rates_file)
+        return FXRateTable([], base, "empty")
+
+    def load_file(self, db: Session, path: str) -> Dict[str, Any]:
+        """Store a rate file in fx_rates and swap it into the in-memory table"""
+        base, rows = read_rate_file(path)
+        try:
+            for offset in range(0, len(rows), 5000):
+                batch = rows[offset:offset + 5000]
+                db.execute(_UPSERT_FX_RATES, {
+                    "currencies": [currency for currency, _, _ in batch],
+                    "days": [day for _, day, _ in batch],
+                    "rates": [rate for _, _, rate in batch],
+                    "source": os.path.basename(path),
+                })
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to store FX rates: {str(e)}")
+        self.cache.set(self._KEY, self._load())
+        return {"rates_loaded": len(rows), "base": base}
+
+    def reload(self) -> FXRateTable:
+        table = self._load()
+        self.cache.set(self._KEY, table)
+        return table
+
+    def check(self, currency: str) -> str:
+        """Normalized currency code, or ValueError when no rates exist for it"""
+        currency = currency.strip().upper()
+        if not self.table().supports(currency):
+            raise ValueError(f"No FX rates for currency {currency}")
+        return currency
+
+
+fx_rates = FXRateStore()
+
+
+def convert_amounts(days: List[str], currencies: List[Optional[str]], amounts: List[float],
+                    currency: str) -> List[float]:
+    """Stored row amounts converted to ``currency`` at each row's daily rate"""
+    target = currency.upper()
+    codes = np.array([(code or target).upper() for code in currencies], dtype=str)
+    values = np.asarray(amounts, dtype=np.float64)
+    if not len(codes) or (codes == target).all():
+        return values.tolist()
+    dated = np.array([day[:10] for day in days], dtype="datetime64[D]")
+    return fx_rates.table().convert(values, codes, dated, target).tolist()
+
+
+@traced("fx.normalize_costs")
+def normalize_costs(costs: List[CostMetric], currency: str) -> List[CostMetric]:
+    """Costs converted to ``currency`` at each row's daily rate in one vectorized pass"""
+    target = currency.upper()
+    if not costs:
+        return costs
+    currencies = np.array([(cost.currency or target).upper() for cost in costs])
+    if (currencies == target).all():
+        return costs
+
+    today = date.today().isoformat()
+    days = np.array([(cost.date or today)[:10] for cost in costs], dtype="datetime64[D]")
+    amounts = np.fromiter((cost.amount for cost in costs), dtype=np.float64, count=len(costs))
+    converted = fx_rates.table().convert(amounts, currencies, days, target)
+    # Rows are shared with the cost cache, so converted ones are copies
+    return [
+        cost if code == target
+        else cost.model_copy(update={"amount": amount, "unit": target, "currency": target})
+        for cost, code, amount in zip(costs, currencies.tolist(), converted.tolist())
+    ]
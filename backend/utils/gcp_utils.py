@@ -1,49 +1,53 @@
 from google.auth import default
 from google.auth.credentials import Credentials
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import json
 from models.schemas import CostMetric
+from utils.identity_utils import credential_identity
+from utils.client_pool import gcp_credentials, gcp_service
+from utils.recording_utils import response_store
+from utils.trace_utils import trace_methods
 
+@trace_methods("gcp")
 class GCPCostManager:
+    max_group_by = 2
+
     def __init__(self, project_id: Optional[str] = None, service_account_key: Optional[str] = None):
         self.project_id = project_id
         self.service_account_key = service_account_key
-        self._credentials = None
-        self._billing_service = None
+
+    @property
+    def identity(self) -> str:
+        """Identity of the credentials, safe to use in cache keys"""
+        key = self.service_account_key
+        if key is not None and not isinstance(key, str):
+            key = json.dumps(key, sort_keys=True)
+        return credential_identity("gcp", self.project_id, secrets=(key,))
 
     def _get_credentials(self) -> Credentials:
         """Get GCP credentials"""
-        if not self._credentials:
-            if self.service_account_key:
-                # Load from service account key
-                if isinstance(self.service_account_key, str):
-                    key_data = json.loads(self.service_account_key)
-                else:
-                    key_data = self.service_account_key
-                    
-                self._credentials = service_account.Credentials.from_service_account_info(
-                    key_data,
-                    scopes=['https://www.googleapis.com/auth/cloud-billing.readonly',
-                           'https://www.googleapis.com/auth/cloud-platform.read-only']
-                )
+        return gcp_credentials(self, self._load_credentials)
+
+    def _load_credentials(self) -> Credentials:
+        scopes = ['https://www.googleapis.com/auth/cloud-billing.readonly',
+                  'https://www.googleapis.com/auth/cloud-platform.read-only']
+        if self.service_account_key:
+            # Load from service account key
+            if isinstance(self.service_account_key, str):
+                key_data = json.loads(self.service_account_key)
             else:
-                # Use default credentials
-                self._credentials, _ = default(
-                    scopes=['https://www.googleapis.com/auth/cloud-billing.readonly',
-                           'https://www.googleapis.com/auth/cloud-platform.read-only']
-                )
-        return self._credentials
+                key_data = self.service_account_key
+            return service_account.Credentials.from_service_account_info(key_data, scopes=scopes)
+        # Use default credentials
+        credentials, _ = default(scopes=scopes)
+        return credentials
 
     def _get_billing_service(self):
         """Get Cloud Billing service"""
-        if not self._billing_service:
-            credentials = self._get_credentials()
-            self._billing_service = build('cloudbilling', 'v1', credentials=credentials)
-        return self._billing_service
+        return gcp_service(self, 'cloudbilling', 'v1')
 
     def test_connection(self) -> Dict[str, Any]:
         """Test GCP connection and permissions"""
@@ -63,16 +67,18 @@ class GCPCostManager:
             return {"success": False, "error": str(e)}
 
     def get_costs(self, start_date: str, end_date: str, granularity: str = "MONTHLY", 
-                  group_by: List[str] = None) -> List[CostMetric]:
+                  group_by: List[str] = None, filters: Optional[Dict[str, str]] = None) -> List[CostMetric]:
         """Get cost data from GCP Cloud Billing"""
         if not self.project_id:
             raise Exception("Project ID is required")
             
         try:
-            service = self._get_billing_service()
-            
-            # Get billing account for the project
-            billing_accounts = service.billingAccounts().list().execute()
+            # Get billing account for the project; the service is built inside the fetch so a replay makes
+            # no upstream call, and the identity fingerprints the key so only this key replays it
+            billing_accounts = response_store.call(
+                "gcp", self.identity, "billingAccounts.list", {},
+                lambda: self._get_billing_service().billingAccounts().list().execute(),
+            )
             if not billing_accounts.get('billingAccounts'):
                 raise Exception("No billing accounts found")
             
@@ -128,8 +134,7 @@ class GCPCostManager:
     def get_projects(self) -> List[Dict[str, str]]:
         """Get list of available projects"""
         try:
-            credentials = self._get_credentials()
-            service = build('cloudresourcemanager', 'v1', credentials=credentials)
+            service = gcp_service(self, 'cloudresourcemanager', 'v1')
             
             result = service.projects().list().execute()
             projects = []
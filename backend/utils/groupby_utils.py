@@ -0,0 +1,216 @@
+import contextvars
+import threading
+from collections import defaultdict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import List, Dict, Optional, Set, Tuple
+
+from config import settings
+from models.schemas import CostMetric
+from utils.cache_utils import CacheEntry, CostCache, cost_cache, load_or_stale, record_dependency, track_stale_reads
+from utils.trace_utils import span, traced
+
+# Rough distinct-value counts used to pick split dimensions before any are known
+_PRIOR_CARDINALITY = {
+    "LINKED_ACCOUNT": 50,
+    "SUBSCRIPTION": 50,
+    "REGION": 25,
+    "RESOURCE_GROUP": 100,
+    "SERVICE": 150,
+    "METER_CATEGORY": 150,
+    "USAGE_TYPE": 2000,
+    "RESOURCE": 100000,
+}
+_PRIOR_TAG_CARDINALITY = 200
+
+# (date, dimension values in canonical order, amount, unit)
+Row = Tuple[Optional[str], Tuple[str, ...], float, str]
+Window = Tuple[str, str, str, str]
+
+
+def normalize_dimensions(group_by: Optional[List[str]]) -> List[str]:
+    """Upper-case dimension names, keep tag key case, drop duplicates"""
+    dimensions = []
+    for raw in group_by or ["SERVICE"]:
+        raw = raw.strip()
+        if not raw:
+            continue
+        dimension = f"TAG:{raw[4:]}" if raw.upper().startswith("TAG:") else raw.upper()
+        if dimension not in dimensions:
+            dimensions.append(dimension)
+    return dimensions or ["SERVICE"]
+
+
+@traced("groupby.rollup")
+def _rollup(rows: List[Row], source: Tuple[str, ...], target: Tuple[str, ...]) -> List[Row]:
+    """Sum rows grouped by a finer dimension set down to a subset of it"""
+    if source == target:
+        return rows
+    positions = [source.index(d) for d in target]
+    totals: Dict[Tuple[Optional[str], Tuple[str, ...], str], float] = defaultdict(float)
+    for day, values, amount, unit in rows:
+        totals[(day, tuple(values[p] for p in positions), unit)] += amount
+    return [(day, values, amount, unit) for (day, values, unit), amount in totals.items()]
+
+
+class GroupByPlanner:
+    """Answers arbitrary group-by dimension sets with the fewest upstream queries.
+
+    Results are cached per canonical (sorted) dimension set. A request is
+    served by rolling up the smallest cached superset when one exists; sets
+    within the provider's group-by limit are one query; larger sets are
+    split by filtering on the lowest-cardinality dimensions and querying
+    the rest for each value combination.
+    """
+
+    def __init__(self, cache: Optional[CostCache] = None, max_workers: Optional[int] = None):
+        self.cache = cache or cost_cache
+        self.max_workers = max_workers or settings.groupby_max_workers
+        self._complete: Dict[Window, Set[Tuple[str, ...]]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(window: Window, dimensions: Tuple[str, ...], filters: Tuple[Tuple[str, str], ...] = ()) -> str:
+        identity, start, end, granularity = window
+        filter_part = ",".join(f"{d}={v}" for d, v in filters)
+        return f"groupby|{identity}|{start}|{end}|{granularity}|{','.join(dimensions)}|{filter_part}"
+
+    def _cached_superset(self, window: Window, dimensions: Tuple[str, ...]) -> Optional[Tuple[Tuple[str, ...], CacheEntry]]:
+        """Smallest fresh cached dimension set containing all requested dimensions"""
+        with self._lock:
+            candidates = sorted(
+                (dims for dims in self._complete[window] if set(dimensions) <= set(dims)), key=len
+            )
+        for dims in candidates:
+            entry = self.cache.get_entry(self._key(window, dims))
+            if entry is not None:
+                return dims, entry
+            with self._lock:
+                self._complete[window].discard(dims)
+        return None
+
+    def _store(self, window: Window, dimensions: Tuple[str, ...], rows: List[Row]) -> CacheEntry:
+        entry = self.cache.set(self._key(window, dimensions), rows)
+        with self._lock:
+            self._complete[window].add(dimensions)
+        return entry
+
+    def _query(self, manager, window: Window, dimensions: Tuple[str, ...],
+               filters: Tuple[Tuple[str, str], ...], report: Dict[str, int]) -> CacheEntry:
+        _, start, end, granularity = window
+
+        def load() -> List[Row]:
+            report["upstream_queries"] += 1
+            kwargs = {"filters": dict(filters)} if filters else {}
+            costs = manager.get_costs(start, end, granularity, list(dimensions), **kwargs)
+            return [
+                (c.date, tuple((c.dimensions or {}).get(d, "") for d in dimensions), c.amount, c.unit)
+                for c in costs
+            ]
+
+        entry = load_or_stale(self.cache, self._key(window, dimensions, filters), manager.identity, load)
+        if not filters:
+            with self._lock:
+                self._complete[window].add(dimensions)
+        return entry
+
+    def _cardinality(self, window: Window, dimension: str) -> int:
+        cached = self._cached_superset(window, (dimension,))
+        if cached is not None:
+            dims, entry = cached
+            position = dims.index(dimension)
+            return len({values[position] for _, values, _, _ in entry.value})
+        if dimension.startswith("TAG:"):
+            return _PRIOR_TAG_CARDINALITY
+        return _PRIOR_CARDINALITY.get(dimension, 1000)
+
+    @traced("groupby.resolve")
+    def _resolve(self, manager, window: Window, dimensions: Tuple[str, ...],
+                 report: Dict[str, int]) -> Tuple[List[Row], CacheEntry]:
+        """Rows for a dimension set and the cache entry they were taken from"""
+        cached = self._cached_superset(window, dimensions)
+        if cached is not None:
+            report["derived"] += cached[0] != dimensions
+            report["cache_hits"] += 1
+            return _rollup(cached[1].value, cached[0], dimensions), cached[1]
+
+        limit = max(getattr(manager, "max_group_by", 1), 1)
+        tag_limit = getattr(manager, "max_tag_group_by", limit)
+        tags = [d for d in dimensions if d.startswith("TAG:")]
+        if len(dimensions) <= limit and len(tags) <= tag_limit:
+            entry = self._query(manager, window, dimensions, (), report)
+            return entry.value, entry
+
+        # Split on the dimensions with the fewest values, group by the rest
+        by_cardinality = sorted(dimensions, key=lambda d: self._cardinality(window, d))
+        split = by_cardinality[:len(dimensions) - limit]
+        grouped_tags = [d for d in by_cardinality if d in tags and d not in split]
+        # Providers that return one tag column per query also split the surplus tags
+        split += grouped_tags[:max(len(grouped_tags) - tag_limit, 0)]
+        grouped = tuple(d for d in dimensions if d not in split)
+        split_values = [
+            sorted({values[0] for _, values, _, _ in self._resolve(manager, window, (d,), report)[0]})
+            for d in split
+        ]
+        combos = list(product(*split_values))
+        report["split_queries"] += len(combos)
+
+        def run(combo: Tuple[str, ...]) -> Tuple[Tuple[str, ...], List[Row]]:
+            filters = tuple(sorted(zip(split, combo)))
+            return combo, self._query(manager, window, grouped, filters, report).value
+
+        rows: List[Row] = []
+        if combos:
+            # Each split query runs in a copy of the caller's context so stale reads are still tracked
+            contexts = [contextvars.copy_context() for _ in combos]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(combos))) as pool:
+                for combo, part in pool.map(lambda context, combo: context.run(run, combo), contexts, combos):
+                    fixed = dict(zip(split, combo))
+                    for day, values, amount, unit in part:
+                        by_dim = dict(zip(grouped, values), **fixed)
+                        rows.append((day, tuple(by_dim[d] for d in dimensions), amount, unit))
+
+        return rows, self._store(window, dimensions, rows)
+
+    @traced("groupby.get_rows")
+    def get_rows(self, manager, start_date: str, end_date: str, granularity: str = "MONTHLY",
+                 group_by: Optional[List[str]] = None) -> Tuple[List[Row], List[str], List[int], Dict[str, int]]:
+        """Cached rows for the requested dimensions, the dimensions, each one's position in a row's values, and the report"""
+        requested = normalize_dimensions(group_by)
+        canonical = tuple(sorted(requested))
+        window = (manager.identity, start_date, end_date, granularity.upper())
+        report = {"upstream_queries": 0, "split_queries": 0, "cache_hits": 0, "derived": 0}
+
+        with track_stale_reads() as stale:
+            rows, entry = self._resolve(manager, window, canonical, report)
+        record_dependency(self.cache, entry)
+        report["data_version"] = entry.version
+        if stale:
+            # The provider failed or its breaker is open; rows are the last-known-good data
+            report["stale_since"] = datetime.utcfromtimestamp(min(stale.values())).isoformat() + "Z"
+        return rows, requested, [canonical.index(d) for d in requested], report
+
+    @traced("groupby.get_costs")
+    def get_costs(self, manager, start_date: str, end_date: str, granularity: str = "MONTHLY",
+                  group_by: Optional[List[str]] = None) -> Tuple[List[CostMetric], Dict[str, int]]:
+        """Costs grouped by every requested dimension, keyed by composite "a|b|..." labels"""
+        rows, requested, order, report = self.get_rows(manager, start_date, end_date, granularity, group_by)
+        costs = []
+        with span("groupby.build_metrics", rows=len(rows)):
+            for day, values, amount, unit in rows:
+                ordered = [values[i] for i in order]
+                costs.append(CostMetric(
+                    service="|".join(v or "Unknown" for v in ordered),
+                    amount=amount,
+                    unit=unit,
+                    currency=unit,
+                    date=day,
+                    dimensions=dict(zip(requested, ordered)),
+                ))
+            costs.sort(key=lambda c: (c.date or "", c.service))
+        return costs, report
+
+
+# Shared planner so cached groupings are reused across requests
+groupby_planner = GroupByPlanner()
@@ -0,0 +1,20 @@
+import hashlib
+from typing import Optional
+
+
+def secret_fingerprint(*secrets: Optional[str]) -> str:
+    """Short hash of secret material so rotated secrets get new clients and cache entries"""
+    material = "\x1f".join(secret or "" for secret in secrets)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def credential_identity(provider: str, *parts: Optional[str], secrets: tuple = ()) -> str:
+    """Stable, non-secret identity for a set of provider credentials.
+
+    ``secrets`` are folded in through their fingerprint, so a request that
+    repeats an access key id with the wrong secret gets a different identity
+    and never shares another tenant's cache entries, recordings or breakers.
+    """
+    material = "\x1f".join([part or "" for part in parts] + [secret_fingerprint(*secrets)])
+    digest = hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+    return f"{provider}:{digest}"
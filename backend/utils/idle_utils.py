@@ -0,0 +1,451 @@
+import json
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from azure.monitor.querymetrics import MetricsClient, MetricAggregationType
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from utils.client_pool import aws_client, azure_client, gcp_service
+
+# (metric key, namespace/metric name, statistic) fetched per resource type
+_AWS_METRICS = {
+    "ec2:instance": [
+        ("cpu_avg", "AWS/EC2", "CPUUtilization", "Average"),
+        ("cpu_max", "AWS/EC2", "CPUUtilization", "Maximum"),
+        ("net_in", "AWS/EC2", "NetworkIn", "Sum"),
+        ("net_out", "AWS/EC2", "NetworkOut", "Sum"),
+    ],
+    "ec2:volume": [
+        ("read_ops", "AWS/EBS", "VolumeReadOps", "Sum"),
+        ("write_ops", "AWS/EBS", "VolumeWriteOps", "Sum"),
+    ],
+}
+_AWS_DIMENSION = {"ec2:instance": "InstanceId", "ec2:volume": "VolumeId"}
+
+_AZURE_VM_METRICS = {
+    "Percentage CPU": [("cpu_avg", "average"), ("cpu_max", "maximum")],
+    "Network In Total": [("net_in", "total")],
+    "Network Out Total": [("net_out", "total")],
+}
+
+# GCP reports CPU as a 0-1 fraction; values are scaled to percent
+_GCP_INSTANCE_METRICS = [
+    ("cpu_avg", "compute.googleapis.com/instance/cpu/utilization", "ALIGN_MEAN", 100.0),
+    ("cpu_max", "compute.googleapis.com/instance/cpu/utilization", "ALIGN_MAX", 100.0),
+    ("net_in", "compute.googleapis.com/instance/network/received_bytes_count", "ALIGN_SUM", 1.0),
+    ("net_out", "compute.googleapis.com/instance/network/sent_bytes_count", "ALIGN_SUM", 1.0),
+]
+
+_INSTANCE_TYPES = ("ec2:instance", "azure:virtual-machine", "gce:instance")
+_DISK_TYPES = ("ec2:volume", "azure:disk", "gce:disk")
+_ADDRESS_TYPES = ("ec2:elastic-ip", "azure:public-ip", "gce:address")
+
+
+class MetricWindowCache:
+    """Daily metric points that have already been fetched.
+
+    Only complete days are stored, and a completed day never changes, so a
+    later scan asks the provider only for the days after the last cached one.
+    """
+
+    def __init__(self, max_series: Optional[int] = None):
+        self.max_series = max_series or settings.idle_metric_cache_size
+        self._points: Dict[Tuple[str, str], Dict[date, float]] = {}
+        self._fetched_through: Dict[Tuple[str, str], date] = {}
+        self._lock = threading.Lock()
+
+    def missing_from(self, key: Tuple[str, str], window_start: date) -> date:
+        """First day in the window that still has to be fetched"""
+        with self._lock:
+            fetched = self._fetched_through.get(key)
+        if fetched is None or fetched < window_start:
+            return window_start
+        return fetched + timedelta(days=1)
+
+    def store(self, key: Tuple[str, str], points: Dict[date, float], fetched_through: date):
+        with self._lock:
+            if key not in self._points and len(self._points) >= self.max_series:
+                # Drop the oldest-inserted series to bound memory
+                oldest = next(iter(self._points))
+                self._points.pop(oldest)
+                self._fetched_through.pop(oldest, None)
+            self._points.setdefault(key, {}).update(points)
+            self._fetched_through[key] = max(fetched_through, self._fetched_through.get(key, fetched_through))
+
+    def matrix(self, resource_ids: List[str], metric: str, start: date, end: date) -> np.ndarray:
+        """One row per resource and one column per day in [start, end); days without a value are NaN"""
+        values = np.full((len(resource_ids), max((end - start).days, 0)), np.nan)
+        with self._lock:
+            for row, resource_id in enumerate(resource_ids):
+                for day, value in self._points.get((resource_id, metric), {}).items():
+                    if start <= day < end:
+                        values[row, (day - start).days] = value
+        return values
+
+
+metric_cache = MetricWindowCache()
+
+
+def _window(lookback_days: int) -> Tuple[date, date]:
+    """[start, end) covering the last complete days"""
+    end = datetime.now(timezone.utc).date()
+    return end - timedelta(days=lookback_days), end
+
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+class AWSMetricFetcher:
+    """CloudWatch GetMetricData, packed up to 500 queries per call and region"""
+
+    MAX_QUERIES = 500
+
+    def __init__(self, manager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or settings.inventory_max_workers
+
+    def _client(self, region: str):
+        return aws_client(self.manager, "cloudwatch", region, retries={"mode": "adaptive", "max_attempts": 8})
+
+    def _fetch_batch(self, region: str, start: date, end: date,
+                     queries: List[Tuple[str, str, Dict[str, Any]]]) -> Dict[Tuple[str, str], Dict[date, float]]:
+        cloudwatch = self._client(region)
+        by_id = {f"q{i}": (resource_id, key) for i, (resource_id, key, _) in enumerate(queries)}
+        request = {
+            "MetricDataQueries": [
+                {"Id": f"q{i}", "MetricStat": spec, "ReturnData": True}
+                for i, (_, _, spec) in enumerate(queries)
+            ],
+            "StartTime": _midnight(start),
+            "EndTime": _midnight(end),
+            "ScanBy": "TimestampAscending",
+        }
+        results: Dict[Tuple[str, str], Dict[date, float]] = defaultdict(dict)
+        while True:
+            response = cloudwatch.get_metric_data(**request)
+            for result in response["MetricDataResults"]:
+                series = results[by_id[result["Id"]]]
+                for stamp, value in zip(result["Timestamps"], result["Values"]):
+                    series[stamp.date()] = float(value)
+            if not response.get("NextToken"):
+                return results
+            request["NextToken"] = response["NextToken"]
+
+    def fetch(self, resources: List[Dict[str, Any]], window_start: date, window_end: date):
+        """Fill the metric cache for all instances and volumes in the window"""
+        # Group by (region, first missing day): each group shares one time range
+        groups: Dict[Tuple[str, date], List[Tuple[str, str, Dict[str, Any]]]] = defaultdict(list)
+        for resource in resources:
+            specs = _AWS_METRICS.get(resource["resource_type"])
+            if not specs or resource["status"] == "terminated":
+                continue
+            dimension = _AWS_DIMENSION[resource["resource_type"]]
+            for key, namespace, metric, stat in specs:
+                cache_key = (resource["resource_id"], key)
+                start = metric_cache.missing_from(cache_key, window_start)
+                if start >= window_end:
+                    continue
+                groups[(resource["region"], start)].append((resource["resource_id"], key, {
+                    "Metric": {
+                        "Namespace": namespace,
+                        "MetricName": metric,
+                        "Dimensions": [{"Name": dimension, "Value": resource["resource_id"]}],
+                    },
+                    "Period": 86400,
+                    "Stat": stat,
+                }))
+
+        batches = [
+            (region, start, queries[i:i + self.MAX_QUERIES])
+            for (region, start), queries in groups.items()
+            for i in range(0, len(queries), self.MAX_QUERIES)
+        ]
+        calls = _fetch_batches(self._fetch_batch, batches, window_end, self.max_workers)
+        return {"api_calls": calls, "queries": sum(len(b[2]) for b in batches)}
+
+
+class AzureMetricFetcher:
+    """Azure Monitor metrics batch API: up to 50 resources per call, per region"""
+
+    MAX_RESOURCES = 50
+
+    def __init__(self, manager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or settings.inventory_max_workers
+
+    def _fetch_batch(self, region: str, start: date, end: date,
+                     queries: List[Tuple[str, str, Dict[str, Any]]]) -> Dict[Tuple[str, str], Dict[date, float]]:
+        client = azure_client(self.manager, MetricsClient, endpoint=f"https://{region}.metrics.monitor.azure.com")
+        # Azure returns metric ids in its own casing; map back to our lowercased ids
+        resource_ids = sorted({resource_id for resource_id, _, _ in queries})
+        response = client.query_resources(
+            resource_ids=resource_ids,
+            metric_namespace="Microsoft.Compute/virtualMachines",
+            metric_names=list(_AZURE_VM_METRICS),
+            timespan=(_midnight(start), _midnight(end)),
+            granularity=timedelta(days=1),
+            aggregations=[MetricAggregationType.AVERAGE, MetricAggregationType.MAXIMUM, MetricAggregationType.TOTAL],
+        )
+        results: Dict[Tuple[str, str], Dict[date, float]] = defaultdict(dict)
+        for result in response:
+            for metric in result.metrics:
+                resource_id = metric.id.lower().split("/providers/microsoft.insights/metrics")[0]
+                for key, field in _AZURE_VM_METRICS.get(metric.name, []):
+                    series = results[(resource_id, key)]
+                    for element in metric.timeseries:
+                        for point in element.data:
+                            value = getattr(point, field)
+                            if value is not None:
+                                series[point.timestamp.date()] = float(value)
+        return results
+
+    def fetch(self, resources: List[Dict[str, Any]], window_start: date, window_end: date):
+        groups: Dict[Tuple[str, date], List[Tuple[str, str, Dict[str, Any]]]] = defaultdict(list)
+        for resource in resources:
+            if resource["resource_type"] != "azure:virtual-machine" or resource["status"] == "terminated":
+                continue
+            # All metrics of a VM are fetched together, so the earliest gap wins
+            start = min(
+                metric_cache.missing_from((resource["resource_id"], key), window_start)
+                for fields in _AZURE_VM_METRICS.values() for key, _ in fields
+            )
+            if start < window_end:
+                groups[(resource["region"], start)].extend(
+                    (resource["resource_id"], key, {})
+                    for fields in _AZURE_VM_METRICS.values() for key, _ in fields
+                )
+
+        per_resource = sum(len(fields) for fields in _AZURE_VM_METRICS.values())
+        chunk = self.MAX_RESOURCES * per_resource
+        batches = [
+            (region, start, queries[i:i + chunk])
+            for (region, start), queries in groups.items()
+            for i in range(0, len(queries), chunk)
+        ]
+        calls = _fetch_batches(self._fetch_batch, batches, window_end, self.max_workers)
+        return {"api_calls": calls, "queries": sum(len(b[2]) for b in batches)}
+
+
+class GCPMetricFetcher:
+    """Cloud Monitoring timeSeries.list: one paged call per metric for the whole project"""
+
+    def __init__(self, manager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or settings.inventory_max_workers
+
+    def _fetch_metric(self, key: str, metric_type: str, aligner: str, scale: float,
+                      start: date, end: date) -> Dict[Tuple[str, str], Dict[date, float]]:
+        monitoring = gcp_service(self.manager, "monitoring", "v3")
+        series_api = monitoring.projects().timeSeries()
+        request = series_api.list(
+            name=f"projects/{self.manager.project_id}",
+            filter=f'metric.type = "{metric_type}"',
+            interval_startTime=_midnight(start).isoformat().replace("+00:00", "Z"),
+            interval_endTime=_midnight(end).isoformat().replace("+00:00", "Z"),
+            aggregation_alignmentPeriod="86400s",
+            aggregation_perSeriesAligner=aligner,
+            aggregation_crossSeriesReducer="REDUCE_SUM" if aligner == "ALIGN_SUM" else "REDUCE_MAX",
+            aggregation_groupByFields="resource.labels.instance_id",
+            pageSize=10000,
+        )
+        results: Dict[Tuple[str, str], Dict[date, float]] = defaultdict(dict)
+        while request is not None:
+            response = request.execute()
+            for series in response.get("timeSeries", []):
+                instance_id = series["resource"]["labels"]["instance_id"]
+                points = results[(instance_id, key)]
+                for point in series.get("points", []):
+                    value = point["value"].get("doubleValue", point["value"].get("int64Value", 0))
+                    stamp = datetime.fromisoformat(point["interval"]["startTime"].replace("Z", "+00:00"))
+                    points[stamp.date()] = float(value) * scale
+            request = series_api.list_next(request, response)
+        return results
+
+    def fetch(self, resources: List[Dict[str, Any]], window_start: date, window_end: date):
+        instances = [
+            r for r in resources if r["resource_type"] == "gce:instance" and r["status"] != "terminated"
+        ]
+        if not instances:
+            return {"api_calls": 0, "queries": 0}
+        start = min(
+            metric_cache.missing_from((r["resource_id"], key), window_start)
+            for r in instances for key, _, _, _ in _GCP_INSTANCE_METRICS
+        )
+        if start >= window_end:
+            return {"api_calls": 0, "queries": 0}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(_GCP_INSTANCE_METRICS))) as pool:
+            futures = [
+                pool.submit(self._fetch_metric, key, metric_type, aligner, scale, start, window_end)
+                for key, metric_type, aligner, scale in _GCP_INSTANCE_METRICS
+            ]
+            for future in futures:
+                for cache_key, points in future.result().items():
+                    metric_cache.store(cache_key, points, window_end - timedelta(days=1))
+        # Instances without datapoints still count as fetched for this window
+        for r in instances:
+            for key, _, _, _ in _GCP_INSTANCE_METRICS:
+                metric_cache.store((r["resource_id"], key), {}, window_end - timedelta(days=1))
+        return {"api_calls": len(_GCP_INSTANCE_METRICS), "queries": len(instances) * len(_GCP_INSTANCE_METRICS)}
+
+
+def _fetch_batches(fetch_batch, batches, window_end: date, max_workers: int) -> int:
+    """Run batched metric calls concurrently and store every series in the cache"""
+    if not batches:
+        return 0
+    fetched_through = window_end - timedelta(days=1)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        futures = [
+            (pool.submit(fetch_batch, region, start, window_end, queries), queries)
+            for region, start, queries in batches
+        ]
+        for future, queries in futures:
+            results = future.result()
+            for resource_id, key, _ in queries:
+                metric_cache.store((resource_id, key), results.get((resource_id, key), {}), fetched_through)
+    return len(batches)
+
+
+_METRIC_FETCHERS = {"aws": AWSMetricFetcher, "azure": AzureMetricFetcher, "gcp": GCPMetricFetcher}
+
+
+def classify_resources(resources: List[Dict[str, Any]], window_start: date, window_end: date) -> List[Dict[str, Any]]:
+    """Idle classification from cached daily metrics and status.
+
+    Each metric is read as a resources x days matrix, so the per-resource
+    means, peaks and rule checks are array operations over all resources.
+    """
+    if not resources:
+        return []
+    resource_ids = [r["resource_id"] for r in resources]
+
+    def stat(key: str, peak: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        values = metric_cache.matrix(resource_ids, key, window_start, window_end)
+        present = ~np.isnan(values)
+        days = present.sum(axis=1)
+        if peak:
+            reduced = np.max(np.where(present, values, -np.inf), axis=1, initial=-np.inf)
+        else:
+            reduced = np.nansum(values, axis=1) / np.maximum(days, 1)
+        return np.where(days > 0, reduced, np.nan), days
+
+    resource_type = np.array([r["resource_type"] for r in resources])
+    status = np.array([r["status"] or "" for r in resources])
+    status_age_days = np.array([
+        (datetime.now(timezone.utc) - r["status_changed_at"]).days if r.get("status_changed_at") else 0
+        for r in resources
+    ])
+
+    cpu_avg, cpu_days = stat("cpu_avg")
+    cpu_max, _ = stat("cpu_max", peak=True)
+    net_in, _ = stat("net_in")
+    net_out, _ = stat("net_out")
+    read_ops, io_days = stat("read_ops")
+    write_ops, _ = stat("write_ops")
+
+    network_mb = (np.nan_to_num(net_in) + np.nan_to_num(net_out)) / (1024 * 1024)
+    io_ops = np.nan_to_num(read_ops) + np.nan_to_num(write_ops)
+
+    is_instance = np.isin(resource_type, _INSTANCE_TYPES)
+    is_disk = np.isin(resource_type, _DISK_TYPES)
+    is_address = np.isin(resource_type, _ADDRESS_TYPES)
+    enough_data = cpu_days >= settings.idle_min_days
+
+    conditions = [
+        is_instance & (status == "running") & enough_data
+        & (cpu_avg < settings.idle_cpu_avg_percent)
+        & (cpu_max < settings.idle_cpu_peak_percent)
+        & (network_mb < settings.idle_network_mb_per_day),
+        is_instance & (status == "stopped") & (status_age_days >= settings.idle_stale_days),
+        is_disk & (status == "stopped"),
+        (resource_type == "ec2:volume") & (status == "running") & (io_days >= settings.idle_min_days)
+        & (io_ops < settings.idle_volume_ops_per_day),
+        is_address & (status == "stopped"),
+    ]
+    reasons = ["low-utilization", "stopped-stale", "unattached", "no-io", "unassociated"]
+    reason = np.select(conditions, reasons, default="")
+
+    results = []
+    for i, resource in enumerate(resources):
+        utilization = {
+            "window_days": int(max(cpu_days[i], io_days[i])),
+            "cpu_avg_percent": None if np.isnan(cpu_avg[i]) else round(float(cpu_avg[i]), 3),
+            "cpu_peak_percent": None if np.isnan(cpu_max[i]) else round(float(cpu_max[i]), 3),
+            "network_mb_per_day": round(float(network_mb[i]), 3) if is_instance[i] else None,
+            "io_ops_per_day": round(float(io_ops[i]), 3) if resource_type[i] == "ec2:volume" else None,
+        }
+        results.append({
+            "resource_id": resource["resource_id"],
+            "is_idle": bool(reason[i]),
+            "idle_reason": str(reason[i]) or None,
+            "utilization": {k: v for k, v in utilization.items() if v is not None},
+        })
+    return results
+
+
+_UPDATE_IDLE = text("""
+UPDATE resources r
+SET is_idle = u.is_idle,
+    idle_reason = u.idle_reason,
+    utilization = CAST(u.utilization AS jsonb),
+    idle_checked_at = CURRENT_TIMESTAMP
+FROM unnest(
+    CAST(:resource_ids AS text[]), CAST(:is_idle AS boolean[]),
+    CAST(:idle_reasons AS text[]), CAST(:utilization AS text[])
+) AS u(resource_id, is_idle, idle_reason, utilization)
+WHERE r.integration_id = CAST(:integration_id AS uuid)
+  AND r.resource_id = u.resource_id
+""")
+
+
+def detect_idle_resources(db: Session, integration: Dict[str, Any], manager) -> Dict[str, Any]:
+    """Fetch utilization in batches, classify every resource and store the result"""
+    resources = [
+        dict(row._mapping) for row in db.execute(text("""
+            SELECT resource_id, resource_type, status::text AS status, region, status_changed_at
+            FROM resources
+            WHERE integration_id = CAST(:integration_id AS uuid) AND status <> 'terminated'
+        """), {"integration_id": integration["id"]})
+    ]
+    window_start, window_end = _window(settings.idle_lookback_days)
+
+    fetcher = _METRIC_FETCHERS[integration["provider"]](manager)
+    fetch_report = fetcher.fetch(resources, window_start, window_end)
+    results = classify_resources(resources, window_start, window_end)
+
+    try:
+        batch_size = settings.inventory_batch_size
+        for offset in range(0, len(results), batch_size):
+            batch = results[offset:offset + batch_size]
+            db.execute(_UPDATE_IDLE, {
+                "integration_id": integration["id"],
+                "resource_ids": [r["resource_id"] for r in batch],
+                "is_idle": [r["is_idle"] for r in batch],
+                "idle_reasons": [r["idle_reason"] for r in batch],
+                "utilization": [json.dumps(r["utilization"]) for r in batch],
+            })
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Failed to store idle resource results: {str(e)}")
+
+    reasons: Dict[str, int] = defaultdict(int)
+    for r in results:
+        if r["is_idle"]:
+            reasons[r["idle_reason"]] += 1
+
+    return {
+        "integration_id": integration["id"],
+        "window": f"{window_start} to {window_end}",
+        "resources_checked": len(results),
+        "idle": sum(reasons.values()),
+        "idle_by_reason": dict(reasons),
+        **fetch_report,
+    }
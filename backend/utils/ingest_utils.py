@@ -0,0 +1,144 @@
+import calendar
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Tuple
+import json
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.schemas import CostMetric
+from utils.alert_utils import evaluate_and_dispatch
+from utils.allocation_utils import allocate_new_rows
+
+_INSERT_COST_DATA = text("""
+INSERT INTO cost_data (
+    integration_id, service_name, resource_id, cost_amount, currency,
+    usage_quantity, usage_unit, billing_period_start, billing_period_end,
+    region, tags, raw_data
+) VALUES (
+    :integration_id, :service_name, :resource_id, :cost_amount, :currency,
+    :usage_quantity, :usage_unit, :billing_period_start, :billing_period_end,
+    :region, CAST(:tags AS jsonb), CAST(:raw_data AS jsonb)
+)
+""")
+
+# Keeps the searchable service name catalog in step with cost_data
+_UPSERT_SERVICE_CATALOG = text("""
+INSERT INTO service_catalog (integration_id, service_name, first_seen, last_seen)
+SELECT CAST(s.integration_id AS uuid), s.service_name, s.first_seen, s.last_seen
+FROM unnest(CAST(:integration_ids AS text[]), CAST(:service_names AS text[]),
+            CAST(:first_seen AS date[]), CAST(:last_seen AS date[]))
+     AS s(integration_id, service_name, first_seen, last_seen)
+ON CONFLICT (integration_id, service_name) DO UPDATE SET
+    first_seen = LEAST(service_catalog.first_seen, EXCLUDED.first_seen),
+    last_seen = GREATEST(service_catalog.last_seen, EXCLUDED.last_seen)
+WHERE service_catalog.first_seen > EXCLUDED.first_seen
+   OR service_catalog.last_seen < EXCLUDED.last_seen
+""")
+
+# One revision per write; every (integration, day) it touched moves to that revision
+_RECORD_REVISIONS = text("""
+INSERT INTO cost_data_revisions (integration_id, day, revision, written_xid)
+SELECT DISTINCT CAST(r.integration_id AS uuid), r.day, (SELECT nextval('cost_data_revision_seq')),
+       pg_current_xact_id()
+FROM unnest(CAST(:integration_ids AS text[]), CAST(:days AS date[])) AS r(integration_id, day)
+ON CONFLICT (integration_id, day) DO UPDATE SET revision = EXCLUDED.revision, written_xid = EXCLUDED.written_xid
+""")
+
+_COST_ROW_DEFAULTS = {
+    "resource_id": None,
+    "currency": "USD",
+    "usage_quantity": None,
+    "usage_unit": None,
+    "region": None,
+    "tags": {},
+    "raw_data": None,
+}
+
+
+def cost_metrics_to_rows(integration_id: str, costs: List[CostMetric],
+                         granularity: str = "DAILY") -> List[Dict[str, Any]]:
+    """Convert provider CostMetric results into cost_data rows"""
+    rows = []
+    for cost in costs:
+        start = datetime.strptime(cost.date[:10], "%Y-%m-%d").date()
+        end = start
+        if granularity.upper() == "MONTHLY":
+            end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+        rows.append({
+            "integration_id": integration_id,
+            "service_name": cost.service,
+            "cost_amount": cost.amount,
+            "currency": cost.currency,
+            "billing_period_start": start,
+            "billing_period_end": end,
+            "raw_data": {"account_id": cost.account_id} if cost.account_id else None,
+        })
+    return rows
+
+
+def record_cost_revisions(db: Session, days: Iterable[Tuple[str, Any]]):
+    """Mark (integration_id, day) pairs as changed; runs in the caller's transaction"""
+    days = sorted({(str(integration_id), str(day)) for integration_id, day in days})
+    if days:
+        db.execute(_RECORD_REVISIONS, {
+            "integration_ids": [integration_id for integration_id, _ in days],
+            "days": [day for _, day in days],
+        })
+
+
+def write_cost_rows(db: Session, rows: List[Dict[str, Any]]) -> List[str]:
+    """Insert cost_data rows with their catalog entries and revisions in the caller's transaction.
+
+    Returns the integrations written to; the caller commits.
+    """
+    params = []
+    for row in rows:
+        values = {**_COST_ROW_DEFAULTS, **row}
+        values["integration_id"] = str(values["integration_id"])
+        values["tags"] = json.dumps(values["tags"] or {})
+        values["raw_data"] = json.dumps(values["raw_data"]) if values["raw_data"] is not None else None
+        params.append(values)
+    if not params:
+        return []
+
+    services: Dict[Any, List[Any]] = {}
+    for values in params:
+        seen = services.setdefault((values["integration_id"], values["service_name"]),
+                                   [values["billing_period_start"], values["billing_period_end"]])
+        seen[0] = min(seen[0], values["billing_period_start"])
+        seen[1] = max(seen[1], values["billing_period_end"])
+
+    db.execute(_INSERT_COST_DATA, params)
+    db.execute(_UPSERT_SERVICE_CATALOG, {
+        "integration_ids": [key[0] for key in services],
+        "service_names": [key[1] for key in services],
+        "first_seen": [str(span[0]) for span in services.values()],
+        "last_seen": [str(span[1]) for span in services.values()],
+    })
+    record_cost_revisions(db, ((values["integration_id"], values["billing_period_start"]) for values in params))
+    return sorted({values["integration_id"] for values in params})
+
+
+def ingest_cost_rows(db: Session, rows: List[Dict[str, Any]], evaluate_alerts: bool = True) -> Dict[str, Any]:
+    """Bulk insert one batch of cost_data rows and evaluate affected alerts"""
+    if not rows:
+        return {"rows_ingested": 0, "integrations": [], "rows_allocated": 0, "alerts_triggered": 0}
+
+    try:
+        changed = write_cost_rows(db, rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Failed to ingest cost data: {str(e)}")
+
+    allocated = allocate_new_rows(db, changed)
+    triggered = evaluate_and_dispatch(db, changed) if evaluate_alerts else []
+
+    return {
+        "rows_ingested": len(rows),
+        "integrations": changed,
+        "rows_allocated": allocated,
+        "alerts_triggered": len(triggered),
+        "ingested_at": datetime.utcnow(),
+    }
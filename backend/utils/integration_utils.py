@@ -0,0 +1,70 @@
+from typing import Dict, Any, List, Optional
+import json
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from utils.aws_utils import AWSCostManager
+from utils.azure_utils import AzureCostManager
+from utils.gcp_utils import GCPCostManager
+
+
+def get_integration(db: Session, integration_id: str) -> Optional[Dict[str, Any]]:
+    """Load a cloud integration row with its stored credentials"""
+    row = db.execute(text("""
+        SELECT id, user_id, provider::text AS provider, name, status::text AS status,
+               credentials, configuration, last_sync_at
+        FROM cloud_integrations
+        WHERE id = CAST(:integration_id AS uuid)
+    """), {"integration_id": str(integration_id)}).first()
+    if row is None:
+        return None
+    integration = dict(row._mapping)
+    integration["id"] = str(integration["id"])
+    integration["user_id"] = str(integration["user_id"])
+    return integration
+
+
+
+def get_integrations(db: Session, integration_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Load many cloud integrations in one query, keyed by id; unknown ids are left out"""
+    rows = db.execute(text("""
+        SELECT id, user_id, provider::text AS provider, name, status::text AS status,
+               credentials, configuration, last_sync_at
+        FROM cloud_integrations
+        WHERE id = ANY(CAST(:integration_ids AS uuid[]))
+    """), {"integration_ids": [str(integration_id) for integration_id in integration_ids]})
+    integrations = {}
+    for row in rows:
+        integration = dict(row._mapping)
+        integration["id"] = str(integration["id"])
+        integration["user_id"] = str(integration["user_id"])
+        integrations[integration["id"]] = integration
+    return integrations
+
+def build_cost_manager(provider: str, credentials: Dict[str, Any]):
+    """Build the provider cost manager for stored integration credentials"""
+    creds = credentials or {}
+    if isinstance(creds, str):
+        creds = json.loads(creds)
+
+    if provider == "aws":
+        return AWSCostManager(
+            role_arn=creds.get("role_arn"),
+            access_key=creds.get("access_key"),
+            secret_key=creds.get("secret_key"),
+            session_token=creds.get("session_token"),
+        )
+    if provider == "azure":
+        return AzureCostManager(
+            tenant_id=creds.get("tenant_id"),
+            client_id=creds.get("client_id"),
+            client_secret=creds.get("client_secret"),
+            subscription_id=creds.get("subscription_id"),
+        )
+    if provider == "gcp":
+        return GCPCostManager(
+            project_id=creds.get("project_id"),
+            service_account_key=creds.get("service_account_key"),
+        )
+    raise Exception(f"Unsupported provider: {provider}")
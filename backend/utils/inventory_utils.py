@@ -0,0 +1,510 @@
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from azure.mgmt.resourcegraph import ResourceGraphClient
+from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from utils.aws_utils import AWSCostManager
+from utils.azure_utils import AzureCostManager
+from utils.gcp_utils import GCPCostManager
+from utils.client_pool import aws_client, azure_client, gcp_service
+
+_AWS_INSTANCE_STATUS = {
+    "pending": "pending",
+    "running": "running",
+    "stopping": "stopped",
+    "stopped": "stopped",
+    "shutting-down": "terminated",
+    "terminated": "terminated",
+}
+_AWS_VOLUME_STATUS = {
+    "creating": "pending",
+    "in-use": "running",
+    "available": "stopped",
+    "deleting": "terminated",
+    "deleted": "terminated",
+    "error": "terminated",
+}
+_AZURE_POWER_STATUS = {
+    "PowerState/running": "running",
+    "PowerState/starting": "pending",
+    "PowerState/stopping": "stopped",
+    "PowerState/stopped": "stopped",
+    "PowerState/deallocating": "stopped",
+    "PowerState/deallocated": "stopped",
+}
+_GCP_INSTANCE_STATUS = {
+    "PROVISIONING": "pending",
+    "STAGING": "pending",
+    "RUNNING": "running",
+    "STOPPING": "stopped",
+    "SUSPENDING": "stopped",
+    "SUSPENDED": "stopped",
+    "TERMINATED": "stopped",
+}
+
+
+def _resource(resource_id: str, resource_type: str, name: Optional[str], status: Optional[str],
+              region: Optional[str], tags: Optional[Dict[str, str]], configuration: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "resource_id": resource_id,
+        "resource_type": resource_type,
+        "resource_name": name,
+        "status": status,
+        "region": region,
+        "tags": tags or {},
+        "configuration": configuration,
+    }
+
+
+def _aws_tags(tags: Optional[List[Dict[str, str]]]) -> Dict[str, str]:
+    return {tag["Key"]: tag["Value"] for tag in tags or []}
+
+
+def _run_bounded(tasks: Dict[str, Callable[[], List[Dict[str, Any]]]],
+                 max_workers: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Run scan tasks with bounded parallelism; collect resources and per-task timing"""
+    resources: List[Dict[str, Any]] = []
+    report: Dict[str, Any] = {}
+    if not tasks:
+        return resources, report
+
+    def timed(task):
+        started = time.perf_counter()
+        return task(), time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+        futures = {pool.submit(timed, task): name for name, task in tasks.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                found, elapsed = future.result()
+                resources.extend(found)
+                report[name] = {"resources": len(found), "seconds": round(elapsed, 3)}
+            except Exception as e:
+                report[name] = {"error": str(e)}
+    return resources, report
+
+
+class AWSResourceCollector:
+    """EC2 instances, EBS volumes and Elastic IPs across all enabled regions"""
+
+    def __init__(self, manager: AWSCostManager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or settings.inventory_max_workers
+
+    def _client(self, region: str):
+        return aws_client(self.manager, "ec2", region, retries={"mode": "adaptive", "max_attempts": 8})
+
+    def regions(self) -> List[str]:
+        response = self._client(settings.aws_region).describe_regions()
+        return sorted(region["RegionName"] for region in response["Regions"])
+
+    def scan_region(self, region: str) -> List[Dict[str, Any]]:
+        ec2 = self._client(region)
+        resources = []
+
+        for page in ec2.get_paginator("describe_instances").paginate(PaginationConfig={"PageSize": 1000}):
+            for reservation in page["Reservations"]:
+                for instance in reservation["Instances"]:
+                    tags = _aws_tags(instance.get("Tags"))
+                    resources.append(_resource(
+                        instance["InstanceId"], "ec2:instance", tags.get("Name"),
+                        _AWS_INSTANCE_STATUS.get(instance["State"]["Name"]), region, tags,
+                        {
+                            "instance_type": instance.get("InstanceType"),
+                            "availability_zone": instance.get("Placement", {}).get("AvailabilityZone"),
+                            "launch_time": instance["LaunchTime"].isoformat() if instance.get("LaunchTime") else None,
+                            "platform": instance.get("PlatformDetails"),
+                            "lifecycle": instance.get("InstanceLifecycle", "on-demand"),
+                            "volume_ids": sorted(
+                                mapping["Ebs"]["VolumeId"]
+                                for mapping in instance.get("BlockDeviceMappings", []) if "Ebs" in mapping
+                            ),
+                        },
+                    ))
+
+        for page in ec2.get_paginator("describe_volumes").paginate(PaginationConfig={"PageSize": 500}):
+            for volume in page["Volumes"]:
+                tags = _aws_tags(volume.get("Tags"))
+                resources.append(_resource(
+                    volume["VolumeId"], "ec2:volume", tags.get("Name"),
+                    _AWS_VOLUME_STATUS.get(volume["State"]), region, tags,
+                    {
+                        "size_gb": volume.get("Size"),
+                        "volume_type": volume.get("VolumeType"),
+                        "iops": volume.get("Iops"),
+                        "availability_zone": volume.get("AvailabilityZone"),
+                        "create_time": volume["CreateTime"].isoformat() if volume.get("CreateTime") else None,
+                        "attached_instance_ids": sorted(a["InstanceId"] for a in volume.get("Attachments", [])),
+                    },
+                ))
+
+        # DescribeAddresses returns every address in one (unpaginated) response
+        for address in ec2.describe_addresses()["Addresses"]:
+            tags = _aws_tags(address.get("Tags"))
+            associated = bool(address.get("AssociationId"))
+            resources.append(_resource(
+                address.get("AllocationId") or address["PublicIp"], "ec2:elastic-ip", tags.get("Name"),
+                "running" if associated else "stopped", region, tags,
+                {
+                    "public_ip": address.get("PublicIp"),
+                    "association_id": address.get("AssociationId"),
+                    "instance_id": address.get("InstanceId"),
+                    "network_interface_id": address.get("NetworkInterfaceId"),
+                },
+            ))
+
+        return resources
+
+    def collect(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        tasks = {region: (lambda r=region: self.scan_region(r)) for region in self.regions()}
+        return _run_bounded(tasks, self.max_workers)
+
+
+class AzureResourceCollector:
+    """Virtual machines, managed disks and public IPs via Azure Resource Graph.
+
+    Resource Graph answers for every region of the subscription at once, so
+    the scan is a handful of paged queries instead of a per-region fan-out.
+    """
+
+    _QUERIES = {
+        "virtual-machines": (
+            "Resources | where type =~ 'microsoft.compute/virtualmachines' "
+            "| project id, name, location, tags, properties"
+        ),
+        "disks": (
+            "Resources | where type =~ 'microsoft.compute/disks' "
+            "| project id, name, location, tags, properties, managedBy, sku"
+        ),
+        "public-ips": (
+            "Resources | where type =~ 'microsoft.network/publicipaddresses' "
+            "| project id, name, location, tags, properties"
+        ),
+    }
+
+    def __init__(self, manager: AzureCostManager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or settings.inventory_max_workers
+
+    def _query(self, query: str) -> List[Dict[str, Any]]:
+        client = azure_client(self.manager, ResourceGraphClient)
+        rows: List[Dict[str, Any]] = []
+        skip_token = None
+        while True:
+            response = client.resources(QueryRequest(
+                query=query,
+                subscriptions=[self.manager.subscription_id],
+                options=QueryRequestOptions(top=1000, skip_token=skip_token, result_format="objectArray"),
+            ))
+            rows.extend(response.data or [])
+            skip_token = response.skip_token
+            if not skip_token:
+                return rows
+
+    def _virtual_machines(self) -> List[Dict[str, Any]]:
+        resources = []
+        for row in self._query(self._QUERIES["virtual-machines"]):
+            props = row.get("properties") or {}
+            power = ((props.get("extended") or {}).get("instanceView") or {}).get("powerState") or {}
+            resources.append(_resource(
+                row["id"].lower(), "azure:virtual-machine", row.get("name"),
+                _AZURE_POWER_STATUS.get(power.get("code"), "pending"), row.get("location"), row.get("tags"),
+                {
+                    "vm_size": (props.get("hardwareProfile") or {}).get("vmSize"),
+                    "os_type": ((props.get("storageProfile") or {}).get("osDisk") or {}).get("osType"),
+                    "provisioning_state": props.get("provisioningState"),
+                },
+            ))
+        return resources
+
+    def _disks(self) -> List[Dict[str, Any]]:
+        resources = []
+        for row in self._query(self._QUERIES["disks"]):
+            props = row.get("properties") or {}
+            state = props.get("diskState")
+            resources.append(_resource(
+                row["id"].lower(), "azure:disk", row.get("name"),
+                "stopped" if state == "Unattached" else "running", row.get("location"), row.get("tags"),
+                {
+                    "size_gb": props.get("diskSizeGB"),
+                    "disk_state": state,
+                    "sku": (row.get("sku") or {}).get("name"),
+                    "managed_by": (row.get("managedBy") or "").lower() or None,
+                    "time_created": props.get("timeCreated"),
+                },
+            ))
+        return resources
+
+    def _public_ips(self) -> List[Dict[str, Any]]:
+        resources = []
+        for row in self._query(self._QUERIES["public-ips"]):
+            props = row.get("properties") or {}
+            associated = bool(props.get("ipConfiguration"))
+            resources.append(_resource(
+                row["id"].lower(), "azure:public-ip", row.get("name"),
+                "running" if associated else "stopped", row.get("location"), row.get("tags"),
+                {
+                    "ip_address": props.get("ipAddress"),
+                    "allocation_method": props.get("publicIPAllocationMethod"),
+                    "ip_configuration_id": ((props.get("ipConfiguration") or {}).get("id") or "").lower() or None,
+                },
+            ))
+        return resources
+
+    def collect(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        if not self.manager.subscription_id:
+            raise Exception("Subscription ID is required")
+        return _run_bounded({
+            "virtual-machines": self._virtual_machines,
+            "disks": self._disks,
+            "public-ips": self._public_ips,
+        }, self.max_workers)
+
+
+class GCPResourceCollector:
+    """Compute Engine instances, persistent disks and static addresses.
+
+    ``aggregatedList`` covers every zone or region in one paged call per
+    resource type; the three types are listed concurrently.
+    """
+
+    def __init__(self, manager: GCPCostManager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or settings.inventory_max_workers
+
+    def _aggregated(self, collection_name: str, items_key: str):
+        # Discovery clients share an httplib2 connection, so each thread gets its own
+        compute = gcp_service(self.manager, "compute", "v1")
+        collection = getattr(compute, collection_name)()
+        request = collection.aggregatedList(project=self.manager.project_id, maxResults=500)
+        while request is not None:
+            response = request.execute()
+            for scope, scoped in (response.get("items") or {}).items():
+                location = scope.split("/", 1)[-1]
+                for item in scoped.get(items_key, []):
+                    yield location, item
+            request = collection.aggregatedList_next(request, response)
+
+    def _instances(self) -> List[Dict[str, Any]]:
+        return [
+            _resource(
+                item["id"], "gce:instance", item.get("name"), _GCP_INSTANCE_STATUS.get(item.get("status")),
+                zone, item.get("labels"),
+                {
+                    "machine_type": item.get("machineType", "").rsplit("/", 1)[-1],
+                    "zone": zone,
+                    "creation_timestamp": item.get("creationTimestamp"),
+                    "disk_names": sorted(d.get("source", "").rsplit("/", 1)[-1] for d in item.get("disks", [])),
+                },
+            )
+            for zone, item in self._aggregated("instances", "instances")
+        ]
+
+    def _disks(self) -> List[Dict[str, Any]]:
+        return [
+            _resource(
+                item["id"], "gce:disk", item.get("name"),
+                "running" if item.get("users") else ("pending" if item.get("status") == "CREATING" else "stopped"),
+                zone, item.get("labels"),
+                {
+                    "size_gb": int(item.get("sizeGb", 0)),
+                    "disk_type": item.get("type", "").rsplit("/", 1)[-1],
+                    "users": sorted(u.rsplit("/", 1)[-1] for u in item.get("users", [])),
+                    "last_attach_timestamp": item.get("lastAttachTimestamp"),
+                    "last_detach_timestamp": item.get("lastDetachTimestamp"),
+                },
+            )
+            for zone, item in self._aggregated("disks", "disks")
+        ]
+
+    def _addresses(self) -> List[Dict[str, Any]]:
+        return [
+            _resource(
+                item["id"], "gce:address", item.get("name"),
+                "running" if item.get("status") == "IN_USE" else "stopped", region, item.get("labels"),
+                {
+                    "address": item.get("address"),
+                    "address_type": item.get("addressType"),
+                    "users": sorted(u.rsplit("/", 1)[-1] for u in item.get("users", [])),
+                },
+            )
+            for region, item in self._aggregated("addresses", "addresses")
+        ]
+
+    def collect(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        if not self.manager.project_id:
+            raise Exception("Project ID is required")
+        return _run_bounded({
+            "instances": self._instances,
+            "disks": self._disks,
+            "addresses": self._addresses,
+        }, self.max_workers)
+
+
+def build_collector(provider: str, manager):
+    collectors = {"aws": AWSResourceCollector, "azure": AzureResourceCollector, "gcp": GCPResourceCollector}
+    if provider not in collectors:
+        raise Exception(f"Unsupported provider: {provider}")
+    return collectors[provider](manager)
+
+
+def content_hash(resource: Dict[str, Any]) -> str:
+    """Hash of the collected fields, used to skip rows that did not change"""
+    payload = json.dumps(
+        {key: resource[key] for key in
+         ("resource_type", "resource_name", "status", "region", "tags", "configuration")},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_UPSERT_RESOURCES = text("""
+INSERT INTO resources (
+    integration_id, resource_id, resource_type, resource_name, status,
+    region, tags, configuration, content_hash, last_seen_at
+)
+SELECT
+    CAST(:integration_id AS uuid), r.resource_id, r.resource_type, r.resource_name,
+    CAST(r.status AS resource_status), r.region, CAST(r.tags AS jsonb),
+    CAST(r.configuration AS jsonb), r.content_hash, CURRENT_TIMESTAMP
+FROM unnest(
+    CAST(:resource_ids AS text[]), CAST(:resource_types AS text[]), CAST(:resource_names AS text[]),
+    CAST(:statuses AS text[]), CAST(:regions AS text[]), CAST(:tags AS text[]),
+    CAST(:configurations AS text[]), CAST(:content_hashes AS text[])
+) AS r(resource_id, resource_type, resource_name, status, region, tags, configuration, content_hash)
+ON CONFLICT (integration_id, resource_id) DO UPDATE SET
+    resource_type = EXCLUDED.resource_type,
+    resource_name = EXCLUDED.resource_name,
+    status = EXCLUDED.status,
+    status_changed_at = CASE WHEN resources.status IS DISTINCT FROM EXCLUDED.status
+                             THEN CURRENT_TIMESTAMP ELSE resources.status_changed_at END,
+    region = EXCLUDED.region,
+    tags = EXCLUDED.tags,
+    configuration = EXCLUDED.configuration,
+    content_hash = EXCLUDED.content_hash,
+    last_seen_at = EXCLUDED.last_seen_at
+WHERE resources.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+""")
+
+
+def upsert_resources(db: Session, integration_id: str, resources: List[Dict[str, Any]],
+                     mark_missing: bool = True) -> Dict[str, int]:
+    """Write new or changed resources; untouched rows are not rewritten"""
+    existing = {
+        row[0]: (row[1], row[2])
+        for row in db.execute(text("""
+            SELECT resource_id, content_hash, status::text
+            FROM resources WHERE integration_id = CAST(:integration_id AS uuid)
+        """), {"integration_id": integration_id})
+    }
+
+    seen = set()
+    changed = []
+    for resource in resources:
+        if resource["resource_id"] in seen:
+            continue
+        seen.add(resource["resource_id"])
+        digest = content_hash(resource)
+        if existing.get(resource["resource_id"], (None, None))[0] != digest:
+            changed.append((resource, digest))
+
+    missing = [
+        resource_id for resource_id, (_, status) in existing.items()
+        if resource_id not in seen and status != "terminated"
+    ] if mark_missing else []
+
+    try:
+        batch_size = settings.inventory_batch_size
+        for offset in range(0, len(changed), batch_size):
+            batch = changed[offset:offset + batch_size]
+            db.execute(_UPSERT_RESOURCES, {
+                "integration_id": integration_id,
+                "resource_ids": [r["resource_id"] for r, _ in batch],
+                "resource_types": [r["resource_type"] for r, _ in batch],
+                "resource_names": [r["resource_name"] for r, _ in batch],
+                "statuses": [r["status"] for r, _ in batch],
+                "regions": [r["region"] for r, _ in batch],
+                "tags": [json.dumps(r["tags"], sort_keys=True) for r, _ in batch],
+                "configurations": [json.dumps(r["configuration"], sort_keys=True, default=str) for r, _ in batch],
+                "content_hashes": [digest for _, digest in batch],
+            })
+        if missing:
+            # Gone from the provider: keep the row for history, mark it terminated
+            db.execute(text("""
+                UPDATE resources
+                SET status = 'terminated', content_hash = NULL, status_changed_at = CURRENT_TIMESTAMP
+                WHERE integration_id = CAST(:integration_id AS uuid)
+                  AND resource_id = ANY(CAST(:resource_ids AS text[]))
+            """), {"integration_id": integration_id, "resource_ids": missing})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Failed to store resources: {str(e)}")
+
+    return {
+        "scanned": len(seen),
+        "inserted": sum(1 for r, _ in changed if r["resource_id"] not in existing),
+        "updated": sum(1 for r, _ in changed if r["resource_id"] in existing),
+        "unchanged": len(seen) - len(changed),
+        "terminated": len(missing),
+    }
+
+
+def sync_resources(db: Session, integration: Dict[str, Any], manager) -> Dict[str, Any]:
+    """Scan an integration's resources and record the run in sync_logs"""
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    log_id = db.execute(text("""
+        INSERT INTO sync_logs (integration_id, sync_type, status)
+        VALUES (CAST(:integration_id AS uuid), 'resources', 'in_progress')
+        RETURNING id
+    """), {"integration_id": integration["id"]}).scalar()
+    db.commit()
+
+    try:
+        resources, scan_report = build_collector(integration["provider"], manager).collect()
+        scan_seconds = time.perf_counter() - started
+        # A failed scope means we did not see everything; don't terminate what we missed
+        complete = not any("error" in part for part in scan_report.values())
+        counts = upsert_resources(db, integration["id"], resources, mark_missing=complete)
+        status, error = "success", None
+    except Exception as e:
+        scan_report, counts, scan_seconds = {}, {}, time.perf_counter() - started
+        status, error = "error", str(e)
+
+    duration = time.perf_counter() - started
+    db.execute(text("""
+        UPDATE sync_logs
+        SET status = :status, records_processed = :records, error_message = :error,
+            completed_at = CURRENT_TIMESTAMP, duration_seconds = :duration
+        WHERE id = :log_id
+    """), {
+        "status": status,
+        "records": counts.get("scanned", 0),
+        "error": error,
+        "duration": int(round(duration)),
+        "log_id": log_id,
+    })
+    db.commit()
+
+    if error:
+        raise Exception(f"Resource sync failed: {error}")
+
+    return {
+        "integration_id": integration["id"],
+        "provider": integration["provider"],
+        "started_at": started_at,
+        "scan_seconds": round(scan_seconds, 3),
+        "total_seconds": round(duration, 3),
+        **counts,
+        "scopes": scan_report,
+    }
@@ -0,0 +1,394 @@
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from utils.fx_utils import fx_rates
+
+# Canonical field -> candidate snapshot column names
+_FIELDS = {
+    "timestamp": ["timestamp", "hour", "time"],
+    "cluster": ["cluster", "cluster_name"],
+    "node": ["node", "node_name"],
+    "instance_id": ["instance_id", "provider_id"],
+    "namespace": ["namespace"],
+    "pod": ["pod", "pod_name"],
+    "cpu_request": ["cpu_request", "cpu_request_cores"],
+    "cpu_usage": ["cpu_usage", "cpu_usage_cores"],
+    "memory_request": ["memory_request", "memory_request_bytes"],
+    "memory_usage": ["memory_usage", "memory_usage_bytes"],
+    "node_cpu_capacity": ["node_cpu_capacity", "node_cpu_allocatable"],
+    "node_memory_capacity": ["node_memory_capacity", "node_memory_allocatable"],
+    "node_hourly_cost": ["node_hourly_cost"],
+}
+_REQUIRED = ("timestamp", "node", "namespace", "cpu_request", "memory_request")
+_NUMERIC = ("cpu_request", "cpu_usage", "memory_request", "memory_usage",
+            "node_cpu_capacity", "node_memory_capacity", "node_hourly_cost")
+# Pod labels arrive flattened as label_<key> columns, as kube-state-metrics exports them
+LABEL_PREFIX = "label_"
+_DATA_SUFFIXES = (".csv", ".csv.gz", ".parquet", ".snappy.parquet")
+
+IDLE = "__idle__"
+
+
+def _resolve_columns(names: List[str]) -> Dict[str, str]:
+    available = set(names)
+    columns = {}
+    for field, candidates in _FIELDS.items():
+        for candidate in candidates:
+            if candidate in available:
+                columns[field] = candidate
+                break
+    missing = set(_REQUIRED) - set(columns)
+    if missing:
+        raise ValueError(f"Pod snapshots are missing required columns: {', '.join(sorted(missing))}")
+    return columns
+
+
+def _read_file(path: Path) -> pa.Table:
+    if path.name.endswith(".parquet"):
+        return pq.read_table(path, memory_map=True)
+    return pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+        column_types={name: pa.float64() for field in _NUMERIC for name in _FIELDS[field]},
+        strings_can_be_null=True,
+    ))
+
+
+def read_snapshots(path: Path) -> pa.Table:
+    """Pod usage snapshots from a CSV/Parquet file or every such file under a directory"""
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file() and p.name.endswith(_DATA_SUFFIXES))
+    elif path.is_file():
+        files = [path]
+    else:
+        raise ValueError(f"Snapshot path '{path}' does not exist")
+    if not files:
+        raise ValueError(f"No snapshot files under '{path}'")
+    return pa.concat_tables([_read_file(p) for p in files], promote_options="permissive")
+
+
+def resolve_snapshot_path(relative: Optional[str]) -> Path:
+    """Resolve a path under the configured snapshot root, refusing anything outside it"""
+    root = Path(settings.k8s_snapshot_root).resolve()
+    path = (root / (relative or "")).resolve()
+    if path != root and root not in path.parents:
+        raise ValueError("Snapshot path must be inside the configured snapshot root")
+    return path
+
+
+def standin_snapshots(pods: int, day: date, hours: int = 24, nodes: Optional[int] = None,
+                      namespaces: int = 200, cluster: str = "standin", seed: int = 0) -> pa.Table:
+    """Hourly pod snapshots from a local metrics stand-in, shaped like a real export.
+
+    Used when no metrics pipeline is available (development, benchmarks):
+    ``pods`` pods are spread over ``nodes`` 16-core/64 GiB nodes, each with a
+    request size, a usage ratio and ``app`` and ``team`` labels.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = nodes or max(pods // 30, 1)
+    rows = pods * hours
+
+    pod = np.tile(np.arange(pods), hours)
+    hour = np.repeat(np.arange(hours), pods)
+    pod_node = rng.integers(0, nodes, pods)
+    pod_namespace = rng.integers(0, namespaces, pods)
+    cpu_request = rng.choice([0.1, 0.25, 0.5, 1.0, 2.0], pods)
+    memory_request = rng.choice([0.25, 0.5, 1.0, 2.0, 4.0], pods) * 2 ** 30
+    usage = rng.uniform(0.1, 1.5, rows)
+
+    def labels(codes: np.ndarray, names: List[str]) -> pa.DictionaryArray:
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(names))
+
+    start = np.datetime64(day.isoformat(), "s")
+    return pa.table({
+        "timestamp": pa.array(start + hour.astype("timedelta64[h]")),
+        "cluster": labels(np.zeros(rows, dtype=np.int32), [cluster]),
+        "node": labels(pod_node[pod], [f"node-{i}" for i in range(nodes)]),
+        "instance_id": labels(pod_node[pod], [f"i-{i:017x}" for i in range(nodes)]),
+        "namespace": labels(pod_namespace[pod], [f"ns-{i}" for i in range(namespaces)]),
+        "pod": labels(pod, [f"pod-{i}" for i in range(pods)]),
+        "cpu_request": cpu_request[pod],
+        "cpu_usage": cpu_request[pod] * usage,
+        "memory_request": memory_request[pod],
+        "memory_usage": memory_request[pod] * np.minimum(usage, 1.0),
+        "node_cpu_capacity": np.full(rows, 16.0),
+        "node_memory_capacity": np.full(rows, 64.0 * 2 ** 30),
+        "node_hourly_cost": np.full(rows, 0.768),
+        "label_app": labels(pod // 10, [f"app-{i}" for i in range(pods // 10 + 1)]),
+        "label_team": labels(pod_namespace[pod] % 20, [f"team-{i}" for i in range(20)]),
+    })
+
+
+def _codes(column: pa.ChunkedArray) -> Tuple[np.ndarray, List[str]]:
+    """Integer codes and distinct values of a string column (hash-based, no sort)"""
+    array = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if pa.types.is_dictionary(array.type):
+        array = array.dictionary_decode()
+    encoded = pc.fill_null(pc.cast(array, pa.string()), "").dictionary_encode()
+    return encoded.indices.to_numpy(zero_copy_only=False).astype(np.int64), encoded.dictionary.to_pylist()
+
+
+def _numbers(table: pa.Table, columns: Dict[str, str], field: str, default: float = 0.0) -> np.ndarray:
+    if field not in columns:
+        return np.full(table.num_rows, default)
+    values = pc.fill_null(pc.cast(table.column(columns[field]), pa.float64()), default)
+    return values.to_numpy()
+
+
+def _hours(column: pa.ChunkedArray) -> np.ndarray:
+    """Hours since the epoch (UTC) of timestamps, ISO strings or epoch seconds"""
+    array = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if pa.types.is_timestamp(array.type):
+        seconds = pc.cast(pc.cast(array, pa.timestamp("s", tz=array.type.tz)), pa.int64())
+        return seconds.to_numpy(zero_copy_only=False) // 3600
+    if pa.types.is_integer(array.type) or pa.types.is_floating(array.type):
+        return pc.cast(array, pa.int64()).to_numpy(zero_copy_only=False) // 3600
+    text_values = pc.cast(array, pa.string())
+    days = pc.cast(pc.cast(pc.utf8_slice_codeunits(text_values, 0, 10), pa.date32()), pa.int32())
+    hour = pc.cast(pc.utf8_slice_codeunits(text_values, 11, 13), pa.int64())
+    return days.to_numpy(zero_copy_only=False).astype(np.int64) * 24 + hour.to_numpy(zero_copy_only=False)
+
+
+def _instance_id(value: str) -> str:
+    """Cloud resource id of a node: the last segment of a providerID like aws:///us-east-1a/i-0abc"""
+    return value.rstrip("/").rsplit("/", 1)[-1]
+
+
+def node_day_costs(db: Session, integration_id: str, instance_ids: List[str],
+                   start_day: date, end_day: date, currency: str) -> Dict[Tuple[str, str], float]:
+    """Daily cost per node instance from cost_data, converted to ``currency``"""
+    rows = db.execute(text("""
+        SELECT resource_id, billing_period_start::text, COALESCE(currency, 'USD'), SUM(cost_amount)::float8
+        FROM cost_data
+        WHERE integration_id = CAST(:integration_id AS uuid)
+          AND resource_id = ANY(CAST(:instance_ids AS text[]))
+          AND billing_period_start >= :start_date
+          AND billing_period_start < :end_date
+        GROUP BY 1, 2, 3
+    """), {"integration_id": integration_id, "instance_ids": instance_ids,
+           "start_date": start_day, "end_date": end_day}).all()
+    if not rows:
+        return {}
+    amounts = np.array([row[3] for row in rows], dtype=np.float64)
+    currencies = np.array([row[2].upper() for row in rows], dtype=str)
+    days = np.array([row[1] for row in rows], dtype="datetime64[D]")
+    if not (currencies == currency.upper()).all():
+        amounts = fx_rates.table().convert(amounts, currencies, days, currency)
+    costs: Dict[Tuple[str, str], float] = {}
+    for row, amount in zip(rows, amounts.tolist()):
+        costs[(row[0], row[1])] = costs.get((row[0], row[1]), 0.0) + amount
+    return costs
+
+
+def _share(cost: np.ndarray, weight: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, cost * weight / denominator, 0.0)
+
+
+def allocate(snapshots: pa.Table, day_costs: Optional[Dict[Tuple[str, str], float]] = None,
+             cpu_share: Optional[float] = None) -> Tuple[pa.Table, Dict[str, Any]]:
+    """Split node costs across pods by max(request, usage) of CPU and memory, for every node-hour at once.
+
+    A node's daily cost (``day_costs`` keyed by instance id and day) is spread
+    evenly over the hours it was observed that day; nodes without one fall
+    back to a ``node_hourly_cost`` column. Each node-hour's cost is split
+    ``cpu_share`` to CPU and the rest to memory, and each resource is divided
+    in proportion to the pods' max(request, usage). Capacity no pod claims is
+    reported as the ``__idle__`` namespace. Returns per-day rollups by
+    namespace and by every ``label_*`` column, plus a report.
+    """
+    started = time.perf_counter()
+    cpu_share = settings.k8s_cpu_cost_share if cpu_share is None else cpu_share
+    day_costs = day_costs or {}
+    columns = _resolve_columns(snapshots.column_names)
+    if snapshots.num_rows == 0:
+        raise ValueError("No pod snapshots to allocate")
+
+    hours = _hours(snapshots.column(columns["timestamp"]))
+    node, node_names = _codes(snapshots.column(columns["node"]))
+    cpu = np.maximum(_numbers(snapshots, columns, "cpu_request"), _numbers(snapshots, columns, "cpu_usage"))
+    memory = np.maximum(_numbers(snapshots, columns, "memory_request"), _numbers(snapshots, columns, "memory_usage"))
+
+    # Node-hours: one group per (node, hour)
+    first_hour = int(hours.min())
+    hour_offset = hours - first_hour
+    node_hour, group = np.unique(node * (int(hour_offset.max()) + 1) + hour_offset, return_inverse=True)
+    group = group.ravel()
+    groups = len(node_hour)
+    group_node = node_hour // (int(hour_offset.max()) + 1)
+    group_day = (node_hour % (int(hour_offset.max()) + 1) + first_hour) // 24
+
+    cpu_claimed = np.bincount(group, weights=cpu, minlength=groups)
+    memory_claimed = np.bincount(group, weights=memory, minlength=groups)
+    cpu_capacity = np.zeros(groups)
+    cpu_capacity[group] = _numbers(snapshots, columns, "node_cpu_capacity")
+    memory_capacity = np.zeros(groups)
+    memory_capacity[group] = _numbers(snapshots, columns, "node_memory_capacity")
+    cpu_total = np.maximum(cpu_claimed, cpu_capacity)
+    memory_total = np.maximum(memory_claimed, memory_capacity)
+
+    # Node-hour cost: the node's day cost over the hours it was seen that day
+    if "instance_id" in columns:
+        instance, instance_names = _codes(snapshots.column(columns["instance_id"]))
+        node_instance = np.zeros(len(node_names), dtype=np.int64)
+        node_instance[node] = instance
+        instance_of_node = [_instance_id(instance_names[i]) or node_names[n] for n, i in enumerate(node_instance)]
+    else:
+        instance_of_node = list(node_names)
+    node_day, node_day_group = np.unique(group_node * 100000 + group_day, return_inverse=True)
+    node_day_group = node_day_group.ravel()
+    hours_seen = np.bincount(node_day_group, minlength=len(node_day))
+    day_cost = np.array([
+        day_costs.get((instance_of_node[key // 100000], str(np.datetime64(int(key % 100000), "D"))), np.nan)
+        for key in node_day.tolist()
+    ], dtype=np.float64)
+    hour_cost = day_cost[node_day_group] / hours_seen[node_day_group]
+    fallback = np.zeros(groups)
+    fallback[group] = _numbers(snapshots, columns, "node_hourly_cost", np.nan)
+    priced_from_cost_data = ~np.isnan(hour_cost)
+    hour_cost = np.where(priced_from_cost_data, hour_cost, fallback)
+    unpriced = np.isnan(hour_cost)
+    hour_cost = np.where(unpriced, 0.0, hour_cost)
+
+    group_cpu_cost = hour_cost * cpu_share
+    group_memory_cost = hour_cost * (1 - cpu_share)
+    pod_cpu_cost = _share(group_cpu_cost[group], cpu, cpu_total[group])
+    pod_memory_cost = _share(group_memory_cost[group], memory, memory_total[group])
+    idle_cpu = group_cpu_cost - _share(group_cpu_cost, cpu_claimed, cpu_total)
+    idle_memory = group_memory_cost - _share(group_memory_cost, memory_claimed, memory_total)
+    allocated_at = time.perf_counter()
+
+    day = pa.array((hours // 24).astype(np.int32), pa.int32()).cast(pa.date32())
+    cluster = snapshots.column(columns["cluster"]) if "cluster" in columns else pa.array([""] * snapshots.num_rows)
+    base = {
+        "day": day,
+        "cluster": pc.fill_null(pc.cast(cluster, pa.string()), ""),
+        "cpu_cost": pod_cpu_cost,
+        "memory_cost": pod_memory_cost,
+        "pod_hours": np.ones(snapshots.num_rows),
+    }
+    dimensions = {"namespace": columns["namespace"]}
+    dimensions.update({
+        f"label:{name[len(LABEL_PREFIX):]}": name
+        for name in snapshots.column_names if name.startswith(LABEL_PREFIX)
+    })
+    rollups = []
+    for dimension, column in dimensions.items():
+        values = pc.cast(snapshots.column(column), pa.string())
+        table = pa.table({**base, "value": values}).filter(pc.is_valid(values))
+        rollups.append(_rollup(table, dimension))
+
+    # Capacity no pod claimed, as an extra namespace
+    group_clusters = np.zeros(groups, dtype=np.int64)
+    cluster_codes, cluster_names = _codes(base["cluster"])
+    group_clusters[group] = cluster_codes
+    priced = ~unpriced
+    idle = pa.table({
+        "day": pa.array(group_day[priced].astype(np.int32), pa.int32()).cast(pa.date32()),
+        "cluster": pa.DictionaryArray.from_arrays(
+            pa.array(group_clusters[priced], pa.int32()), pa.array(cluster_names, pa.string())
+        ).cast(pa.string()),
+        "cpu_cost": idle_cpu[priced],
+        "memory_cost": idle_memory[priced],
+        "pod_hours": np.zeros(int(priced.sum())),
+        "value": pa.array([IDLE] * int(priced.sum()), pa.string()),
+    })
+    rollups.append(_rollup(idle, "namespace"))
+    result = pa.concat_tables(rollups)
+
+    total_cost = float(hour_cost.sum())
+    return result, {
+        "snapshot_rows": snapshots.num_rows,
+        "nodes": len(node_names),
+        "node_hours": groups,
+        "node_hours_priced_from_cost_data": int(priced_from_cost_data.sum()),
+        "node_hours_unpriced": int(unpriced.sum()),
+        "days": sorted({str(d) for d in np.unique(group_day).astype("datetime64[D]")}),
+        "total_cost": total_cost,
+        "allocated_cost": float(pod_cpu_cost.sum() + pod_memory_cost.sum()),
+        "idle_cost": float(idle_cpu.sum() + idle_memory.sum()),
+        "rollup_rows": result.num_rows,
+        "allocate_seconds": round(allocated_at - started, 3),
+        "rollup_seconds": round(time.perf_counter() - allocated_at, 3),
+    }
+
+
+def _rollup(table: pa.Table, dimension: str) -> pa.Table:
+    grouped = table.group_by(["day", "cluster", "value"]).aggregate(
+        [("cpu_cost", "sum"), ("memory_cost", "sum"), ("pod_hours", "sum")]
+    )
+    grouped = grouped.rename_columns(
+        [{"cpu_cost_sum": "cpu_cost", "memory_cost_sum": "memory_cost", "pod_hours_sum": "pod_hours"}.get(n, n)
+         for n in grouped.column_names]
+    )
+    return grouped.append_column("dimension", pa.array([dimension] * grouped.num_rows, pa.string())).select(
+        ["day", "cluster", "dimension", "value", "cpu_cost", "memory_cost", "pod_hours"]
+    )
+
+
+def store_rollups(db: Session, integration_id: str, rollups: pa.Table, currency: str) -> int:
+    """Replace the stored rollups of every (cluster, day) present in ``rollups``"""
+    clusters = rollups.column("cluster").to_pylist()
+    days = rollups.column("day").to_pylist()
+    try:
+        db.execute(text("""
+            DELETE FROM k8s_cost_allocations a
+            USING unnest(CAST(:clusters AS text[]), CAST(:days AS date[])) AS r(cluster, day)
+            WHERE a.integration_id = CAST(:integration_id AS uuid) AND a.cluster = r.cluster AND a.day = r.day
+        """), {"integration_id": integration_id,
+               "clusters": [c for c, _ in sorted(set(zip(clusters, days)))],
+               "days": [d for _, d in sorted(set(zip(clusters, days)))]})
+        for batch in rollups.to_batches(max_chunksize=settings.k8s_insert_batch_size):
+            columns = batch.to_pydict()
+            db.execute(text("""
+                INSERT INTO k8s_cost_allocations (integration_id, day, cluster, dimension, value,
+                                                  cpu_cost, memory_cost, pod_hours, currency)
+                SELECT CAST(:integration_id AS uuid), r.day, r.cluster, r.dimension, r.value,
+                       r.cpu_cost, r.memory_cost, r.pod_hours, :currency
+                FROM unnest(CAST(:days AS date[]), CAST(:clusters AS text[]), CAST(:dimensions AS text[]),
+                            CAST(:values AS text[]), CAST(:cpu_costs AS float8[]),
+                            CAST(:memory_costs AS float8[]), CAST(:pod_hours AS float8[]))
+                     AS r(day, cluster, dimension, value, cpu_cost, memory_cost, pod_hours)
+            """), {"integration_id": integration_id, "currency": currency,
+                   "days": columns["day"], "clusters": columns["cluster"], "dimensions": columns["dimension"],
+                   "values": columns["value"], "cpu_costs": columns["cpu_cost"],
+                   "memory_costs": columns["memory_cost"], "pod_hours": columns["pod_hours"]})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Failed to store Kubernetes allocations: {str(e)}")
+    return rollups.num_rows
+
+
+def allocate_k8s(db: Session, integration_id: str, snapshots: pa.Table,
+                 currency: Optional[str] = None) -> Dict[str, Any]:
+    """Allocate node costs from cost_data to the pods in ``snapshots`` and store the rollups"""
+    started = time.perf_counter()
+    currency = fx_rates.check(currency or settings.reporting_currency)
+    columns = _resolve_columns(snapshots.column_names)
+    hours = _hours(snapshots.column(columns["timestamp"]))
+    start_day = date(1970, 1, 1) + timedelta(days=int(hours.min()) // 24)
+    end_day = date(1970, 1, 1) + timedelta(days=int(hours.max()) // 24 + 1)
+
+    id_column = columns.get("instance_id", columns["node"])
+    _, ids = _codes(snapshots.column(id_column))
+    instance_ids = sorted({_instance_id(value) for value in ids if value})
+    day_costs = node_day_costs(db, integration_id, instance_ids, start_day, end_day, currency)
+
+    rollups, report = allocate(snapshots, day_costs)
+    report["rows_written"] = store_rollups(db, integration_id, rollups, currency)
+    report.update(
+        integration_id=integration_id,
+        currency=currency,
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+    )
+    return report
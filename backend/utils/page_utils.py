@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import json
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from config import settings
+from models.schemas import CostMetric
+from utils.delta_utils import delta_tracker, series_key
+from utils.groupby_utils import Row, groupby_planner
+from utils.trace_utils import span, traced
+
+COST_FIELDS = tuple(CostMetric.model_fields)
+
+# Sort key: (date, service label, dimension values); values break ties between labels that collide
+PageKey = Tuple[str, str, Tuple[str, ...]]
+
+
+class PageRequestError(Exception):
+    """Malformed or foreign page cursor, or an unknown field"""
+
+
+class PageRow(NamedTuple):
+    """A cost row in page order; has the attributes DeltaTracker digests"""
+    date: Optional[str]
+    service: str
+    values: Tuple[str, ...]
+    amount: float
+    unit: str
+
+
+def _page_key(row: PageRow) -> PageKey:
+    return (row.date or "", row.service, row.values)
+
+
+def _series_tag(series: str) -> str:
+    return hashlib.sha1(series.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(series: str, row: PageRow) -> str:
+    date, service, values = _page_key(row)
+    payload = json.dumps([_series_tag(series), date, service, list(values)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(series: str, cursor: str) -> PageKey:
+    """Key of the last row of the previous page; the cursor must come from the same query"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tag, date, service, values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = (str(date), str(service), tuple(str(v) for v in values))
+    except Exception:
+        raise PageRequestError("Malformed cursor")
+    if tag != _series_tag(series):
+        raise PageRequestError("Cursor belongs to a different query")
+    return key
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Requested CostMetric fields in model order; all of them when ``fields`` is empty"""
+    if not fields:
+        return COST_FIELDS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested.difference(COST_FIELDS)
+    if unknown:
+        raise PageRequestError(f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(COST_FIELDS)}")
+    return tuple(f for f in COST_FIELDS if f in requested)
+
+
+def page_rows(rows: List[Row], order: List[int]) -> List[PageRow]:
+    """Planner rows with values in requested order, sorted into page order"""
+    result = []
+    for day, values, amount, unit in rows:
+        ordered = tuple(values[i] for i in order)
+        result.append(PageRow(day, "|".join(v or "Unknown" for v in ordered), ordered, amount, unit))
+    result.sort(key=_page_key)
+    return result
+
+
+class PageIndex:
+    """Sorted rows of recently paged cost series, one version each.
+
+    Built once per data version of a series, so every further page is a
+    binary search and a slice rather than a rebuild and sort of the whole
+    result. Bounded by series and by total rows, evicting the least recently
+    paged; a series larger than the row budget is never kept.
+    """
+
+    def __init__(self, max_series: Optional[int] = None, max_rows: Optional[int] = None):
+        self.max_series = max_series or settings.cost_page_index_entries
+        self.max_rows = max_rows or settings.cost_page_index_max_rows
+        self._lock = threading.Lock()
+        self._series: "OrderedDict[str, Tuple[int, List[PageRow]]]" = OrderedDict()
+        self.total_rows = 0
+        self.hits = 0
+        self.builds = 0
+
+    def rows(self, series: str, version: int, build: Callable[[], List[PageRow]]) -> List[PageRow]:
+        with self._lock:
+            current = self._series.get(series)
+            if current is not None and current[0] == version:
+                self._series.move_to_end(series)
+                self.hits += 1
+                return current[1]
+
+        with span("page.build_index", series=series):
+            rows = build()
+        with self._lock:
+            self.builds += 1
+            replaced = self._series.pop(series, None)
+            if replaced is not None:
+                self.total_rows -= len(replaced[1])
+            if len(rows) > self.max_rows:
+                return rows
+            self._series[series] = (version, rows)
+            self.total_rows += len(rows)
+            while len(self._series) > self.max_series or self.total_rows > self.max_rows:
+                _, (_, evicted) = self._series.popitem(last=False)
+                self.total_rows -= len(evicted)
+        return rows
+
+
+page_index = PageIndex()
+
+
+def project(rows: List[PageRow], dimensions: List[str], fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """Page rows as CostMetric dictionaries limited to ``fields``"""
+    items = []
+    for row in rows:
+        item = {
+            "service": row.service,
+            "amount": row.amount,
+            "unit": row.unit,
+            "currency": row.unit,
+            "date": row.date,
+            "account_id": None,
+            "dimensions": dict(zip(dimensions, row.values)),
+        }
+        items.append(item if fields == COST_FIELDS else {f: item[f] for f in fields})
+    return items
+
+
+@traced("page.cost_page")
+def cost_page(manager, start_date: str, end_date: str, granularity: str,
+              group_by: List[str], limit: Optional[int], cursor: Optional[str], fields: Optional[str],
+              since: Optional[str] = None) -> JSONResponse:
+    """One page of a provider cost query in (date, service) order, served from the cached result.
+
+    The next page's cursor is in X-Cost-Next-Cursor, which the last page
+    omits. Headers are X-Cost-* so the conditional GET cache keeps them.
+    """
+    selected = parse_fields(fields)
+    series = series_key(manager, start_date, end_date, granularity, group_by)
+    after = decode_cursor(series, cursor) if cursor else None
+    size = min(limit or settings.cost_page_default_size, settings.cost_page_max_size)
+
+    rows, dimensions, order, report = groupby_planner.get_rows(manager, start_date, end_date, granularity, group_by)
+    ordered = page_index.rows(series, report["data_version"], lambda: page_rows(rows, order))
+    ordered, headers = delta_tracker.delta(series, report["data_version"], ordered, since)
+
+    start = bisect_right(ordered, after, key=_page_key) if after else 0
+    page = ordered[start:start + size]
+    headers["X-Cost-Total-Count"] = str(len(ordered))
+    if "stale_since" in report:
+        headers["X-Cost-Stale-Since"] = report["stale_since"]
+    if start + size < len(ordered):
+        headers["X-Cost-Next-Cursor"] = encode_cursor(series, page[-1])
+    return JSONResponse(content=project(page, dimensions, selected), headers=headers)
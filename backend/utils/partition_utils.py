@@ -0,0 +1,174 @@
+import asyncio
+import re
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterator, List, Dict, Any, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+
+ARCHIVE_SCHEMA = "cost_archive"
+# Advisory lock held while maintaining partitions, so only one worker process does it at a time
+_MAINTENANCE_LOCK = 0x636f737470617274
+_PARTITION_NAME = re.compile(r"^cost_data_p(\d{4})_(\d{2})$")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def list_partitions(db: Session) -> List[Dict[str, Any]]:
+    """Attached cost_data partitions with their month and approximate size"""
+    rows = db.execute(text("""
+        SELECT c.relname AS name, GREATEST(c.reltuples, 0)::bigint AS estimated_rows,
+               pg_total_relation_size(c.oid) AS total_bytes
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'cost_data'::regclass
+        ORDER BY c.relname
+    """)).all()
+    partitions = []
+    for row in rows:
+        partition = dict(row._mapping)
+        match = _PARTITION_NAME.match(row.name)
+        partition["month"] = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+        partitions.append(partition)
+    return partitions
+
+
+def ensure_partitions(db: Session, months_ahead: Optional[int] = None) -> List[str]:
+    """Create partitions from the current month through ``months_ahead`` months out"""
+    months_ahead = settings.cost_data_premake_months if months_ahead is None else months_ahead
+    current = date.today().replace(day=1)
+    try:
+        created = []
+        existing = {p["name"] for p in list_partitions(db)}
+        for offset in range(months_ahead + 1):
+            name = db.execute(text("SELECT ensure_cost_data_partition(:month)"),
+                              {"month": _add_months(current, offset)}).scalar()
+            if name not in existing:
+                created.append(name)
+        # Months that only landed in the default partition (late or back-dated data)
+        stray = db.execute(text("""
+            SELECT DISTINCT DATE_TRUNC('month', billing_period_start)::date FROM cost_data_default
+        """)).scalars().all()
+        for month in stray:
+            created.append(db.execute(text("SELECT ensure_cost_data_partition(:month)"), {"month": month}).scalar())
+        db.commit()
+        return created
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Failed to create cost_data partitions: {str(e)}")
+
+
+def apply_retention(db: Session, keep_months: Optional[int] = None,
+                    archive: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """Detach partitions older than ``keep_months`` and archive or drop them"""
+    keep_months = settings.cost_data_retention_months if keep_months is None else keep_months
+    archive = settings.cost_data_archive if archive is None else archive
+    if keep_months <= 0:
+        return []
+
+    cutoff = _add_months(date.today().replace(day=1), -(keep_months - 1))
+    try:
+        removed = []
+        for partition in list_partitions(db):
+            if partition["month"] is None or partition["month"] >= cutoff:
+                continue
+            name = partition["name"]
+            db.execute(text(f'ALTER TABLE cost_data DETACH PARTITION "{name}"'))
+            if archive:
+                db.execute(text(f'ALTER TABLE "{name}" SET SCHEMA {ARCHIVE_SCHEMA}'))
+            else:
+                db.execute(text(f'DROP TABLE "{name}"'))
+            removed.append({
+                "name": name,
+                "month": partition["month"],
+                "action": "archived" if archive else "dropped",
+                "estimated_rows": partition["estimated_rows"],
+            })
+        db.commit()
+        return removed
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Failed to apply cost_data retention: {str(e)}")
+
+
+def maintain_partitions(db: Session, months_ahead: Optional[int] = None, keep_months: Optional[int] = None,
+                        archive: Optional[bool] = None) -> Dict[str, Any]:
+    """Pre-create upcoming partitions, then apply the retention policy"""
+    return {
+        "created": ensure_partitions(db, months_ahead),
+        "retired": apply_retention(db, keep_months, archive),
+    }
+
+
+@contextmanager
+def maintenance_session() -> Iterator[Optional[Session]]:
+    """Session holding the maintenance advisory lock, or None while another process holds it.
+
+    The lock is session-level and the maintenance steps commit as they go,
+    so lock, work and unlock all run on one pinned connection rather than
+    whichever pooled connection each commit happens to get.
+    """
+    with engine.connect() as connection:
+        locked = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _MAINTENANCE_LOCK}).scalar()
+        connection.commit()
+        if not locked:
+            yield None
+            return
+        try:
+            with Session(bind=connection) as db:
+                yield db
+        finally:
+            try:
+                connection.rollback()
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MAINTENANCE_LOCK})
+                connection.commit()
+            except Exception:
+                # Closing the server session is the only other way to release the lock
+                connection.invalidate()
+                raise
+
+
+class PartitionMaintainer:
+    """Runs partition maintenance on startup and then at a fixed interval"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.partition_maintenance_interval_seconds
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._worker:
+            return
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._worker:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self._maintain)
+            except Exception as e:
+                print(f"cost_data partition maintenance failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def _maintain(self):
+        with maintenance_session() as db:
+            if db is not None:
+                maintain_partitions(db)
+
+
+partition_maintainer = PartitionMaintainer()
@@ -0,0 +1,278 @@
+import calendar
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.schemas import CostMetric
+from utils.cache_utils import CostCache, record_dependency
+from utils.fx_utils import fx_rates
+from utils.trace_utils import traced
+
+PERIOD_MODES = ("wow", "mom", "yoy", "custom")
+
+# (start, end) with an exclusive end, like the provider APIs
+Window = Tuple[str, str]
+# Per-row days, "provider<SEP>service" keys, amounts and currencies
+Rows = Tuple[List[str], List[str], List[float], List[str]]
+# Labels and their summed amounts
+Totals = Tuple[np.ndarray, np.ndarray]
+
+KEY_SEPARATOR = "\x1f"
+
+# Per-source totals of closed comparison periods, which only change through late restatements
+closed_period_cache = CostCache(
+    max_entries=settings.period_cache_max_entries,
+    ttl=settings.period_cache_ttl_seconds,
+)
+
+
+def _day(value: str) -> date:
+    return date.fromisoformat(value[:10])
+
+
+def _month_window(month_start: date, days: int) -> Tuple[date, date]:
+    """The first ``days`` days of a month, cut at the month's end"""
+    month_days = calendar.monthrange(month_start.year, month_start.month)[1]
+    return month_start, month_start + timedelta(days=min(days, month_days))
+
+
+def comparison_windows(mode: str, as_of: Optional[str] = None,
+                       current_start: Optional[str] = None, current_end: Optional[str] = None,
+                       previous_start: Optional[str] = None, previous_end: Optional[str] = None) -> Tuple[Window, Window]:
+    """Current and previous windows for a comparison mode.
+
+    ``wow`` compares the 7 days through ``as_of`` (default yesterday) with the
+    7 days before; ``mom`` compares month-to-date with the same days of the
+    previous month, and ``yoy`` with the same days of that month a year ago.
+    ``custom`` takes both windows explicitly, ends exclusive.
+    """
+    mode = mode.lower()
+    if mode not in PERIOD_MODES:
+        raise ValueError(f"mode must be one of: {', '.join(PERIOD_MODES)}")
+
+    if mode == "custom":
+        if not all((current_start, current_end, previous_start, previous_end)):
+            raise ValueError("custom mode needs current_start, current_end, previous_start and previous_end")
+        current = (_day(current_start), _day(current_end))
+        previous = (_day(previous_start), _day(previous_end))
+    else:
+        last = _day(as_of) if as_of else date.today() - timedelta(days=1)
+        end = last + timedelta(days=1)
+        if mode == "wow":
+            current = (end - timedelta(days=7), end)
+            previous = (end - timedelta(days=14), end - timedelta(days=7))
+        else:
+            month_start = last.replace(day=1)
+            days = (end - month_start).days
+            if mode == "mom":
+                previous_month = (month_start - timedelta(days=1)).replace(day=1)
+            else:
+                previous_month = month_start.replace(year=month_start.year - 1)
+            current = (month_start, end)
+            previous = _month_window(previous_month, days)
+
+    for start, end in (current, previous):
+        if start >= end:
+            raise ValueError(f"Empty comparison window {start} to {end}")
+    return (
+        (current[0].isoformat(), current[1].isoformat()),
+        (previous[0].isoformat(), previous[1].isoformat()),
+    )
+
+
+def fetch_windows(windows: List[Window]) -> List[Window]:
+    """Windows to fetch so that each comparison window is covered by a single fetch.
+
+    Windows are merged into their union while it spans at most
+    ``period_max_union_days``; distant windows (year over year) are fetched
+    separately rather than pulling every day in between.
+    """
+    merged: List[List[date]] = []
+    for start, end in sorted((_day(s), _day(e)) for s, e in windows):
+        if merged and (max(merged[-1][1], end) - merged[-1][0]).days <= settings.period_max_union_days:
+            merged[-1][1] = max(merged[-1][1], end)
+            continue
+        merged.append([start, end])
+    return [(start.isoformat(), end.isoformat()) for start, end in merged]
+
+
+def is_closed(window: Window) -> bool:
+    """Whether a window ended long enough ago that providers no longer restate it"""
+    return _day(window[1]) <= date.today() - timedelta(days=settings.period_settle_days)
+
+
+def cost_rows(provider: str, costs: List[CostMetric]) -> Rows:
+    """Rows of daily provider costs keyed by provider and service"""
+    dated = [cost for cost in costs if cost.date]
+    return (
+        [cost.date for cost in dated],
+        [f"{provider}{KEY_SEPARATOR}{cost.service}" for cost in dated],
+        [cost.amount for cost in dated],
+        [cost.currency or cost.unit for cost in dated],
+    )
+
+
+def stored_revision(db: Session, integration_id: str, window: Window) -> int:
+    """Sum of the stored days' ingestion revisions in a window.
+
+    Revisions only grow, so the sum changes whenever any day is rewritten,
+    even one whose revision was drawn before the current maximum but
+    committed after it.
+    """
+    return int(db.execute(text("""
+        SELECT COALESCE(SUM(revision), 0) FROM cost_data_revisions
+        WHERE integration_id = CAST(:integration_id AS uuid) AND day >= :start_date AND day < :end_date
+    """), {"integration_id": integration_id, "start_date": window[0], "end_date": window[1]}).scalar())
+
+
+def stored_rows(db: Session, integration_id: str, window: Window) -> Rows:
+    """Rows of stored daily costs for one integration, keyed by provider and service"""
+    rows = db.execute(text("""
+        SELECT c.billing_period_start::text, ci.provider::text || :separator || c.service_name,
+               SUM(c.cost_amount)::float8, COALESCE(c.currency, 'USD')
+        FROM cost_data c
+        JOIN cloud_integrations ci ON ci.id = c.integration_id
+        WHERE c.integration_id = CAST(:integration_id AS uuid)
+          AND c.billing_period_start >= :start_date
+          AND c.billing_period_start < :end_date
+        GROUP BY 1, 2, 4
+    """), {"integration_id": integration_id, "start_date": window[0], "end_date": window[1],
+           "separator": KEY_SEPARATOR}).all()
+    return (
+        [row[0] for row in rows],
+        [row[1] for row in rows],
+        [row[2] for row in rows],
+        [row[3] for row in rows],
+    )
+
+
+def rows_to_arrays(rows: Rows, currency: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Days, keys and amounts converted to ``currency``"""
+    days, keys, amounts, currencies = rows
+    days = np.array([day[:10] for day in days], dtype="datetime64[D]")
+    amounts = np.asarray(amounts, dtype=np.float64)
+    currencies = np.array([(code or currency).upper() for code in currencies], dtype=str)
+    if len(currencies) and not (currencies == currency.upper()).all():
+        amounts = fx_rates.table().convert(amounts, currencies, days, currency)
+    return days, np.array(keys, dtype=str), amounts
+
+
+def _totals(keys: np.ndarray, amounts: np.ndarray) -> Totals:
+    labels, inverse = np.unique(keys, return_inverse=True)
+    return labels, np.bincount(inverse.ravel(), weights=amounts, minlength=len(labels))
+
+
+def _window_totals(days: np.ndarray, keys: np.ndarray, amounts: np.ndarray, window: Window) -> Totals:
+    start, end = np.datetime64(window[0], "D"), np.datetime64(window[1], "D")
+    selected = (days >= start) & (days < end)
+    return _totals(keys[selected], amounts[selected])
+
+
+@traced("period.compare_source")
+def compare_source(identity: str, load: Callable[[Window], Rows], current: Window, previous: Window,
+                   currency: str) -> Dict[str, Any]:
+    """Totals per key for both windows from one source (a provider account or stored costs).
+
+    A closed previous window is read from ``closed_period_cache`` when
+    present, so only the current window is fetched; otherwise the windows are
+    fetched together and the closed side is cached for later requests.
+    """
+    closed_key = f"period|{identity}|{previous[0]}|{previous[1]}|{currency.upper()}"
+    closed_entry = closed_period_cache.get_entry(closed_key) if is_closed(previous) else None
+    needed = [current] if closed_entry is not None else [current, previous]
+    fetched = fetch_windows(needed)
+
+    parts = [rows_to_arrays(load(window), currency) for window in fetched]
+    days = np.concatenate([part[0] for part in parts])
+    keys = np.concatenate([part[1] for part in parts])
+    amounts = np.concatenate([part[2] for part in parts])
+
+    current_totals = _window_totals(days, keys, amounts, current)
+    if closed_entry is not None:
+        previous_totals = closed_entry.value
+    else:
+        previous_totals = _window_totals(days, keys, amounts, previous)
+        if is_closed(previous):
+            closed_entry = closed_period_cache.set(closed_key, previous_totals)
+    if closed_entry is not None:
+        record_dependency(closed_period_cache, closed_entry)
+
+    return {
+        "current": current_totals,
+        "previous": previous_totals,
+        "fetched": fetched,
+        "previous_cached": len(needed) == 1,
+    }
+
+
+def _percent(delta: np.ndarray, base: np.ndarray) -> List[Optional[float]]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(base != 0, delta / np.abs(base) * 100, np.nan)
+    return [None if np.isnan(value) else round(float(value), 2) for value in percent]
+
+
+@traced("period.summarize")
+def summarize(sources: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """Deltas, percentage changes and top movers per service and provider across all sources"""
+    current_labels = [source["current"][0] for source in sources]
+    previous_labels = [source["previous"][0] for source in sources]
+    labels, inverse = np.unique(
+        np.concatenate(current_labels + previous_labels + [np.array([], dtype=str)]), return_inverse=True
+    )
+    inverse = inverse.ravel()
+    split = sum(len(part) for part in current_labels)
+    current = np.bincount(
+        inverse[:split], weights=np.concatenate([source["current"][1] for source in sources] + [np.zeros(0)]),
+        minlength=len(labels),
+    )
+    previous = np.bincount(
+        inverse[split:], weights=np.concatenate([source["previous"][1] for source in sources] + [np.zeros(0)]),
+        minlength=len(labels),
+    )
+    delta = current - previous
+
+    pairs = np.char.partition(labels.astype(str), KEY_SEPARATOR) if len(labels) else np.empty((0, 3), dtype=str)
+    providers, provider_index = np.unique(pairs[:, 0], return_inverse=True)
+    provider_index = provider_index.ravel()
+    provider_current = np.bincount(provider_index, weights=current, minlength=len(providers))
+    provider_previous = np.bincount(provider_index, weights=previous, minlength=len(providers))
+    provider_delta = provider_current - provider_previous
+    provider_percent = _percent(provider_delta, provider_previous)
+
+    movers = np.argsort(-np.abs(delta), kind="stable")[:top]
+    movers = movers[delta[movers] != 0]
+    mover_percent = _percent(delta[movers], previous[movers])
+
+    total_current = float(current.sum())
+    total_previous = float(previous.sum())
+    return {
+        "current_total": total_current,
+        "previous_total": total_previous,
+        "delta": total_current - total_previous,
+        "percent_change": _percent(np.array([total_current - total_previous]), np.array([total_previous]))[0],
+        "providers": {
+            str(provider): {
+                "current": float(provider_current[i]),
+                "previous": float(provider_previous[i]),
+                "delta": float(provider_delta[i]),
+                "percent_change": provider_percent[i],
+            }
+            for i, provider in enumerate(providers)
+        },
+        "services_compared": len(labels),
+        "top_movers": [
+            {
+                "provider": str(pairs[i, 0]),
+                "service": str(pairs[i, 2]),
+                "current": float(current[i]),
+                "previous": float(previous[i]),
+                "delta": float(delta[i]),
+                "percent_change": mover_percent[n],
+            }
+            for n, i in enumerate(movers.tolist())
+        ],
+    }
@@ -0,0 +1,354 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from config import settings
+from database import SessionLocal
+from utils.trace_utils import span
+
+# off: providers are always called; record: always called and the responses saved;
+# replay: recordings younger than recording_max_age_seconds are served, anything else is fetched and saved;
+# offline: recordings of any age are served and a missing one is an error, never an upstream call
+RECORDING_MODES = ("off", "record", "replay", "offline")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    identity TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    request TEXT NOT NULL,
+    context TEXT,
+    response BLOB NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_recorded_at ON responses (recorded_at);
+"""
+
+# Set while warming caches so a recording that is missing is reported instead of fetched
+_offline: ContextVar[bool] = ContextVar("recording_offline", default=False)
+
+
+class RecordingMissError(LookupError):
+    """No recording for a provider request while upstream calls are not allowed"""
+
+
+def request_key(provider: str, identity: str, operation: str, request: Any) -> str:
+    """Stable key for a provider request: key order and whitespace in ``request`` do not matter"""
+    normalized = json.dumps([provider, identity, operation, request], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+@contextmanager
+def offline():
+    """Serve provider requests in this context from recordings only"""
+    token = _offline.set(True)
+    try:
+        yield
+    finally:
+        _offline.reset(token)
+
+
+class ResponseStore:
+    """Raw provider responses in a SQLite file, keyed by normalized request.
+
+    Recently used responses are also kept decoded in memory, so a replayed
+    request costs a dictionary lookup. The file is opened lazily and reopened
+    after a fork; WAL mode lets every worker process read and record at once.
+
+    Keys include the manager's credential identity, which fingerprints the
+    secret as well as the key or client id. Replays never check credentials
+    with the provider, so an API caller is only served recordings made with
+    the same secret; fixtures are replayed by the integrations they were
+    recorded for.
+    """
+
+    def __init__(self, path: Optional[str] = None, mode: Optional[str] = None,
+                 max_age_seconds: Optional[float] = None, memory_entries: Optional[int] = None):
+        self.path = path or settings.recording_path
+        self.mode = (mode or settings.recording_mode).lower()
+        if self.mode not in RECORDING_MODES:
+            raise ValueError(f"Recording mode must be one of {', '.join(RECORDING_MODES)}")
+        self.max_age_seconds = settings.recording_max_age_seconds if max_age_seconds is None else max_age_seconds
+        self.memory_entries = memory_entries or settings.recording_memory_entries
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self.replayed = 0
+        self.recorded = 0
+        self.fetched = 0
+        self.missed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _db(self) -> sqlite3.Connection:
+        # Callers hold self._lock; a connection inherited across fork is never reused
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _remember(self, key: str, recorded_at: float, response: Any):
+        self._memory[key] = (recorded_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str, max_age_seconds: Optional[float] = None) -> Optional[Any]:
+        """Recorded response for ``key``, or None if missing or older than ``max_age_seconds``"""
+        with self._lock:
+            found = self._memory.get(key)
+            if found is not None:
+                self._memory.move_to_end(key)
+            else:
+                row = self._db().execute(
+                    "SELECT recorded_at, response FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                found = (row[0], json.loads(zlib.decompress(row[1])))
+                self._remember(key, *found)
+        recorded_at, response = found
+        if max_age_seconds and time.time() - recorded_at > max_age_seconds:
+            return None
+        return response
+
+    def put(self, key: str, provider: str, identity: str, operation: str, request: Any, response: Any,
+            context: Optional[Dict[str, Any]] = None):
+        recorded_at = time.time()
+        blob = zlib.compress(_dumps(response).encode(), 6)
+        with self._lock:
+            connection = self._db()
+            connection.execute(
+                """INSERT INTO responses (key, provider, identity, operation, request, context, response, recorded_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET response = excluded.response, context = excluded.context,
+                                                   recorded_at = excluded.recorded_at""",
+                (key, provider, identity, operation, _dumps(request), _dumps(context) if context else None,
+                 blob, recorded_at),
+            )
+            connection.commit()
+            self._remember(key, recorded_at, response)
+            self.recorded += 1
+
+    def call(self, provider: str, identity: str, operation: str, request: Any, fetch: Callable[[], Any],
+             context: Optional[Dict[str, Any]] = None) -> Any:
+        """Response to one provider request, replayed or recorded according to the mode.
+
+        ``fetch`` makes the upstream call and must return JSON-serializable
+        data; ``context`` is the manager call that issued the request, kept so
+        recordings can be replayed into the cost caches at startup.
+        """
+        if not self.enabled:
+            return fetch()
+        key = request_key(provider, identity, operation, request)
+        offline_only = self.mode == "offline" or _offline.get()
+        if offline_only or self.mode == "replay":
+            with span("recording.replay", provider=provider, operation=operation) as current:
+                response = self.get(key, None if offline_only else self.max_age_seconds)
+                current.set(hit=response is not None)
+            if response is not None:
+                self.replayed += 1
+                return response
+            if offline_only:
+                self.missed += 1
+                raise RecordingMissError(f"No recording for {provider} {operation} request")
+        self.fetched += 1
+        response = fetch()
+        self.put(key, provider, identity, operation, request, response, context)
+        return response
+
+    def load(self, limit: Optional[int] = None) -> int:
+        """Decode the most recent recordings into memory"""
+        limit = min(limit or self.memory_entries, self.memory_entries)
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key, recorded_at, response FROM responses ORDER BY recorded_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            for key, recorded_at, blob in reversed(rows):
+                self._remember(key, recorded_at, json.loads(zlib.decompress(blob)))
+        return len(rows)
+
+    def contexts(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Distinct (provider, identity, manager call) of the recorded requests"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT provider, identity, context FROM responses WHERE context IS NOT NULL"
+            ).fetchall()
+        return [(provider, identity, json.loads(context)) for provider, identity, context in rows]
+
+    def entries(self, provider: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Every recording, oldest first, as JSON-ready dictionaries"""
+        with self._lock:
+            rows = self._db().execute(
+                """SELECT key, provider, identity, operation, request, context, response, recorded_at
+                   FROM responses WHERE ? IS NULL OR provider = ? ORDER BY recorded_at""",
+                (provider, provider),
+            ).fetchall()
+        for key, provider_name, identity, operation, request, context, blob, recorded_at in rows:
+            yield {
+                "key": key,
+                "provider": provider_name,
+                "identity": identity,
+                "operation": operation,
+                "request": json.loads(request),
+                "context": json.loads(context) if context else None,
+                "response": json.loads(zlib.decompress(blob)),
+                "recorded_at": recorded_at,
+            }
+
+    def export(self, path: str, provider: Optional[str] = None) -> int:
+        """Write recordings to a JSON lines fixture file"""
+        count = 0
+        with open(path, "w") as f:
+            for entry in self.entries(provider):
+                f.write(_dumps(entry) + "\n")
+                count += 1
+        return count
+
+    def import_file(self, path: str) -> int:
+        """Add the recordings of a JSON lines fixture file, keeping their recording times"""
+        count = 0
+        with open(path) as f, self._lock:
+            connection = self._db()
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = request_key(entry["provider"], entry["identity"], entry["operation"], entry["request"])
+                connection.execute(
+                    """INSERT INTO responses (key, provider, identity, operation, request, context, response, recorded_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (key) DO UPDATE SET response = excluded.response, context = excluded.context,
+                                                       recorded_at = excluded.recorded_at""",
+                    (key, entry["provider"], entry["identity"], entry["operation"], _dumps(entry["request"]),
+                     _dumps(entry["context"]) if entry.get("context") else None,
+                     zlib.compress(_dumps(entry["response"]).encode(), 6), entry.get("recorded_at") or time.time()),
+                )
+                self._memory.pop(key, None)
+                count += 1
+            connection.commit()
+        return count
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Delete recordings older than ``older_than_seconds``"""
+        with self._lock:
+            connection = self._db()
+            deleted = connection.execute(
+                "DELETE FROM responses WHERE recorded_at < ?", (time.time() - older_than_seconds,)
+            ).rowcount
+            connection.commit()
+            self._memory.clear()
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        report = {
+            "mode": self.mode,
+            "path": self.path,
+            "replayed": self.replayed,
+            "fetched": self.fetched,
+            "recorded": self.recorded,
+            "missed": self.missed,
+            "in_memory": len(self._memory),
+        }
+        if self.enabled:
+            with self._lock:
+                count, oldest, newest = self._db().execute(
+                    "SELECT COUNT(*), MIN(recorded_at), MAX(recorded_at) FROM responses"
+                ).fetchone()
+            report.update(recordings=count, oldest_recorded_at=oldest, newest_recorded_at=newest)
+        return report
+
+
+def warm_cost_caches() -> Dict[str, int]:
+    """Replay recorded cost queries of the stored integrations into the in-memory cost caches"""
+    # Imported here because the provider managers import this module
+    from utils.cache_utils import cached_costs
+    from utils.groupby_utils import groupby_planner
+    from utils.integration_utils import build_cost_manager
+
+    report = {"recordings_loaded": response_store.load(), "warmed": 0, "failed": 0, "unmatched": 0}
+    db = SessionLocal()
+    try:
+        integrations = db.execute(text("SELECT provider::text, credentials FROM cloud_integrations")).all()
+    finally:
+        db.close()
+    managers = {}
+    for provider, credentials in integrations:
+        try:
+            manager = build_cost_manager(provider, credentials)
+        except Exception:
+            continue
+        managers[manager.identity] = manager
+
+    with offline():
+        for _, identity, call in response_store.contexts():
+            manager = managers.get(identity)
+            if manager is None or call.get("filters"):
+                # Integration since removed, or a filtered sub-query the planner issues on its own
+                report["unmatched"] += 1
+                continue
+            args = (call["start_date"], call["end_date"], call["granularity"], call["group_by"])
+            try:
+                cached_costs(manager, *args)
+                groupby_planner.get_costs(manager, *args)
+                report["warmed"] += 1
+            except Exception:
+                report["failed"] += 1
+    return report
+
+
+class RecordingWarmer:
+    """Warms the cost caches from recordings once, in the background, at startup"""
+
+    def __init__(self):
+        self._worker: Optional[asyncio.Task] = None
+        self.report: Optional[Dict[str, int]] = None
+
+    async def start(self):
+        if self._worker or not response_store.enabled or not settings.recording_warm_on_startup:
+            return
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._worker:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self):
+        try:
+            self.report = await asyncio.to_thread(warm_cost_caches)
+        except Exception as e:
+            print(f"Warming caches from recordings failed: {str(e)}")
+
+
+response_store = ResponseStore()
+recording_warmer = RecordingWarmer()
@@ -0,0 +1,123 @@
+import asyncio
+import gzip
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from config import settings
+from utils.cache_utils import CostCache
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Handler headers replayed with cached bodies (delta watermarks)
+PRESERVED_HEADER_PREFIX = "x-cost-"
+
+# GET endpoints whose bodies are derived from cost cache entries
+CONDITIONAL_PATHS = {
+    "/api/v1/dashboard/summary",
+    "/api/v1/aws/costs",
+    "/api/v1/azure/costs",
+    "/api/v1/gcp/costs",
+}
+
+
+class RenderedResponse:
+    """A serialized response body, its content hash and lazily compressed variants"""
+
+    __slots__ = ("body", "media_type", "headers", "digest", "dependencies", "_encoded", "_lock")
+
+    def __init__(self, body: bytes, media_type: str, dependencies: List[Tuple[CostCache, str, int]],
+                 headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers or {}
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.dependencies = dependencies
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding: Optional[str]) -> str:
+        # Strong validators differ per content coding
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def encode(self, encoding: Optional[str]) -> bytes:
+        if not encoding:
+            return self.body
+        with self._lock:
+            cached = self._encoded.get(encoding)
+        if cached is not None:
+            return cached
+        if encoding == "br":
+            encoded = brotli.compress(self.body, quality=settings.brotli_quality)
+        else:
+            encoded = gzip.compress(self.body, compresslevel=settings.gzip_level, mtime=0)
+        with self._lock:
+            self._encoded[encoding] = encoded
+        return encoded
+
+
+# Rendered bodies for hot keys; an entry is only served while its dependencies are unchanged
+response_cache = CostCache(max_entries=settings.response_cache_max_entries)
+
+
+def response_key(request: Request) -> str:
+    """Hash of path and sorted query; credentials in the query never appear in the key"""
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return hashlib.sha256(f"{request.url.path}?{query}".encode("utf-8")).hexdigest()
+
+
+def negotiate_encoding(accept_encoding: str, size: int) -> Optional[str]:
+    """Preferred content coding for a body of ``size`` bytes, or None for identity"""
+    if size < settings.compression_min_bytes or not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    ranked = [(accepted.get(c, accepted.get("*", 0.0)), -i, c) for i, c in enumerate(candidates)]
+    quality, _, best = max(ranked)
+    return best if quality > 0 else None
+
+
+def etag_matches(if_none_match: Optional[str], digest: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        value = tag[2:] if tag.startswith("W/") else tag
+        if value.strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+async def render(request: Request, rendered: RenderedResponse, cache_status: str) -> Response:
+    """304 for a matching If-None-Match, otherwise the (pre-)compressed body"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), len(rendered.body))
+    headers = {
+        **rendered.headers,
+        "ETag": rendered.etag(encoding),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+        "X-Response-Cache": cache_status,
+    }
+    if etag_matches(request.headers.get("if-none-match"), rendered.digest):
+        return Response(status_code=304, headers=headers)
+    body = rendered.encode(None) if encoding is None else await asyncio.to_thread(rendered.encode, encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=rendered.media_type, headers=headers)
@@ -0,0 +1,206 @@
+import base64
+import json
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+SEARCH_MODES = ("prefix", "contains", "fuzzy")
+
+# Display label; prefix search and keyset order both use the idx_resources_label index
+_LABEL = 'lower(COALESCE(r.resource_name, r.resource_id)) COLLATE "C"'
+_SCORE = "GREATEST(similarity(COALESCE(r.resource_name, ''), :q), similarity(r.resource_id, :q))::float8"
+
+
+def encode_cursor(values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _like_pattern(q: str, prefix_only: bool = False) -> str:
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix_only else f"%{escaped}%"
+
+
+def _prefix_range(q: str) -> Tuple[str, str]:
+    """[low, high) bounds covering every string that starts with q (C collation)"""
+    return q, q[:-1] + chr(ord(q[-1]) + 1)
+
+
+def parse_tag_filters(tags: Optional[List[str]]) -> Tuple[Dict[str, str], List[str]]:
+    """Split "key:value" filters (containment) from bare "key" filters (existence)"""
+    equals: Dict[str, str] = {}
+    exists: List[str] = []
+    for tag in tags or []:
+        key, sep, value = tag.partition(":")
+        if not key:
+            raise ValueError(f"Invalid tag filter '{tag}'")
+        if sep:
+            equals[key] = value
+        else:
+            exists.append(key)
+    return equals, exists
+
+
+def search_resources(db: Session, q: str = "", mode: str = "prefix", integration_id: Optional[str] = None,
+                     resource_type: Optional[str] = None, status: Optional[str] = None,
+                     region: Optional[str] = None, tags: Optional[List[str]] = None,
+                     limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Keyset-paginated resource search by name/ID prefix, substring or similarity"""
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}")
+    q = q.strip()
+    if mode == "fuzzy" and len(q) < 3:
+        raise ValueError("Fuzzy search needs at least 3 characters")
+
+    started = time.perf_counter()
+    conditions = []
+    params: Dict[str, Any] = {"q": q, "limit": limit + 1}
+
+    if integration_id:
+        conditions.append("r.integration_id = CAST(:integration_id AS uuid)")
+        params["integration_id"] = integration_id
+    if resource_type:
+        conditions.append("r.resource_type = :resource_type")
+        params["resource_type"] = resource_type
+    if status:
+        conditions.append("r.status::text = :status")
+        params["status"] = status
+    if region:
+        conditions.append("r.region = :region")
+        params["region"] = region
+
+    equals, exists = parse_tag_filters(tags)
+    if equals:
+        conditions.append("r.tags @> CAST(:tag_equals AS jsonb)")
+        params["tag_equals"] = json.dumps(equals)
+    for i, key in enumerate(exists):
+        # jsonpath existence checks are served by the jsonb_path_ops index
+        conditions.append(f"r.tags @? CAST(:tag_path_{i} AS jsonpath)")
+        params[f"tag_path_{i}"] = f"$.{json.dumps(key)}"
+
+    if mode == "fuzzy":
+        conditions.append("(COALESCE(r.resource_name, '') % :q OR r.resource_id % :q)")
+        order = f"{_SCORE} DESC, r.id"
+        if cursor:
+            score, last_id = decode_cursor(cursor)
+            conditions.append(f"({_SCORE} < :c_score OR ({_SCORE} = :c_score AND r.id > CAST(:c_id AS uuid)))")
+            params.update(c_score=float(score), c_id=last_id)
+    else:
+        if q and mode == "prefix":
+            low, high = _prefix_range(q.lower())
+            conditions.append(f"{_LABEL} >= :low AND {_LABEL} < :high")
+            params.update(low=low, high=high)
+        elif q:
+            conditions.append(
+                "(r.resource_name ILIKE :pattern OR r.resource_id ILIKE :pattern OR r.tags::text ILIKE :pattern)"
+            )
+            params["pattern"] = _like_pattern(q)
+        order = f"{_LABEL}, r.id"
+        if cursor:
+            label, last_id = decode_cursor(cursor)
+            conditions.append(f"({_LABEL}, r.id) > (:c_label, CAST(:c_id AS uuid))")
+            params.update(c_label=label, c_id=last_id)
+
+    where = " AND ".join(conditions) or "true"
+    rows = db.execute(text(f"""
+        SELECT r.id::text, r.integration_id::text, r.resource_id, r.resource_type, r.resource_name,
+               r.status::text AS status, r.region, r.tags, r.monthly_cost::float8 AS monthly_cost,
+               {_LABEL} AS sort_label, {_SCORE if mode == "fuzzy" else "NULL::float8"} AS score
+        FROM resources r
+        WHERE {where}
+        ORDER BY {order}
+        LIMIT :limit
+    """), params).all()
+
+    results = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = results[-1]
+        next_cursor = encode_cursor([last["score"] if mode == "fuzzy" else last["sort_label"], last["id"]])
+    for result in results:
+        result.pop("sort_label")
+        if mode != "fuzzy":
+            result.pop("score")
+
+    return {
+        "results": results,
+        "next_cursor": next_cursor,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def search_services(db: Session, q: str = "", mode: str = "prefix", integration_id: Optional[str] = None,
+                    limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Keyset-paginated search over the service name catalog"""
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}")
+    q = q.strip()
+    if mode == "fuzzy" and len(q) < 3:
+        raise ValueError("Fuzzy search needs at least 3 characters")
+
+    started = time.perf_counter()
+    conditions = []
+    params: Dict[str, Any] = {"q": q, "limit": limit + 1}
+    if integration_id:
+        conditions.append("s.integration_id = CAST(:integration_id AS uuid)")
+        params["integration_id"] = integration_id
+
+    if mode == "fuzzy":
+        score = "similarity(s.service_name, :q)::float8"
+        conditions.append("s.service_name % :q")
+        order = "score DESC, s.service_name"
+        key = score
+        if cursor:
+            last_score, last_name = decode_cursor(cursor)
+            conditions.append(f"({score} < :c_score OR ({score} = :c_score AND s.service_name > :c_name))")
+            params.update(c_score=float(last_score), c_name=last_name)
+    else:
+        if q:
+            conditions.append("s.service_name ILIKE :pattern")
+            params["pattern"] = _like_pattern(q, prefix_only=mode == "prefix")
+        order = "s.service_name"
+        key = "NULL::float8"
+        if cursor:
+            _, last_name = decode_cursor(cursor)
+            conditions.append("s.service_name > :c_name")
+            params["c_name"] = last_name
+
+    where = " AND ".join(conditions) or "true"
+    # One row per service name; integrations are aggregated so pages never split a name
+    rows = db.execute(text(f"""
+        SELECT s.service_name, MAX({key}) AS score,
+               array_agg(s.integration_id::text ORDER BY s.integration_id) AS integration_ids,
+               MIN(s.first_seen) AS first_seen, MAX(s.last_seen) AS last_seen
+        FROM service_catalog s
+        WHERE {where}
+        GROUP BY s.service_name
+        ORDER BY {order}
+        LIMIT :limit
+    """), params).all()
+
+    results = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = results[-1]
+        next_cursor = encode_cursor([last["score"], last["service_name"]])
+    if mode != "fuzzy":
+        for result in results:
+            result.pop("score")
+
+    return {
+        "results": results,
+        "next_cursor": next_cursor,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
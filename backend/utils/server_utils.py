@@ -0,0 +1,96 @@
+import math
+import os
+import signal
+import threading
+import time
+from typing import Optional
+
+from config import settings
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of the container, if one is set"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as handle:  # cgroup v2
+            quota, period = handle.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as handle:  # cgroup v1
+            quota = int(handle.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as handle:
+            period = int(handle.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity masks and container quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY if set, otherwise one worker per available core"""
+    if settings.web_concurrency:
+        return settings.web_concurrency
+    return min(available_cpus(), settings.web_max_workers)
+
+
+def private_memory_mb() -> float:
+    """Memory owned by this process alone; pages still shared with the preloaded master are excluded"""
+    try:
+        private_kb = 0
+        with open("/proc/self/smaps_rollup") as handle:
+            for line in handle:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    private_kb += int(line.split()[1])
+        return private_kb / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemoryWatchdog:
+    """Asks the worker to shut down gracefully once its private memory passes the limit.
+
+    SIGTERM lets in-flight requests finish; the master then forks a fresh
+    worker from the preloaded app.
+    """
+
+    def __init__(self, limit_mb: Optional[float] = None, interval: Optional[float] = None):
+        self.limit_mb = settings.web_worker_max_memory_mb if limit_mb is None else limit_mb
+        self.interval = interval or settings.web_worker_memory_check_seconds
+
+    def start(self):
+        if self.limit_mb > 0:
+            threading.Thread(target=self._run, name="memory-watchdog", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            used = private_memory_mb()
+            if used > self.limit_mb:
+                print(f"Worker {os.getpid()} using {used:.0f} MB (limit {self.limit_mb:.0f} MB), restarting")
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+
+
+def reset_after_fork():
+    """Drop per-process state a worker inherited from the preloaded master"""
+    from database import engine, read_engine, async_engine, async_read_engine
+    from utils.delta_utils import delta_tracker
+
+    # Pooled connections belong to the parent; close=False leaves its sockets alone
+    for current in {engine, read_engine, async_engine.sync_engine, async_read_engine.sync_engine}:
+        current.dispose(close=False)
+    # Without the shared store watermarks are per process, so each worker needs its own epoch
+    delta_tracker.reset()
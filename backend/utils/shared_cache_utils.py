@@ -0,0 +1,174 @@
+import os
+import pickle
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+from utils.trace_utils import traced
+
+# Deletes a lock only if it still holds our token, so a late release never frees another owner's lock
+_RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class SharedStore:
+    """Cache values and single-flight locks shared by every worker process, kept in Redis.
+
+    Values are pickled, so the Redis instance must only be reachable by
+    CloudSpy. When Redis is unreachable the store backs off and callers fall
+    back to their process-local behaviour.
+    """
+
+    def __init__(self, url: str, prefix: str = "cloudspy:cache:"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._pid: Optional[int] = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.errors = 0
+
+    def _redis(self):
+        if time.monotonic() < self._retry_at:
+            return None
+        with self._lock:
+            # Connections must not cross a fork
+            if self._client is None or self._pid != os.getpid():
+                import redis
+                self._client = redis.Redis.from_url(self.url, socket_timeout=2.0, socket_connect_timeout=1.0)
+                self._pid = os.getpid()
+            return self._client
+
+    def _failed(self, e: Exception):
+        self.errors += 1
+        self._retry_at = time.monotonic() + 30
+        print(f"Shared cache unavailable, using process-local cache: {str(e)}")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Cached value and its remaining TTL in seconds"""
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            pipe = client.pipeline()
+            pipe.get(self.prefix + key)
+            pipe.pttl(self.prefix + key)
+            raw, ttl_ms = pipe.execute()
+        except Exception as e:
+            self._failed(e)
+            return None
+        if raw is None:
+            return None
+        return pickle.loads(raw), max(ttl_ms, 0) / 1000
+
+    def set(self, key: str, value: Any, ttl: float):
+        client = self._redis()
+        if client is None or ttl <= 0:
+            return
+        try:
+            client.set(self.prefix + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                       px=int(ttl * 1000))
+        except Exception as e:
+            self._failed(e)
+
+    def epoch_counter(self, key: str, increment: int = 1) -> Optional[Tuple[str, int]]:
+        """Epoch and incremented value of a counter shared by every worker; None when Redis is down.
+
+        Both live in one hash, so if the counter is lost its replacement
+        starts under a new epoch rather than repeating old values.
+        """
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            pipe = client.pipeline()
+            pipe.hsetnx(self.prefix + key, "epoch", secrets.token_hex(4))
+            pipe.hincrby(self.prefix + key, "value", increment)
+            pipe.hget(self.prefix + key, "epoch")
+            _, value, epoch = pipe.execute()
+        except Exception as e:
+            self._failed(e)
+            return None
+        return epoch.decode("ascii"), value
+
+    def acquire(self, key: str) -> Optional[str]:
+        """Token if this process now owns the load for ``key``, None if another process does"""
+        client = self._redis()
+        if client is None:
+            return ""
+        token = secrets.token_hex(8)
+        try:
+            if client.set(self.prefix + "lock:" + key, token, nx=True,
+                          px=int(settings.shared_cache_lock_seconds * 1000)):
+                return token
+            return None
+        except Exception as e:
+            self._failed(e)
+            return ""
+
+    def release(self, key: str, token: str):
+        client = self._redis()
+        if client is None or not token:
+            return
+        try:
+            client.eval(_RELEASE_LOCK, 1, self.prefix + "lock:" + key, token)
+        except Exception as e:
+            self._failed(e)
+
+    def wait(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Wait for another process's load of ``key``; None if it failed or took too long"""
+        self.waits += 1
+        client = self._redis()
+        deadline = time.monotonic() + settings.shared_cache_wait_seconds
+        delay = 0.02
+        while client is not None and time.monotonic() < deadline:
+            hit = self.get(key)
+            if hit is not None:
+                return hit
+            try:
+                if not client.exists(self.prefix + "lock:" + key):
+                    return self.get(key)
+            except Exception as e:
+                self._failed(e)
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+        return None
+
+    @traced("shared_cache.load")
+    def load(self, key: str, loader: Callable[[], Any], ttl: float) -> Tuple[Any, float]:
+        """Value for ``key`` from Redis, or loaded by one process while the others wait"""
+        hit = self.get(key)
+        if hit is not None:
+            self.hits += 1
+            return hit
+        self.misses += 1
+        token = self.acquire(key)
+        if token is None:
+            hit = self.wait(key)
+            if hit is not None:
+                return hit
+        try:
+            value = loader()
+            self.set(key, value, ttl)
+            return value, ttl
+        finally:
+            if token:
+                self.release(key, token)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "errors": self.errors,
+            "available": time.monotonic() >= self._retry_at,
+        }
+
+
+# Set when SHARED_CACHE_ENABLED is on, e.g. under the multi-process server
+shared_store = SharedStore(settings.redis_url) if settings.shared_cache_enabled else None
@@ -0,0 +1,161 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+BUCKETS = ("day", "week", "month")
+
+
+def _to_local_days(dates: List[str], tz_name: str) -> np.ndarray:
+    """Map date/timestamp strings to local calendar days (datetime64[D]).
+
+    Date-only values (DAILY or MONTHLY billing periods) are already calendar
+    days and are kept as-is. Timestamps (HOURLY data) are read as UTC and
+    shifted into ``tz_name``; offsets are resolved once per distinct
+    timestamp rather than per row.
+    """
+    raw = np.asarray([d.rstrip("Z") for d in dates])
+    has_time = np.char.find(raw, "T") >= 0
+    days = np.empty(len(raw), dtype="datetime64[D]")
+
+    if (~has_time).any():
+        days[~has_time] = raw[~has_time].astype("datetime64[D]")
+
+    if has_time.any():
+        stamps = raw[has_time].astype("datetime64[s]")
+        unique, inverse = np.unique(stamps, return_inverse=True)
+        zone = ZoneInfo(tz_name)
+        offsets = np.array([
+            datetime.fromtimestamp(int(ts), tz=timezone.utc).astimezone(zone).utcoffset().total_seconds()
+            for ts in unique.astype("int64")
+        ], dtype="int64")
+        local = unique + offsets.astype("timedelta64[s]")
+        days[has_time] = local.astype("datetime64[D]")[inverse]
+
+    return days
+
+
+def bucket_starts(days: np.ndarray, bucket: str) -> np.ndarray:
+    """Truncate calendar days to the start of their day/week/month bucket"""
+    if bucket == "day":
+        return days
+    if bucket == "week":
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        weekday = (days.astype("int64") + 3) % 7
+        return days - weekday.astype("timedelta64[D]")
+    if bucket == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unsupported bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+
+
+def _bucket_range(first: np.datetime64, last: np.datetime64, bucket: str) -> np.ndarray:
+    if bucket == "month":
+        months = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1)
+        return months.astype("datetime64[D]")
+    step = 7 if bucket == "week" else 1
+    return np.arange(first, last + 1, step)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets selection for many series on a shared x.
+
+    ``y`` is (n_series, n_points). Returns an (n_series, threshold) array of
+    selected column indices. The loop runs over output buckets only; every
+    step scores all candidate points of all series at once.
+    """
+    n_series, n_points = y.shape
+    if threshold >= n_points or threshold < 3:
+        return np.tile(np.arange(n_points), (n_series, 1))
+
+    selected = np.zeros((n_series, threshold), dtype=np.int64)
+    selected[:, -1] = n_points - 1
+    edges = np.linspace(1, n_points - 1, threshold - 1).astype(np.int64)
+    rows = np.arange(n_series)
+    prev = np.zeros(n_series, dtype=np.int64)
+
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n_points)
+        next_end = max(next_end, next_start + 1)
+
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[:, next_start:next_end].mean(axis=1)
+        prev_x = x[prev]
+        prev_y = y[rows, prev]
+
+        cand_x = x[start:end]
+        cand_y = y[:, start:end]
+        area = np.abs(
+            (prev_x[:, None] - avg_x) * (cand_y - prev_y[:, None])
+            - (prev_x[:, None] - cand_x[None, :]) * (avg_y - prev_y)[:, None]
+        )
+        prev = start + area.argmax(axis=1)
+        selected[:, i + 1] = prev
+
+    return selected
+
+
+def build_timeseries(dates: List[str], labels: List[str], amounts: List[float], bucket: str = "day",
+                     tz_name: str = "UTC", max_points: Optional[int] = None,
+                     max_series: Optional[int] = None) -> Dict[str, Any]:
+    """Re-bucket cost rows into per-label series and downsample them.
+
+    Rows are summed into a dense (series x bucket) matrix with one bincount,
+    empty buckets are zero, and series beyond ``max_series`` (by total) are
+    folded into "Other" before LTTB downsampling to ``max_points``.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unsupported bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+    try:
+        ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{tz_name}'")
+    if not dates:
+        return {"bucket": bucket, "timezone": tz_name, "points_in": 0, "series": []}
+
+    starts = bucket_starts(_to_local_days(dates, tz_name), bucket)
+    grid = _bucket_range(starts.min(), starts.max(), bucket)
+    bucket_idx = np.searchsorted(grid, starts)
+
+    names, series_idx = np.unique(np.asarray(labels, dtype=object).astype(str), return_inverse=True)
+    values = np.asarray(amounts, dtype=np.float64)
+    matrix = np.bincount(
+        series_idx * len(grid) + bucket_idx, weights=values, minlength=len(names) * len(grid)
+    ).reshape(len(names), len(grid))
+
+    totals = matrix.sum(axis=1)
+    order = np.argsort(-totals, kind="stable")
+    names, matrix, totals = names[order], matrix[order], totals[order]
+    if max_series and len(names) > max_series:
+        # "Other" counts towards the cap, so max_series=1 folds everything into it
+        keep = max_series - 1
+        other = matrix[keep:].sum(axis=0, keepdims=True)
+        names = np.append(names[:keep], "Other")
+        matrix = np.vstack([matrix[:keep], other])
+        totals = np.append(totals[:keep], other.sum())
+
+    x = grid.astype("int64").astype(np.float64)
+    if max_points and max_points < len(grid):
+        selected = lttb_indices(x, matrix, max_points)
+    else:
+        selected = np.tile(np.arange(len(grid)), (len(names), 1))
+
+    labels_out = np.datetime_as_string(grid, unit="D")
+    series = []
+    for row, name in enumerate(names):
+        idx = selected[row]
+        series.append({
+            "name": str(name),
+            "total": float(totals[row]),
+            "points": [[str(labels_out[j]), float(v)] for j, v in zip(idx, matrix[row, idx])],
+        })
+
+    return {"bucket": bucket, "timezone": tz_name, "points_in": int(len(grid)), "series": series}
+
+
+def rows_to_columns(rows: List[Tuple[Any, ...]], width: int = 3) -> Tuple[List[Any], ...]:
+    """Split rows, e.g. (date, label, amount), into column lists"""
+    if not rows:
+        return tuple([] for _ in range(width))
+    return tuple(list(column) for column in zip(*rows))
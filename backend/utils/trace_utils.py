@@ -0,0 +1,315 @@
+import functools
+import inspect
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+# Trace of the request being served, when it is traced; untraced code pays one ContextVar lookup per span
+_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_parent: ContextVar[Optional[int]] = ContextVar("trace_parent", default=None)
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "attrs", "start", "end", "thread")
+
+    def __init__(self, span_id: int, parent: Optional[int], name: str, attrs: Dict[str, Any], start: float):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = start
+        self.end: Optional[float] = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs: Any):
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(((self.end or self.start) - self.start) * 1000, 3),
+            "thread": self.thread,
+            "attrs": self.attrs,
+        }
+
+
+class Trace:
+    """Spans of one request and, when profiled, sampled stacks of the threads serving it"""
+
+    def __init__(self, method: str, path: str, profile: bool):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.profile = profile
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.spans: List[Span] = []
+        self.samples: Counter = Counter()
+        # Thread ident -> open span count; only threads inside a span are sampled
+        self.active_threads: Counter = Counter()
+        self._ids = iter(range(1, sys.maxsize))
+        self._lock = threading.Lock()
+
+    def open(self, name: str, attrs: Dict[str, Any]) -> Span:
+        with self._lock:
+            span = Span(next(self._ids), _parent.get(), name, attrs, time.perf_counter())
+            self.spans.append(span)
+            self.active_threads[threading.get_ident()] += 1
+        return span
+
+    def close(self, span: Span):
+        span.end = time.perf_counter()
+        with self._lock:
+            ident = threading.get_ident()
+            self.active_threads[ident] -= 1
+            if self.active_threads[ident] <= 0:
+                del self.active_threads[ident]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": len(self.spans),
+            "profiled": self.profile,
+            "samples": sum(self.samples.values()),
+            "pid": os.getpid(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.summary(), "span_tree": [span.to_dict(self.origin) for span in self.spans]}
+
+    def folded(self, source: str = "spans") -> str:
+        """Collapsed stacks ("a;b;c weight" lines) for flamegraph.pl, speedscope and similar tools.
+
+        ``spans`` weighs each span path by its self time in microseconds;
+        ``samples`` gives sampled Python stacks with sample counts.
+        """
+        if source == "samples":
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+        by_id = {span.id: span for span in self.spans}
+        child_time: Counter = Counter()
+        for span in self.spans:
+            if span.parent in by_id and span.end is not None:
+                child_time[span.parent] += span.end - span.start
+        weights: Counter = Counter()
+        for span in self.spans:
+            if span.end is None:
+                continue
+            path = [span.name]
+            parent = by_id.get(span.parent)
+            while parent is not None:
+                path.append(parent.name)
+                parent = by_id.get(parent.parent)
+            self_time = max(span.end - span.start - child_time[span.id], 0)
+            weights[";".join(reversed(path))] += round(self_time * 1_000_000)
+        return "".join(f"{stack} {weight}\n" for stack, weight in sorted(weights.items()) if weight)
+
+
+class _SpanScope:
+    __slots__ = ("trace", "name", "attrs", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> Span:
+        self.span = self.trace.open(self.name, self.attrs)
+        self.token = _parent.set(self.span.id)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _parent.reset(self.token)
+        if exc is not None:
+            self.span.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.trace.close(self.span)
+        return False
+
+
+class _NoSpan:
+    """Stand-in returned when the request is not traced"""
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs: Any):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **attrs: Any):
+    """Context manager timing a block as a span of the current trace, if any"""
+    trace = _trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _SpanScope(trace, name, attrs)
+
+
+def traced(name: str) -> Callable:
+    """Decorator recording each call as a span"""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = _trace.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            with _SpanScope(trace, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def trace_methods(prefix: str) -> Callable[[type], type]:
+    """Class decorator tracing every method defined on the class as ``prefix.Class.method``"""
+    def decorate(cls: type) -> type:
+        for attr, value in list(vars(cls).items()):
+            if inspect.isfunction(value) and not attr.startswith("__"):
+                setattr(cls, attr, traced(f"{prefix}.{cls.__name__}.{attr}")(value))
+        return cls
+    return decorate
+
+
+def _fold_frame(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class StackSampler:
+    """Samples the Python stacks of threads serving profiled requests.
+
+    The sampling thread only runs while at least one profiled request is in
+    flight.
+    """
+
+    def __init__(self, interval_ms: Optional[float] = None):
+        self.interval = (interval_ms or settings.profile_interval_ms) / 1000
+        self._active: Dict[str, Trace] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._active[trace.id] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, trace: Trace):
+        with self._lock:
+            self._active.pop(trace.id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                traces = list(self._active.values())
+                if not traces:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for trace in traces:
+                with trace._lock:
+                    threads = list(trace.active_threads)
+                for ident in threads:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        trace.samples[_fold_frame(frame)] += 1
+            time.sleep(self.interval)
+
+
+class Tracer:
+    """Decides which requests are traced and keeps the most recent traces in memory"""
+
+    def __init__(self, buffer_size: Optional[int] = None):
+        self.buffer_size = buffer_size or settings.trace_buffer_size
+        self.sampler = StackSampler()
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mode(self, header: Optional[str]) -> Optional[str]:
+        """"profile" or "trace" when the request should be traced, else None"""
+        if header:
+            value = header.strip().lower()
+            if value == "profile":
+                return "profile"
+            if value in ("1", "true", "trace"):
+                return "trace"
+        if settings.trace_sample_rate > 0 and random.random() < settings.trace_sample_rate:
+            return "trace"
+        return None
+
+    def start(self, method: str, path: str, profile: bool) -> Trace:
+        trace = Trace(method, path, profile)
+        trace.token = _trace.set(trace)
+        if profile:
+            self.sampler.add(trace)
+        return trace
+
+    def finish(self, trace: Trace, status: Optional[int]):
+        _trace.reset(trace.token)
+        if trace.profile:
+            self.sampler.remove(trace)
+        trace.status = status
+        trace.duration_ms = round((time.perf_counter() - trace.origin) * 1000, 3)
+        with self._lock:
+            self._traces[trace.id] = trace
+            while len(self._traces) > self.buffer_size:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces.values())[-limit:]
+        return [trace.summary() for trace in reversed(traces)]
+
+
+tracer = Tracer()
+
+
+def install_framework_spans():
+    """Time FastAPI's endpoint call and response validation/serialization as spans"""
+    from fastapi import routing
+
+    for name, label in (("run_endpoint_function", "fastapi.endpoint"), ("serialize_response", "fastapi.serialize_response")):
+        original = getattr(routing, name, None)
+        if original is None or getattr(original, "__traced__", False):
+            continue
+
+        def make(original: Callable, label: str) -> Callable:
+            @functools.wraps(original)
+            async def wrapper(*args, **kwargs):
+                with span(label):
+                    return await original(*args, **kwargs)
+            wrapper.__traced__ = True
+            return wrapper
+
+        setattr(routing, name, make(original, label))
@@ -37,9 +37,9 @@ CREATE TABLE cloud_integrations (
     UNIQUE(user_id, provider, name)
 );
 
--- Cost data table
+-- Cost data table, range-partitioned by billing month
 CREATE TABLE cost_data (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
     service_name VARCHAR(255) NOT NULL,
     resource_id VARCHAR(255),
@@ -52,7 +52,99 @@ CREATE TABLE cost_data (
     region VARCHAR(100),
     tags JSONB DEFAULT '{}',
     raw_data JSONB,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    allocated_team VARCHAR(255), -- Set by the first matching allocation rule
+    allocation_rule_id UUID,
+    allocated_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, billing_period_start)
+) PARTITION BY RANGE (billing_period_start);
+
+-- Catches rows for months whose partition does not exist yet
+CREATE TABLE cost_data_default PARTITION OF cost_data DEFAULT;
+
+-- Creates the month's partition if missing. Rows for that month already sitting in
+-- the default partition are moved into the new partition before it is attached.
+CREATE OR REPLACE FUNCTION ensure_cost_data_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    lower_bound DATE := DATE_TRUNC('month', month_start)::DATE;
+    upper_bound DATE := (DATE_TRUNC('month', month_start) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := 'cost_data_p' || TO_CHAR(lower_bound, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM cost_data_default
+               WHERE billing_period_start >= lower_bound AND billing_period_start < upper_bound) THEN
+        EXECUTE format('CREATE TABLE %I (LIKE cost_data INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM cost_data_default
+                            WHERE billing_period_start >= %L AND billing_period_start < %L RETURNING *)
+             INSERT INTO %I SELECT * FROM moved', lower_bound, upper_bound, partition_name);
+        EXECUTE format('ALTER TABLE cost_data ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    ELSE
+        EXECUTE format('CREATE TABLE %I PARTITION OF cost_data FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_cost_data_partition(month::DATE)
+FROM generate_series(DATE_TRUNC('month', CURRENT_DATE),
+                     DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '3 months', INTERVAL '1 month') AS month;
+
+-- Detached partitions are moved here when retention archives instead of dropping
+CREATE SCHEMA cost_archive;
+
+-- Per-day revisions of stored cost data; bumped whenever a day's rows are written or removed
+CREATE SEQUENCE cost_data_revision_seq;
+
+CREATE TABLE cost_data_revisions (
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    revision BIGINT NOT NULL,
+    written_xid xid8 NOT NULL DEFAULT pg_current_xact_id(), -- Compared against snapshot xmins by delta watermarks
+    PRIMARY KEY (integration_id, day)
+);
+
+-- Daily FX rates, in units of the base currency per unit of each currency
+CREATE TABLE fx_rates (
+    currency CHAR(3) NOT NULL,
+    day DATE NOT NULL,
+    rate NUMERIC(24, 12) NOT NULL CHECK (rate > 0),
+    source VARCHAR(255),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (currency, day)
+);
+
+-- CUR manifests already ingested; unchanged fingerprints are skipped
+CREATE TABLE cur_manifests (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    manifest_key VARCHAR(1024) NOT NULL, -- period:<start> or file:<relative path>
+    manifest_path VARCHAR(1024),
+    fingerprint VARCHAR(64) NOT NULL,
+    line_items BIGINT DEFAULT 0,
+    rows_written INTEGER DEFAULT 0,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(integration_id, manifest_key)
+);
+
+-- Kubernetes node costs split across pods, rolled up per day by namespace and pod label
+CREATE TABLE k8s_cost_allocations (
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    cluster VARCHAR(255) NOT NULL DEFAULT '',
+    dimension VARCHAR(255) NOT NULL, -- namespace or label:<key>
+    value VARCHAR(1024) NOT NULL, -- __idle__ in the namespace rollup is capacity no pod claimed
+    cpu_cost DOUBLE PRECISION NOT NULL,
+    memory_cost DOUBLE PRECISION NOT NULL,
+    pod_hours DOUBLE PRECISION NOT NULL,
+    currency CHAR(3) NOT NULL,
+    PRIMARY KEY (integration_id, cluster, day, dimension, value)
 );
 
 -- Resources table
@@ -67,6 +159,12 @@ CREATE TABLE resources (
     tags JSONB DEFAULT '{}',
     configuration JSONB DEFAULT '{}',
     monthly_cost DECIMAL(10, 2),
+    content_hash VARCHAR(64), -- Hash of collected fields; unchanged rows are not rewritten
+    status_changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    is_idle BOOLEAN DEFAULT FALSE,
+    idle_reason VARCHAR(50), -- unattached, unassociated, low-utilization, no-io, stopped-stale
+    utilization JSONB DEFAULT '{}',
+    idle_checked_at TIMESTAMP WITH TIME ZONE,
     last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
@@ -88,6 +186,33 @@ CREATE TABLE cost_alerts (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Distinct service names per integration, maintained on ingest for search
+CREATE TABLE service_catalog (
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    service_name VARCHAR(255) NOT NULL,
+    first_seen DATE NOT NULL,
+    last_seen DATE NOT NULL,
+    PRIMARY KEY (integration_id, service_name)
+);
+
+-- Cost allocation rules, applied in priority order (first match wins)
+CREATE TABLE allocation_rules (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    team VARCHAR(255) NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 100,
+    match_type VARCHAR(50) NOT NULL, -- tag_equals, tag_prefix, tag_regex, resource_prefix, resource_regex, account, service
+    tag_key VARCHAR(255),
+    pattern VARCHAR(1024) NOT NULL,
+    is_active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE cost_data ADD CONSTRAINT cost_data_allocation_rule_id_fkey
+    FOREIGN KEY (allocation_rule_id) REFERENCES allocation_rules(id) ON DELETE SET NULL;
+
 -- Sync logs table
 CREATE TABLE sync_logs (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -103,19 +228,41 @@ CREATE TABLE sync_logs (
 
 -- Create indexes for better performance
 CREATE INDEX idx_cost_data_integration_period ON cost_data(integration_id, billing_period_start, billing_period_end);
-CREATE INDEX idx_cost_data_service ON cost_data(service_name);
-CREATE INDEX idx_cost_data_region ON cost_data(region);
-CREATE INDEX idx_cost_data_created_at ON cost_data(created_at);
+CREATE INDEX idx_cost_data_period_brin ON cost_data USING BRIN (billing_period_start, billing_period_end);
+CREATE INDEX idx_cost_data_created_at_brin ON cost_data USING BRIN (created_at);
+CREATE INDEX idx_cost_data_team ON cost_data(integration_id, allocated_team, billing_period_start);
+CREATE INDEX idx_cost_data_unallocated ON cost_data(integration_id) WHERE allocated_at IS NULL;
+CREATE INDEX idx_cost_data_allocation_rule ON cost_data(allocation_rule_id) WHERE allocation_rule_id IS NOT NULL;
+CREATE INDEX idx_cost_data_cur_unit ON cost_data(integration_id, (raw_data->>'unit'))
+    WHERE raw_data->>'source' = 'cur';
+CREATE INDEX idx_cost_data_revisions_revision ON cost_data_revisions(integration_id, revision);
+CREATE INDEX idx_cost_data_revisions_xid ON cost_data_revisions(integration_id, written_xid);
+CREATE INDEX idx_cost_data_resource ON cost_data(integration_id, resource_id, billing_period_start)
+    WHERE resource_id IS NOT NULL;
+CREATE INDEX idx_k8s_cost_allocations_dimension ON k8s_cost_allocations(integration_id, dimension, day);
 
 CREATE INDEX idx_resources_integration ON resources(integration_id);
 CREATE INDEX idx_resources_type ON resources(resource_type);
 CREATE INDEX idx_resources_status ON resources(status);
 CREATE INDEX idx_resources_region ON resources(region);
+CREATE INDEX idx_resources_idle ON resources(integration_id, idle_reason) WHERE is_idle;
+CREATE INDEX idx_resources_name_trgm ON resources USING GIN (resource_name gin_trgm_ops);
+CREATE INDEX idx_resources_resource_id_trgm ON resources USING GIN (resource_id gin_trgm_ops);
+CREATE INDEX idx_resources_tags_text_trgm ON resources USING GIN ((tags::text) gin_trgm_ops);
+CREATE INDEX idx_resources_tags_path ON resources USING GIN (tags jsonb_path_ops);
+CREATE INDEX idx_resources_label ON resources ((lower(COALESCE(resource_name, resource_id)) COLLATE "C"), id);
+
+CREATE INDEX idx_service_catalog_name_trgm ON service_catalog USING GIN (service_name gin_trgm_ops);
 
 CREATE INDEX idx_cloud_integrations_user ON cloud_integrations(user_id);
 CREATE INDEX idx_cloud_integrations_provider ON cloud_integrations(provider);
 CREATE INDEX idx_cloud_integrations_status ON cloud_integrations(status);
 
+CREATE INDEX idx_cost_alerts_integration_active ON cost_alerts(integration_id) WHERE is_active;
+CREATE INDEX idx_cost_alerts_user_active ON cost_alerts(user_id) WHERE is_active AND integration_id IS NULL;
+
+CREATE INDEX idx_allocation_rules_user ON allocation_rules(user_id, priority) WHERE is_active;
+
 CREATE INDEX idx_sync_logs_integration ON sync_logs(integration_id);
 CREATE INDEX idx_sync_logs_started_at ON sync_logs(started_at);
 
@@ -140,6 +287,9 @@ CREATE TRIGGER update_resources_updated_at BEFORE UPDATE ON resources
 CREATE TRIGGER update_cost_alerts_updated_at BEFORE UPDATE ON cost_alerts
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_allocation_rules_updated_at BEFORE UPDATE ON allocation_rules
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
 -- Insert sample data for development
 INSERT INTO users (email, hashed_password, full_name, is_superuser) VALUES
 ('admin@cloudspy.com', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewdBPj6hsxq5/Qe2', 'CloudSpy Admin', true),
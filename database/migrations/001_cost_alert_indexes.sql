@@ -0,0 +1,3 @@
+-- Partial indexes used by the set-based cost alert evaluator
+CREATE INDEX IF NOT EXISTS idx_cost_alerts_integration_active ON cost_alerts(integration_id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_cost_alerts_user_active ON cost_alerts(user_id) WHERE is_active AND integration_id IS NULL;
@@ -0,0 +1,2 @@
+-- Content hash used by the resource inventory collector to skip unchanged rows
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
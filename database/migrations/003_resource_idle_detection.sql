@@ -0,0 +1,8 @@
+-- Utilization summary and idle classification written by the idle resource scan
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS status_changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS is_idle BOOLEAN DEFAULT FALSE;
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS idle_reason VARCHAR(50);
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS utilization JSONB DEFAULT '{}';
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS idle_checked_at TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_resources_idle ON resources(integration_id, idle_reason) WHERE is_idle;
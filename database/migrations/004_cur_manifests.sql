@@ -0,0 +1,15 @@
+-- CUR manifests already ingested; unchanged fingerprints are skipped
+CREATE TABLE IF NOT EXISTS cur_manifests (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    manifest_key VARCHAR(1024) NOT NULL,
+    manifest_path VARCHAR(1024),
+    fingerprint VARCHAR(64) NOT NULL,
+    line_items BIGINT DEFAULT 0,
+    rows_written INTEGER DEFAULT 0,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(integration_id, manifest_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cost_data_cur_unit ON cost_data(integration_id, (raw_data->>'unit'))
+    WHERE raw_data->>'source' = 'cur';
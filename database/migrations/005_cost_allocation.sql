@@ -0,0 +1,26 @@
+-- Ordered team allocation rules and the per-row allocation they produce
+CREATE TABLE IF NOT EXISTS allocation_rules (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    team VARCHAR(255) NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 100,
+    match_type VARCHAR(50) NOT NULL,
+    tag_key VARCHAR(255),
+    pattern VARCHAR(1024) NOT NULL,
+    is_active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_allocation_rules_user ON allocation_rules(user_id, priority) WHERE is_active;
+
+DROP TRIGGER IF EXISTS update_allocation_rules_updated_at ON allocation_rules;
+CREATE TRIGGER update_allocation_rules_updated_at BEFORE UPDATE ON allocation_rules
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+ALTER TABLE cost_data ADD COLUMN IF NOT EXISTS allocated_team VARCHAR(255);
+ALTER TABLE cost_data ADD COLUMN IF NOT EXISTS allocation_rule_id UUID;
+ALTER TABLE cost_data ADD COLUMN IF NOT EXISTS allocated_at TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_cost_data_team ON cost_data(integration_id, allocated_team, billing_period_start);
@@ -0,0 +1,26 @@
+-- Trigram and JSONB-path indexes backing the search API
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_resources_name_trgm ON resources USING GIN (resource_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_resources_resource_id_trgm ON resources USING GIN (resource_id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_resources_tags_text_trgm ON resources USING GIN ((tags::text) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_resources_tags_path ON resources USING GIN (tags jsonb_path_ops);
+-- Prefix search walks this index in keyset order
+CREATE INDEX IF NOT EXISTS idx_resources_label ON resources ((lower(COALESCE(resource_name, resource_id)) COLLATE "C"), id);
+
+-- Distinct service names per integration, maintained on ingest
+CREATE TABLE IF NOT EXISTS service_catalog (
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    service_name VARCHAR(255) NOT NULL,
+    first_seen DATE NOT NULL,
+    last_seen DATE NOT NULL,
+    PRIMARY KEY (integration_id, service_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_service_catalog_name_trgm ON service_catalog USING GIN (service_name gin_trgm_ops);
+
+INSERT INTO service_catalog (integration_id, service_name, first_seen, last_seen)
+SELECT integration_id, service_name, MIN(billing_period_start), MAX(billing_period_end)
+FROM cost_data
+GROUP BY integration_id, service_name
+ON CONFLICT (integration_id, service_name) DO NOTHING;
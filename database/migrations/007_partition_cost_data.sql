@@ -0,0 +1,114 @@
+-- Range-partition cost_data by billing month, with BRIN indexes on the date columns.
+-- Existing rows are copied into monthly partitions inside this migration's transaction.
+
+-- Creates the month's partition if missing. Rows for that month already sitting in
+-- the default partition are moved into the new partition before it is attached.
+CREATE OR REPLACE FUNCTION ensure_cost_data_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    lower_bound DATE := DATE_TRUNC('month', month_start)::DATE;
+    upper_bound DATE := (DATE_TRUNC('month', month_start) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := 'cost_data_p' || TO_CHAR(lower_bound, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM cost_data_default
+               WHERE billing_period_start >= lower_bound AND billing_period_start < upper_bound) THEN
+        EXECUTE format('CREATE TABLE %I (LIKE cost_data INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM cost_data_default
+                            WHERE billing_period_start >= %L AND billing_period_start < %L RETURNING *)
+             INSERT INTO %I SELECT * FROM moved', lower_bound, upper_bound, partition_name);
+        EXECUTE format('ALTER TABLE cost_data ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    ELSE
+        EXECUTE format('CREATE TABLE %I PARTITION OF cost_data FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, lower_bound, upper_bound);
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Databases created from the current init.sql are already partitioned
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'cost_data'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    DROP VIEW IF EXISTS cost_summary;
+    ALTER TABLE cost_data RENAME TO cost_data_unpartitioned;
+    ALTER TABLE cost_data_unpartitioned RENAME CONSTRAINT cost_data_pkey TO cost_data_unpartitioned_pkey;
+
+    CREATE TABLE cost_data (
+        id UUID NOT NULL DEFAULT uuid_generate_v4(),
+        integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+        service_name VARCHAR(255) NOT NULL,
+        resource_id VARCHAR(255),
+        cost_amount DECIMAL(12, 4) NOT NULL,
+        currency VARCHAR(3) DEFAULT 'USD',
+        usage_quantity DECIMAL(12, 4),
+        usage_unit VARCHAR(100),
+        billing_period_start DATE NOT NULL,
+        billing_period_end DATE NOT NULL,
+        region VARCHAR(100),
+        tags JSONB DEFAULT '{}',
+        raw_data JSONB,
+        allocated_team VARCHAR(255),
+        allocation_rule_id UUID,
+        allocated_at TIMESTAMP WITH TIME ZONE,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, billing_period_start)
+    ) PARTITION BY RANGE (billing_period_start);
+
+    CREATE TABLE cost_data_default PARTITION OF cost_data DEFAULT;
+
+    PERFORM ensure_cost_data_partition(month::DATE)
+    FROM (
+        SELECT DISTINCT DATE_TRUNC('month', billing_period_start) AS month FROM cost_data_unpartitioned
+        UNION
+        SELECT generate_series(DATE_TRUNC('month', CURRENT_DATE),
+                               DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '3 months', INTERVAL '1 month')
+    ) months;
+
+    INSERT INTO cost_data (
+        id, integration_id, service_name, resource_id, cost_amount, currency, usage_quantity, usage_unit,
+        billing_period_start, billing_period_end, region, tags, raw_data, allocated_team,
+        allocation_rule_id, allocated_at, created_at
+    )
+    SELECT
+        id, integration_id, service_name, resource_id, cost_amount, currency, usage_quantity, usage_unit,
+        billing_period_start, billing_period_end, region, tags, raw_data, allocated_team,
+        allocation_rule_id, allocated_at, created_at
+    FROM cost_data_unpartitioned;
+
+    DROP TABLE cost_data_unpartitioned;
+
+    -- Indexes are created after the copy; partitions inherit them.
+    -- BRIN replaces the B-tree indexes on created_at, service_name and region.
+    CREATE INDEX idx_cost_data_integration_period ON cost_data(integration_id, billing_period_start, billing_period_end);
+    CREATE INDEX idx_cost_data_period_brin ON cost_data USING BRIN (billing_period_start, billing_period_end);
+    CREATE INDEX idx_cost_data_created_at_brin ON cost_data USING BRIN (created_at);
+    CREATE INDEX idx_cost_data_team ON cost_data(integration_id, allocated_team, billing_period_start);
+    CREATE INDEX idx_cost_data_cur_unit ON cost_data(integration_id, (raw_data->>'unit'))
+        WHERE raw_data->>'source' = 'cur';
+
+    CREATE VIEW cost_summary AS
+    SELECT
+        ci.user_id,
+        ci.provider,
+        ci.name as integration_name,
+        DATE_TRUNC('month', cd.billing_period_start) as month,
+        SUM(cd.cost_amount) as total_cost,
+        COUNT(DISTINCT cd.service_name) as service_count,
+        COUNT(DISTINCT cd.resource_id) as resource_count
+    FROM cost_data cd
+    JOIN cloud_integrations ci ON cd.integration_id = ci.id
+    GROUP BY ci.user_id, ci.provider, ci.name, DATE_TRUNC('month', cd.billing_period_start);
+
+END;
+$$;
+
+CREATE SCHEMA IF NOT EXISTS cost_archive;
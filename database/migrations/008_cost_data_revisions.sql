@@ -0,0 +1,19 @@
+-- Per-day revisions of stored cost data, so clients can fetch only days changed since a watermark
+
+CREATE SEQUENCE IF NOT EXISTS cost_data_revision_seq;
+
+CREATE TABLE IF NOT EXISTS cost_data_revisions (
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    revision BIGINT NOT NULL,
+    PRIMARY KEY (integration_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cost_data_revisions_revision ON cost_data_revisions(integration_id, revision);
+
+-- Existing data counts as one initial revision
+INSERT INTO cost_data_revisions (integration_id, day, revision)
+SELECT DISTINCT integration_id, billing_period_start, 1 FROM cost_data
+ON CONFLICT (integration_id, day) DO NOTHING;
+
+SELECT setval('cost_data_revision_seq', GREATEST((SELECT MAX(revision) FROM cost_data_revisions), 1));
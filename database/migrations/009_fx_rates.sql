@@ -0,0 +1,10 @@
+-- Daily FX rates used to normalize costs to a reporting currency
+
+CREATE TABLE IF NOT EXISTS fx_rates (
+    currency CHAR(3) NOT NULL,
+    day DATE NOT NULL,
+    rate NUMERIC(24, 12) NOT NULL CHECK (rate > 0),
+    source VARCHAR(255),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (currency, day)
+);
@@ -0,0 +1,20 @@
+-- Kubernetes node costs split across pods, rolled up per day by namespace and pod label
+
+CREATE TABLE IF NOT EXISTS k8s_cost_allocations (
+    integration_id UUID NOT NULL REFERENCES cloud_integrations(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    cluster VARCHAR(255) NOT NULL DEFAULT '',
+    dimension VARCHAR(255) NOT NULL, -- namespace or label:<key>
+    value VARCHAR(1024) NOT NULL, -- __idle__ in the namespace rollup is capacity no pod claimed
+    cpu_cost DOUBLE PRECISION NOT NULL,
+    memory_cost DOUBLE PRECISION NOT NULL,
+    pod_hours DOUBLE PRECISION NOT NULL,
+    currency CHAR(3) NOT NULL,
+    PRIMARY KEY (integration_id, cluster, day, dimension, value)
+);
+
+CREATE INDEX IF NOT EXISTS idx_k8s_cost_allocations_dimension ON k8s_cost_allocations(integration_id, dimension, day);
+
+-- Node costs are joined to pods by instance id
+CREATE INDEX IF NOT EXISTS idx_cost_data_resource ON cost_data(integration_id, resource_id, billing_period_start)
+    WHERE resource_id IS NOT NULL;
@@ -0,0 +1,21 @@
+-- Partial index for the rows allocate_new_rows picks up after an ingest, and a foreign key
+-- from allocated rows to the rule that matched them
+
+CREATE INDEX IF NOT EXISTS idx_cost_data_unallocated ON cost_data(integration_id) WHERE allocated_at IS NULL;
+
+-- Deleting a rule clears allocation_rule_id through the foreign key
+CREATE INDEX IF NOT EXISTS idx_cost_data_allocation_rule ON cost_data(allocation_rule_id)
+    WHERE allocation_rule_id IS NOT NULL;
+
+-- Rows still pointing at rules deleted before the constraint existed
+UPDATE cost_data c SET allocation_rule_id = NULL
+WHERE c.allocation_rule_id IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM allocation_rules r WHERE r.id = c.allocation_rule_id);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'cost_data_allocation_rule_id_fkey') THEN
+        ALTER TABLE cost_data ADD CONSTRAINT cost_data_allocation_rule_id_fkey
+            FOREIGN KEY (allocation_rule_id) REFERENCES allocation_rules(id) ON DELETE SET NULL;
+    END IF;
+END $$;
@@ -0,0 +1,6 @@
+-- Transaction that last revised each stored day. Delta watermarks compare it against the
+-- reader's snapshot xmin, which follows commit order where the revision sequence does not.
+
+ALTER TABLE cost_data_revisions ADD COLUMN IF NOT EXISTS written_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+
+CREATE INDEX IF NOT EXISTS idx_cost_data_revisions_xid ON cost_data_revisions(integration_id, written_xid);